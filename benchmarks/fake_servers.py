@@ -0,0 +1,248 @@
+"""
+本地模拟的 Bark 和 WxPusher 服务端，用于离线压测，不会真正推送到手机。
+
+支持配置响应延迟、错误率和速率限制：
+- Bark：POST /push，支持表单和 JSON，JSON 中带 device_keys 时按设备返回结果
+- WxPusher：POST /api/send/message，按 UID 返回结果，超过单次 UID 上限时返回业务错误
+
+单独运行：python benchmarks/fake_servers.py --latency 0.05 --error-rate 0.01 --rate-limit 200
+"""
+import argparse
+import json
+import random
+import socket
+import threading
+import time
+from abc import ABC, abstractmethod
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import parse_qs
+
+
+class Behavior:
+    """
+    模拟服务端的行为参数
+    """
+
+    def __init__(self, latency: float = 0.02, jitter: float = 0.0, error_rate: float = 0.0,
+                 rate_limit: float = 0, max_uids: int = 2000):
+        """
+        :param latency: 每个请求的基础延迟（秒）
+        :param jitter: 延迟随机浮动上限（秒）
+        :param error_rate: 返回服务端错误的概率
+        :param rate_limit: 每秒最多处理的请求数，超出返回 429，0 表示不限制
+        :param max_uids: WxPusher 单次请求的 UID 上限
+        """
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.rate_limit = rate_limit
+        self.max_uids = max_uids
+
+
+class FakeServer(ThreadingHTTPServer):
+    """
+    模拟服务端，记录请求数、接收方数量及各类响应数
+    """
+    daemon_threads = True
+
+    def __init__(self, handler: type, behavior: Behavior, port: int = 0):
+        super().__init__(("127.0.0.1", port), handler)
+        self.behavior = behavior
+        self._lock = threading.Lock()
+        self._tokens = float(behavior.rate_limit or 0)
+        self._refilled = time.monotonic()
+        self.counters: Dict[str, int] = {"requests": 0, "recipients": 0, "ok": 0, "errors": 0, "throttled": 0}
+        self._thread: Optional[threading.Thread] = None
+
+    def get_request(self):
+        """
+        关闭 Nagle 算法：响应头和响应体分两次写入，否则保持连接时每个请求都要等客户端的延迟确认（约40ms）
+        """
+        conn, address = super().get_request()
+        conn.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        return conn, address
+
+    @property
+    def url(self) -> str:
+        """
+        服务端地址
+        """
+        return f"http://127.0.0.1:{self.server_address[1]}"
+
+    def admit(self) -> bool:
+        """
+        令牌桶限流，桶容量为一秒的请求数
+        """
+        rate = self.behavior.rate_limit
+        if not rate:
+            return True
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(rate, self._tokens + (now - self._refilled) * rate)
+            self._refilled = now
+            if self._tokens < 1:
+                return False
+            self._tokens -= 1
+            return True
+
+    def count(self, **values: int):
+        """
+        累加计数
+        """
+        with self._lock:
+            for key, value in values.items():
+                self.counters[key] += value
+
+    def stats(self) -> Dict[str, int]:
+        """
+        请求和响应计数
+        """
+        with self._lock:
+            return dict(self.counters)
+
+    def start(self) -> "FakeServer":
+        """
+        后台线程启动服务
+        """
+        self._thread = threading.Thread(target=self.serve_forever, name=self.__class__.__name__, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        """
+        停止服务
+        """
+        self.shutdown()
+        self.server_close()
+
+
+class _Handler(BaseHTTPRequestHandler, ABC):
+    """
+    公共处理：读取请求体、模拟延迟、限流和随机错误
+    """
+    server: FakeServer
+    protocol_version = "HTTP/1.1"
+    path_name = ""
+
+    def log_message(self, *args):
+        pass
+
+    def _reply(self, status: int, body: Dict[str, Any]):
+        data = json.dumps(body, ensure_ascii=False).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _read(self) -> Dict[str, Any]:
+        raw = self.rfile.read(int(self.headers.get("Content-Length") or 0))
+        if "json" in (self.headers.get("Content-Type") or ""):
+            return json.loads(raw or b"{}")
+        return {k: v[0] for k, v in parse_qs(raw.decode("utf-8")).items()}
+
+    def do_POST(self):
+        if self.path.split("?")[0] != self.path_name:
+            self._reply(404, {"code": 404, "message": "not found"})
+            return
+        body = self._read()
+        behavior = self.server.behavior
+        if not self.server.admit():
+            self.server.count(requests=1, throttled=1)
+            self._reply(429, {"code": 429, "message": "too many requests"})
+            return
+        time.sleep(behavior.latency + random.uniform(0, behavior.jitter))
+        if random.random() < behavior.error_rate:
+            self.server.count(requests=1, errors=1)
+            self._reply(500, {"code": 500, "message": "internal error"})
+            return
+        status, reply, recipients, ok = self.handle_push(body)
+        self.server.count(requests=1, recipients=recipients, ok=ok, errors=0 if ok else 1)
+        self._reply(status, reply)
+
+    @abstractmethod
+    def handle_push(self, body: Dict[str, Any]) -> Tuple[int, Dict[str, Any], int, int]:
+        """
+        处理推送请求
+        :return: HTTP 状态码、响应体、接收方数量、成功请求数
+        """
+
+
+class BarkHandler(_Handler):
+    path_name = "/push"
+
+    def handle_push(self, body: Dict[str, Any]) -> Tuple[int, Dict[str, Any], int, int]:
+        keys: List[str] = body.get("device_keys") or ([body["device_key"]] if body.get("device_key") else [])
+        if not keys:
+            return 400, {"code": 400, "message": "device key is empty"}, 0, 0
+        reply = {"code": 200, "message": "success", "timestamp": int(time.time())}
+        if body.get("device_keys"):
+            reply["data"] = [{"code": 200, "device_key": key, "message": "success"} for key in keys]
+        return 200, reply, len(keys), 1
+
+
+class WxPusherHandler(_Handler):
+    path_name = "/api/send/message"
+
+    def handle_push(self, body: Dict[str, Any]) -> Tuple[int, Dict[str, Any], int, int]:
+        uids = body.get("uids") or []
+        topics = body.get("topicIds") or []
+        if not body.get("appToken"):
+            return 200, {"code": 1001, "msg": "appToken不能为空", "success": False}, 0, 0
+        if len(uids) > self.server.behavior.max_uids:
+            return 200, {"code": 1001, "msg": f"uids不能超过{self.server.behavior.max_uids}个", "success": False}, 0, 0
+        data = [{"uid": uid, "topicId": None, "code": 1000, "status": "创建发送任务成功"} for uid in uids]
+        data += [{"uid": None, "topicId": topic, "code": 1000, "status": "创建发送任务成功"} for topic in topics]
+        return 200, {"code": 1000, "msg": "处理成功", "data": data, "success": True}, len(uids) + len(topics), 1
+
+
+def start_bark(behavior: Behavior = None, port: int = 0) -> FakeServer:
+    """
+    启动模拟 Bark 服务端，端口为 0 时随机分配
+    """
+    return FakeServer(BarkHandler, behavior or Behavior(), port).start()
+
+
+def start_wxpusher(behavior: Behavior = None, port: int = 0) -> FakeServer:
+    """
+    启动模拟 WxPusher 服务端，端口为 0 时随机分配
+    """
+    return FakeServer(WxPusherHandler, behavior or Behavior(), port).start()
+
+
+def add_behavior_args(parser: argparse.ArgumentParser):
+    parser.add_argument("--latency", type=float, default=0.02, help="服务端基础延迟（秒）")
+    parser.add_argument("--jitter", type=float, default=0.01, help="延迟随机浮动上限（秒）")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="返回 500 的概率")
+    parser.add_argument("--rate-limit", type=float, default=0, help="每秒最多处理的请求数，0 表示不限制")
+    parser.add_argument("--max-uids", type=int, default=2000, help="WxPusher 单次请求的 UID 上限")
+
+
+def behavior_from_args(args: argparse.Namespace) -> Behavior:
+    return Behavior(latency=args.latency, jitter=args.jitter, error_rate=args.error_rate,
+                    rate_limit=args.rate_limit, max_uids=args.max_uids)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="本地模拟的 Bark 和 WxPusher 服务端")
+    parser.add_argument("--bark-port", type=int, default=18080)
+    parser.add_argument("--wxpusher-port", type=int, default=18081)
+    add_behavior_args(parser)
+    args = parser.parse_args()
+    behavior = behavior_from_args(args)
+    bark = start_bark(behavior, args.bark_port)
+    wxpusher = start_wxpusher(behavior, args.wxpusher_port)
+    print(f"Bark: {bark.url}/push")
+    print(f"WxPusher: {wxpusher.url}/api/send/message")
+    try:
+        while True:
+            time.sleep(10)
+            print(f"Bark {bark.stats()}  WxPusher {wxpusher.stats()}")
+    except KeyboardInterrupt:
+        bark.stop()
+        wxpusher.stop()
+
+
+if __name__ == "__main__":
+    main()
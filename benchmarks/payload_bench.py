@@ -0,0 +1,79 @@
+"""
+请求体编码微基准：对比逐个接收方重新合并、编码完整请求体与公共部分只编码一次后拼接接收方字段的开销。
+
+用法：python benchmarks/payload_bench.py [接收方数量] [重复次数]
+"""
+import json
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+from typing import Callable, List
+from urllib.parse import urlencode
+
+# payload.py 不依赖 MoviePilot，直接从插件目录加载
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "plugins" / "barkmultiusermsg"))
+
+from payload import FormBody, JsonBody  # noqa: E402
+
+PARAMS = {"sound": "minuet", "group": "MoviePilot", "icon": "https://example.com/icon.png", "level": "active"}
+REQ_BODY = {"title": "【电影】下载完成", "body": "沙丘2 (2024) 1080p WEB-DL 已下载完成，共 15.2 GB。" * 8}
+# WxPusher 分片大小
+UID_CHUNK = 100
+
+
+def bark_before(keys: List[str]) -> None:
+    for key in keys:
+        urlencode({**PARAMS, "device_key": key, **REQ_BODY}).encode("utf-8")
+
+
+def bark_after(keys: List[str]) -> None:
+    body = FormBody({**PARAMS, **REQ_BODY}, exclude=("device_key",))
+    for key in keys:
+        body.encode(device_key=key)
+
+
+def wxpusher_before(uids: List[str]) -> None:
+    payload = {"appToken": "AT_xxx", "content": REQ_BODY["body"], "summary": REQ_BODY["title"], "contentType": 1}
+    for i in range(0, len(uids), UID_CHUNK):
+        json.dumps({**payload, "uids": uids[i:i + UID_CHUNK]}).encode("utf-8")
+
+
+def wxpusher_after(uids: List[str]) -> None:
+    body = JsonBody({"appToken": "AT_xxx", "content": REQ_BODY["body"], "summary": REQ_BODY["title"],
+                     "contentType": 1})
+    for i in range(0, len(uids), UID_CHUNK):
+        body.encode(uids=uids[i:i + UID_CHUNK])
+
+
+def measure(func: Callable[[List[str]], None], recipients: List[str], repeat: int):
+    """
+    :return: 每个接收方的耗时（微秒）、单次运行的峰值内存（KiB）
+    """
+    func(recipients)
+    start = time.perf_counter()
+    for _ in range(repeat):
+        func(recipients)
+    cpu = (time.perf_counter() - start) / repeat / len(recipients) * 1e6
+
+    tracemalloc.start()
+    func(recipients)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return cpu, peak / 1024
+
+
+def main():
+    total = int(sys.argv[1]) if len(sys.argv) > 1 else 1000
+    repeat = int(sys.argv[2]) if len(sys.argv) > 2 else 20
+    recipients = [f"key{i:06d}xxxxxxxxxxxxxx" for i in range(total)]
+    print(f"接收方：{total}，重复：{repeat}")
+    print(f"{'场景':<12}{'优化前 微秒/接收方':>20}{'优化后 微秒/接收方':>20}{'优化前 峰值KiB':>16}{'优化后 峰值KiB':>16}")
+    for name, before, after in (("Bark", bark_before, bark_after), ("WxPusher", wxpusher_before, wxpusher_after)):
+        cpu_before, peak_before = measure(before, recipients, repeat)
+        cpu_after, peak_after = measure(after, recipients, repeat)
+        print(f"{name:<12}{cpu_before:>20.2f}{cpu_after:>20.2f}{peak_before:>16.1f}{peak_after:>16.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,152 @@
+"""
+插件吞吐压测：启动本地模拟服务端，用合成的 NoticeMessage 事件驱动 BarkMultiUserMsg.send
+和 WxPusherMultUserMsg.send，输出每秒送达数、单条消息 p50/p99 耗时和峰值内存。
+
+需要在 MoviePilot 后端环境中运行（插件依赖 app 包）：
+    PYTHONPATH=/path/to/MoviePilot python benchmarks/push_bench.py --recipients 1,100,1000,10000
+
+服务端行为参数与 fake_servers.py 相同，如 --latency 0.05 --error-rate 0.01 --rate-limit 200。
+"""
+import argparse
+import resource
+import statistics
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+from typing import Any, Dict, List
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from fake_servers import FakeServer, add_behavior_args, behavior_from_args, start_bark, start_wxpusher  # noqa: E402
+
+from app.core.event import Event  # noqa: E402
+from app.schemas.types import EventType, NotificationType  # noqa: E402
+from plugins.barkmultiusermsg import BarkMultiUserMsg  # noqa: E402
+from plugins.wxpushermultusermsg import WxPusherMultUserMsg  # noqa: E402
+
+MESSAGE_TYPE = NotificationType.SiteMessage
+
+
+def _plugin(cls: type):
+    """
+    不经过插件管理器直接创建插件实例，压测时不需要数据库
+    """
+    return cls.__new__(cls)
+
+
+def bark_plugin(server: FakeServer, recipients: int, args: argparse.Namespace) -> BarkMultiUserMsg:
+    plugin = _plugin(BarkMultiUserMsg)
+    plugin.init_plugin({
+        "enabled": True,
+        "server": server.url,
+        "apikey": "\n".join(f"user{i}:key{i:06d}" for i in range(recipients)),
+        "msgtypes": [MESSAGE_TYPE.name],
+        "concurrency": args.concurrency,
+        "timeout": 600,
+        "batch": args.batch,
+        "batch_size": args.batch_size,
+        "pool_size": args.concurrency,
+        "async_send": False,
+        "breaker": False
+    })
+    return plugin
+
+
+def wxpusher_plugin(server: FakeServer, recipients: int, args: argparse.Namespace) -> WxPusherMultUserMsg:
+    plugin = _plugin(WxPusherMultUserMsg)
+    plugin.api_url = f"{server.url}/api/send/message"
+    plugin.init_plugin({
+        "enabled": True,
+        "appToken": "AT_benchmark",
+        "uids": ",".join(f"UID_{i:06d}" for i in range(recipients)),
+        "msgtypes": [MESSAGE_TYPE.name],
+        "chunk_workers": args.concurrency,
+        "pool_size": args.concurrency,
+        "async_send": False,
+        "breaker": False
+    })
+    return plugin
+
+
+def percentile(values: List[float], pct: float) -> float:
+    """
+    最近秩百分位
+    """
+    ordered = sorted(values)
+    return ordered[min(int(len(ordered) * pct / 100), len(ordered) - 1)]
+
+
+def run(name: str, plugin: Any, server: FakeServer, recipients: int, messages: int) -> Dict[str, Any]:
+    """
+    逐条发送消息，统计耗时、送达数和内存
+    """
+    latencies = []
+    before = server.stats()
+    tracemalloc.start()
+    start = time.perf_counter()
+    for i in range(messages):
+        event = Event(EventType.NoticeMessage, {
+            "type": MESSAGE_TYPE,
+            "title": f"压测消息 {i}",
+            "text": f"第 {i} 条压测消息，共 {recipients} 个接收方"
+        })
+        sent = time.perf_counter()
+        plugin.send(event)
+        latencies.append(time.perf_counter() - sent)
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    plugin.stop_service()
+    after = server.stats()
+    delivered = after["recipients"] - before["recipients"]
+    return {
+        "provider": name,
+        "recipients": recipients,
+        "messages": messages,
+        "requests": after["requests"] - before["requests"],
+        "errors": after["errors"] - before["errors"] + after["throttled"] - before["throttled"],
+        "delivered_per_sec": delivered / elapsed if elapsed else 0,
+        "p50_ms": statistics.median(latencies) * 1000,
+        "p99_ms": percentile(latencies, 99) * 1000,
+        "peak_mib": peak / 1024 / 1024
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Bark / WxPusher 插件离线压测")
+    parser.add_argument("--provider", choices=("bark", "wxpusher", "all"), default="all")
+    parser.add_argument("--recipients", default="1,10,100,1000,10000", help="逗号分隔的接收方数量")
+    parser.add_argument("--messages", type=int, default=20, help="每轮发送的消息数")
+    parser.add_argument("--concurrency", type=int, default=8, help="Bark 并发数 / WxPusher 分片并发数")
+    parser.add_argument("--batch", action="store_true", help="Bark 使用 device_keys 批量推送")
+    parser.add_argument("--batch-size", type=int, default=100)
+    add_behavior_args(parser)
+    args = parser.parse_args()
+
+    behavior = behavior_from_args(args)
+    servers = {"bark": start_bark(behavior), "wxpusher": start_wxpusher(behavior)}
+    factories = {"bark": bark_plugin, "wxpusher": wxpusher_plugin}
+    providers = ("bark", "wxpusher") if args.provider == "all" else (args.provider,)
+
+    print(f"{'服务':<10}{'接收方':>8}{'消息':>6}{'请求':>8}{'失败':>6}{'送达/秒':>12}{'p50(ms)':>10}{'p99(ms)':>10}"
+          f"{'峰值内存(MiB)':>14}")
+    try:
+        for provider in providers:
+            for recipients in (int(n) for n in args.recipients.split(",") if n.strip()):
+                server = servers[provider]
+                plugin = factories[provider](server, recipients, args)
+                result = run(provider, plugin, server, recipients, args.messages)
+                print(f"{result['provider']:<10}{result['recipients']:>8}{result['messages']:>6}"
+                      f"{result['requests']:>8}{result['errors']:>6}{result['delivered_per_sec']:>12.1f}"
+                      f"{result['p50_ms']:>10.1f}{result['p99_ms']:>10.1f}{result['peak_mib']:>14.2f}")
+    finally:
+        for server in servers.values():
+            server.stop()
+    # 进程峰值常驻内存，Linux 单位为 KiB
+    print(f"进程峰值常驻内存：{resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024:.1f} MiB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,309 @@
+"""
+长时间浸泡测试：启动本地模拟服务端，持续向 BarkMultiUserMsg 和 WxPusherMultUserMsg 投放 NoticeMessage 事件，
+并定期以变化的接收方和参数重新加载配置，按间隔采样常驻内存（RSS）和 tracemalloc 统计，
+预热结束后内存增长超过阈值时以非零状态退出，并输出增长最多的分配位置。
+
+需要在 MoviePilot 后端环境中运行（插件依赖 app 包）：
+    PYTHONPATH=/path/to/MoviePilot python benchmarks/soak.py --duration 14400 --rate 20 --reload-interval 60
+
+事件流默认合成，也可以用 --replay 回放记录的事件，每行一个 JSON，username 与 NoticeMessage 事件相同，
+可以是用户名、组名或用户名列表，省略时发送给所有用户：
+    {"title": "...", "text": "...", "type": "SiteMessage", "username": "user1"}
+服务端行为参数与 fake_servers.py 相同，如 --latency 0.05 --error-rate 0.01 --rate-limit 200。
+"""
+import argparse
+import itertools
+import json
+import os
+import random
+import resource
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from fake_servers import FakeServer, add_behavior_args, behavior_from_args, start_bark, start_wxpusher  # noqa: E402
+
+from app.core.event import Event  # noqa: E402
+from app.schemas.types import EventType, NotificationType  # noqa: E402
+from plugins.barkmultiusermsg import BarkMultiUserMsg  # noqa: E402
+from plugins.wxpushermultusermsg import WxPusherMultUserMsg  # noqa: E402
+
+MESSAGE_TYPE = NotificationType.SiteMessage
+# 每次重新加载轮换的接收方数量，模拟用户增删
+CHURN = 10
+MIB = 1024 * 1024
+
+
+def rss() -> float:
+    """
+    当前常驻内存（字节），非 Linux 平台退化为进程峰值
+    """
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+def _plugin(cls: type):
+    """
+    不经过插件管理器直接创建插件实例，测试时不需要数据库
+    """
+    return cls.__new__(cls)
+
+
+def bark_config(server: FakeServer, recipients: int, generation: int) -> Dict[str, Any]:
+    """
+    第 N 次加载的 Bark 配置：接收方按代数轮换，队列和去重参数交替变化
+    """
+    first = generation * CHURN
+    return {
+        "enabled": True,
+        "server": server.url,
+        "apikey": "\n".join(f"user{i}:key{i:06d}" for i in range(first, first + recipients)),
+        "groups": f"all:{','.join(f'user{i}' for i in range(first, first + min(recipients, 50)))}",
+        "msgtypes": [MESSAGE_TYPE.name],
+        "concurrency": 4,
+        "async_send": True,
+        "queue_workers": 2 + generation % 2,
+        "dedup": True,
+        "dedup_window": 60 + generation % 5,
+        "coalesce": generation % 3 == 0,
+        "breaker": True
+    }
+
+
+def wxpusher_config(server: FakeServer, recipients: int, generation: int) -> Dict[str, Any]:
+    """
+    第 N 次加载的 WxPusher 配置：用户名映射和纯UID按代数轮换，队列和去重参数交替变化
+    """
+    first = generation * CHURN
+    named = [f"user{i}:UID_{i:06d}" for i in range(first, first + recipients // 2)]
+    pure = [f"UID_P{i:06d}" for i in range(first, first + recipients - len(named))]
+    return {
+        "enabled": True,
+        "appToken": "AT_soak",
+        "uids": ",".join(named + pure),
+        "msgtypes": [MESSAGE_TYPE.name],
+        "chunk_workers": 4,
+        "async_send": True,
+        "queue_workers": 2 + generation % 2,
+        "dedup": True,
+        "dedup_window": 60 + generation % 5,
+        "coalesce": generation % 3 == 0,
+        "breaker": True
+    }
+
+
+def synthetic_events(recipients: int) -> Iterator[Dict[str, Any]]:
+    """
+    合成事件流：标题和内容不断变化，部分消息重复以触发去重，部分指定单个用户
+    """
+    for i in itertools.count():
+        yield {
+            "type": MESSAGE_TYPE.name,
+            "title": f"浸泡测试 {i % 1000 if i % 7 else 0}",
+            "text": f"第 {i} 条消息 " + "内容" * random.randint(1, 200),
+            "username": f"user{random.randrange(recipients)}" if i % 5 == 0 else None
+        }
+
+
+def replay_events(path: Path) -> Iterator[Dict[str, Any]]:
+    """
+    循环回放记录的事件
+    """
+    events = [json.loads(line) for line in path.read_text(encoding="utf-8").splitlines() if line.strip()]
+    if not events:
+        raise SystemExit(f"{path} 中没有事件")
+    return itertools.cycle(events)
+
+
+def to_event(data: Dict[str, Any]) -> Event:
+    msg_type = NotificationType[data["type"]] if data.get("type") else MESSAGE_TYPE
+    return Event(EventType.NoticeMessage, {**data, "type": msg_type})
+
+
+class Sampler:
+    """
+    内存采样：记录 RSS 和 tracemalloc 当前值，预热结束时保存基线快照
+    """
+
+    def __init__(self, top: int):
+        self.top = top
+        self.samples: List[Dict[str, float]] = []
+        self.baseline: Optional[Dict[str, float]] = None
+        self._snapshot: Optional[tracemalloc.Snapshot] = None
+
+    def sample(self, elapsed: float, events: int) -> Dict[str, float]:
+        traced, _ = tracemalloc.get_traced_memory()
+        sample = {"elapsed": elapsed, "events": events, "rss": rss(), "traced": traced}
+        self.samples.append(sample)
+        return sample
+
+    def mark_baseline(self, sample: Dict[str, float]):
+        self.baseline = sample
+        self._snapshot = tracemalloc.take_snapshot()
+
+    def growth(self, sample: Dict[str, float]) -> Dict[str, float]:
+        """
+        相对基线的增长（MiB）
+        """
+        if not self.baseline:
+            return {"rss": 0.0, "traced": 0.0}
+        return {key: (sample[key] - self.baseline[key]) / MIB for key in ("rss", "traced")}
+
+    def slope(self) -> float:
+        """
+        基线之后 RSS 的最小二乘斜率（MiB/小时），用于区分持续泄漏和一次性增长
+        """
+        points = [s for s in self.samples if self.baseline and s["elapsed"] >= self.baseline["elapsed"]]
+        if len(points) < 2:
+            return 0.0
+        mean_t = sum(p["elapsed"] for p in points) / len(points)
+        mean_m = sum(p["rss"] for p in points) / len(points)
+        var = sum((p["elapsed"] - mean_t) ** 2 for p in points)
+        if not var:
+            return 0.0
+        cov = sum((p["elapsed"] - mean_t) * (p["rss"] - mean_m) for p in points)
+        return cov / var * 3600 / MIB
+
+    def top_growth(self) -> List[str]:
+        """
+        相对基线增长最多的分配位置
+        """
+        if not self._snapshot:
+            return []
+        snapshot = tracemalloc.take_snapshot().filter_traces((
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+        ))
+        stats = snapshot.compare_to(self._snapshot, "lineno")
+        return [str(stat) for stat in stats[:self.top] if stat.size_diff > 0]
+
+
+def exceeded(growth: Dict[str, float], max_rss_growth: float, max_traced_growth: float) -> bool:
+    """
+    RSS 或 tracemalloc 的增长是否超过阈值（MiB）
+    """
+    return growth["rss"] > max_rss_growth or growth["traced"] > max_traced_growth
+
+
+def soak(plugins: Dict[str, Any], configs: Dict[str, Callable[[int], Dict[str, Any]]],
+         events: Iterator[Dict[str, Any]], args: argparse.Namespace) -> Sampler:
+    """
+    按速率投放事件，定期重新加载配置和采样内存
+    """
+    sampler = Sampler(args.top)
+    interval = 1 / args.rate if args.rate > 0 else 0
+    start = time.monotonic()
+    next_reload = start + args.reload_interval
+    next_sample = start
+    generation = 0
+    sent = 0
+    print(f"{'时间(s)':>8}{'事件':>10}{'重载':>6}{'RSS(MiB)':>10}{'traced(MiB)':>12}{'RSS增长':>10}{'traced增长':>12}")
+    while True:
+        now = time.monotonic()
+        elapsed = now - start
+        if elapsed >= args.duration:
+            break
+        if now >= next_sample:
+            sample = sampler.sample(elapsed, sent)
+            if not sampler.baseline and elapsed >= args.warmup:
+                sampler.mark_baseline(sample)
+            growth = sampler.growth(sample)
+            print(f"{elapsed:>8.0f}{sent:>10}{generation:>6}{sample['rss'] / MIB:>10.1f}"
+                  f"{sample['traced'] / MIB:>12.2f}{growth['rss']:>10.2f}{growth['traced']:>12.2f}", flush=True)
+            next_sample = now + args.sample_interval
+        if args.reload_interval and now >= next_reload:
+            generation += 1
+            for name, plugin in plugins.items():
+                plugin.init_plugin(configs[name](generation))
+            next_reload = now + args.reload_interval
+        event = to_event(next(events))
+        for plugin in plugins.values():
+            plugin.send(event)
+        sent += 1
+        if interval:
+            time.sleep(max(start + sent * interval - time.monotonic(), 0))
+    sampler.sample(time.monotonic() - start, sent)
+    if not sampler.baseline:
+        print("运行时长短于预热时间，未建立基线，不判断内存增长")
+    return sampler
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Bark / WxPusher 插件长时间浸泡测试，检测内存增长")
+    parser.add_argument("--provider", choices=("bark", "wxpusher", "all"), default="all")
+    parser.add_argument("--duration", type=float, default=3600, help="运行时长（秒）")
+    parser.add_argument("--rate", type=float, default=20, help="每秒投放的事件数，0 表示不限速")
+    parser.add_argument("--recipients", type=int, default=200, help="每次加载配置的接收方数量")
+    parser.add_argument("--reload-interval", type=float, default=60, help="重新加载配置的间隔（秒），0 表示不重新加载")
+    parser.add_argument("--sample-interval", type=float, default=30, help="内存采样间隔（秒）")
+    parser.add_argument("--warmup", type=float, default=300, help="预热时长（秒），之后的第一次采样作为基线")
+    parser.add_argument("--max-rss-growth", type=float, default=50, help="允许的 RSS 增长（MiB）")
+    parser.add_argument("--max-traced-growth", type=float, default=20, help="允许的 tracemalloc 增长（MiB）")
+    parser.add_argument("--frames", type=int, default=1, help="tracemalloc 保留的调用栈深度")
+    parser.add_argument("--top", type=int, default=15, help="输出增长最多的分配位置数")
+    parser.add_argument("--replay", type=Path, help="回放的事件文件，每行一个 JSON")
+    parser.add_argument("--output", type=Path, help="采样结果写入的 JSON 文件")
+    add_behavior_args(parser)
+    args = parser.parse_args()
+
+    behavior = behavior_from_args(args)
+    servers = {"bark": start_bark(behavior), "wxpusher": start_wxpusher(behavior)}
+    configs = {
+        "bark": lambda generation: bark_config(servers["bark"], args.recipients, generation),
+        "wxpusher": lambda generation: wxpusher_config(servers["wxpusher"], args.recipients, generation)
+    }
+    providers = ("bark", "wxpusher") if args.provider == "all" else (args.provider,)
+    events = replay_events(args.replay) if args.replay else synthetic_events(args.recipients)
+
+    tracemalloc.start(args.frames)
+    plugins: Dict[str, Any] = {}
+    try:
+        for provider in providers:
+            plugin = _plugin(BarkMultiUserMsg if provider == "bark" else WxPusherMultUserMsg)
+            if provider == "wxpusher":
+                plugin.api_url = f"{servers['wxpusher'].url}/api/send/message"
+            plugin.init_plugin(configs[provider](0))
+            plugins[provider] = plugin
+        sampler = soak(plugins, configs, events, args)
+        top = sampler.top_growth()
+    finally:
+        for plugin in plugins.values():
+            plugin.stop_service()
+        for server in servers.values():
+            server.stop()
+        tracemalloc.stop()
+
+    final = sampler.samples[-1]
+    growth = sampler.growth(final)
+    print(f"\nRSS 增长 {growth['rss']:.2f} MiB（上限 {args.max_rss_growth}），"
+          f"tracemalloc 增长 {growth['traced']:.2f} MiB（上限 {args.max_traced_growth}），"
+          f"RSS 趋势 {sampler.slope():.2f} MiB/小时")
+    for server_name, server in servers.items():
+        print(f"{server_name} 服务端：{server.stats()}")
+    if top:
+        print("\n增长最多的分配位置：")
+        for line in top:
+            print(f"  {line}")
+    if args.output:
+        args.output.write_text(json.dumps({
+            "args": {k: str(v) for k, v in vars(args).items()},
+            "baseline": sampler.baseline,
+            "samples": sampler.samples,
+            "top_growth": top
+        }, ensure_ascii=False, indent=2), encoding="utf-8")
+
+    if exceeded(growth, args.max_rss_growth, args.max_traced_growth):
+        print("内存增长超过阈值")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,11 +1,47 @@
-from typing import Any, List, Dict, Tuple, Optional
-from urllib.parse import parse_qs
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor, wait
+from contextlib import nullcontext
+from typing import Any, List, Dict, Mapping, NamedTuple, Sequence, Tuple, Optional, Union
+from urllib.parse import urlparse
+
+from fastapi.responses import PlainTextResponse
+from requests import Response
 
 from app.core.event import eventmanager, Event
 from app.log import logger
 from app.plugins import _PluginBase
 from app.schemas.types import EventType, NotificationType
-from app.utils.http import RequestUtils
+from .breaker import CircuitBreaker, CircuitOpenError, STATE_OPEN
+from .cache import TTLCache, content_key
+from .coalesce import Coalescer, build_digest
+from .deliverylog import DeliveryLog, LOG_VERBOSE, LOG_STRUCTURED
+from .dispatch import DispatchQueue, OVERFLOW_DROP_OLDEST, OVERFLOW_DROP_NEWEST, OVERFLOW_BLOCK
+from .history import DeliveryHistory, parse_time
+from .metrics import CONTENT_TYPE, DeliveryMetrics
+from .outbox import Outbox
+from .payload import FormBody, JsonBody
+from .quiet import DeferredScheduler, QuietHours, parse_quiet_hours
+from .ratelimit import RateLimiter, overloaded
+from .reloader import Reloader
+from .routing import RoutingTable
+from .servers import ServerPool, SERVER_ASSIGN, SERVER_SHARD, parse_assignments, parse_servers
+from .session import SessionPool
+from .tracing import Tracer, decode_json, phase
+from .transport import AsyncTransport, TRANSPORT_ASYNC, TRANSPORT_BLOCKING, async_available
+
+
+class PushResult(NamedTuple):
+    """
+    单个用户的推送结果
+    """
+    ok: bool
+    # 服务端返回的说明或失败原因
+    message: str
+    # 服务端返回的业务码，未获取到业务响应时为 HTTP 状态码，未获取到响应时为空
+    code: Any = None
+    # 服务端返回的消息ID，未返回时为请求中的 id 参数
+    message_id: Any = None
 
 
 class BarkMultiUserMsg(_PluginBase):
@@ -16,7 +52,7 @@ class BarkMultiUserMsg(_PluginBase):
     # 插件图标
     plugin_icon = "Bark_A.png"
     # 插件版本
-    plugin_version = "1.4"
+    plugin_version = "3.6"
     # 插件作者
     plugin_author = "weimh"
     # 作者主页
@@ -33,43 +69,560 @@ class BarkMultiUserMsg(_PluginBase):
     _onlyonce = False
     _server = None
     _apikey = None
+    _groups = None
     _params = None
     _msgtypes = []
-    _user_keys = {}  # 用户ID到密钥的映射
+    _high_msgtypes = []  # 高优先级消息类型
+    _bulk_msgtypes = []  # 低优先级（批量）消息类型
+    _routes: Optional[RoutingTable] = None  # 发送路由表
+    _server_mode = SERVER_ASSIGN  # 多服务器的分配方式
+    _user_servers = None  # 用户指定的服务器
+    _shared_servers = False  # 各服务器是否共享设备注册数据
+    _health_interval = 30  # 健康检查间隔（秒）
+    _servers: Optional[ServerPool] = None  # 服务器列表及健康状态
+    _concurrency = 8  # 广播并发数
+    _timeout = 30  # 单次广播截止时间（秒）
+    _batch = False  # 是否使用 device_keys 批量推送
+    _batch_size = 100  # 单次批量推送的最大设备数
+    _executor: Optional[ThreadPoolExecutor] = None
+    _pool_size = 10  # 每个主机的连接池大小
+    _keepalive = True  # 是否保持长连接
+    _connect_timeout = 5  # 连接超时（秒）
+    _read_timeout = 20  # 读取超时（秒）
+    _transport = TRANSPORT_BLOCKING  # 传输方式
+    _pool: Union[SessionPool, AsyncTransport, None] = None
+    _async_send = True  # 是否异步发送
+    _queue_size = 1000  # 发送队列长度
+    _queue_workers = 2  # 发送线程数
+    _overflow = OVERFLOW_DROP_OLDEST  # 队列满时的处理策略
+    _block_timeout = 5  # 阻塞策略下的最长等待时间（秒）
+    _queue: Optional[DispatchQueue] = None
+    _coalesce = False  # 是否合并突发消息
+    _coalesce_window = 10  # 合并窗口（秒）
+    _coalesce_max_items = 20  # 合并条数上限，达到后立即发送
+    _coalesce_max_delay = 60  # 最大延迟（秒）
+    _coalescer: Optional[Coalescer] = None
+    _dedup = False  # 是否忽略重复消息
+    _dedup_window = 300  # 去重时间窗口（秒）
+    _dedup_size = 10000  # 去重缓存容量
+    _dedup_cache: Optional[TTLCache] = None
+    _rate_limit = False  # 是否限流
+    _rate = 600  # 服务端全局速率（条/分钟）
+    _burst = 20  # 服务端全局突发数
+    _recipient_rate = 30  # 单设备速率（条/分钟）
+    _recipient_burst = 5  # 单设备突发数
+    _limiter: Optional[RateLimiter] = None
+    _outbox_enabled = False  # 是否启用失败重试
+    _retry_max = 8  # 最大重试次数
+    _retry_delay = 30  # 首次重试间隔（秒）
+    _outbox: Optional[Outbox] = None
+    _history_enabled = True  # 是否记录投递历史
+    _history_size = 10000  # 内存中保留的投递记录数
+    _history_disk = False  # 淘汰的记录是否写入磁盘
+    _history_days = 7  # 磁盘记录保留天数
+    _history: Optional[DeliveryHistory] = None
+    _quiet_hours = None  # 免打扰时段，每行一个 用户名:开始-结束
+    _quiet_summary = True  # 免打扰结束后每个用户的消息合并为一条摘要
+    _quiet_batch_size = 20  # 免打扰结束后每批释放的用户数
+    _quiet_batch_interval = 1  # 批次间隔（秒）
+    _quiet: Optional[QuietHours] = None
+    _scheduler: Optional[DeferredScheduler] = None
+    _breaker_enabled = True  # 是否启用熔断
+    _breaker_threshold = 5  # 连续失败次数阈值
+    _breaker_reset = 60  # 熔断后的探测间隔（秒）
+    _breaker: Optional[CircuitBreaker] = None
+    _metrics: Optional[DeliveryMetrics] = None
+    _trace_enabled = False  # 是否记录各阶段耗时
+    _trace_size = 20  # 保留最慢的请求数
+    _tracer: Optional[Tracer] = None
+    _log_mode = LOG_VERBOSE  # 日志模式
+    _log_sample_rate = 10  # 结构化日志中成功投递的采样比例（%）
+    _log_body_limit = 50  # 日志中标题和内容保留的字数，0 表示不输出内容
+    _log: Optional[DeliveryLog] = None
+    _reloader: Optional[Reloader] = None
 
     def init_plugin(self, config: dict = None):
+        if not config:
+            self.stop_service()
+            return
+        # 保存配置时只调整变化的部分，连接池、发送队列和缓存保留
+        if not self._reloader:
+            self._reloader = Reloader()
+        with self._reloader.lock:
+            self._reloader.begin()
+            self._load_config(config)
+            if self._enabled:
+                self._apply_config()
+                if self._reloader.summary():
+                    logger.info(f"Bark配置已加载，更新：{', '.join(self._reloader.summary())}")
+            else:
+                # 未启用时不创建线程池、发送队列、发件箱、延后调度和健康检查等后台线程
+                self.stop_service()
+
+        if self._onlyonce:
+            self._onlyonce = False
+            # 发送测试消息，未启用时发送组件未创建，不发送
+            if self._enabled:
+                self._send("Bark消息测试通知", "Bark消息通知插件已启用")
+            config['onlyonce'] = False
+            self.update_config(config)
+
+    def _load_config(self, config: Optional[dict]):
+        """
+        读取配置，生成新的路由表后整体替换，发送时读到的总是一份完整的配置
+        """
         if config:
             self._enabled = config.get("enabled")
             self._onlyonce = config.get("onlyonce")
             self._msgtypes = config.get("msgtypes") or []
+            self._high_msgtypes = config.get("high_msgtypes") or []
+            self._bulk_msgtypes = config.get("bulk_msgtypes") or []
             self._server = config.get("server")
             self._apikey = config.get("apikey")
             self._params = config.get("params")
+            self._groups = config.get("groups")
+            self._server_mode = config.get("server_mode") or SERVER_ASSIGN
+            self._user_servers = config.get("user_servers")
+            self._shared_servers = config.get("shared_servers") or False
+            self._health_interval = self._to_int(config.get("health_interval"), 30)
+            self._concurrency = self._to_int(config.get("concurrency"), 8)
+            self._timeout = self._to_int(config.get("timeout"), 30)
+            self._batch = config.get("batch") or False
+            self._batch_size = self._to_int(config.get("batch_size"), 100)
+            self._pool_size = self._to_int(config.get("pool_size"), 10)
+            self._keepalive = config.get("keepalive", True)
+            self._connect_timeout = self._to_int(config.get("connect_timeout"), 5)
+            self._read_timeout = self._to_int(config.get("read_timeout"), 20)
+            self._transport = config.get("transport") or TRANSPORT_BLOCKING
+            self._async_send = config.get("async_send", True)
+            self._queue_size = self._to_int(config.get("queue_size"), 1000)
+            self._queue_workers = self._to_int(config.get("queue_workers"), 2)
+            self._overflow = config.get("overflow") or OVERFLOW_DROP_OLDEST
+            self._block_timeout = self._to_int(config.get("block_timeout"), 5)
+            self._coalesce = config.get("coalesce") or False
+            self._coalesce_window = self._to_int(config.get("coalesce_window"), 10)
+            self._coalesce_max_items = self._to_int(config.get("coalesce_max_items"), 20)
+            self._coalesce_max_delay = self._to_int(config.get("coalesce_max_delay"), 60)
+            self._dedup = config.get("dedup") or False
+            self._dedup_window = self._to_int(config.get("dedup_window"), 300)
+            self._dedup_size = self._to_int(config.get("dedup_size"), 10000)
+            self._rate_limit = config.get("rate_limit") or False
+            self._rate = self._to_int(config.get("rate"), 600)
+            self._burst = self._to_int(config.get("burst"), 20)
+            self._recipient_rate = self._to_int(config.get("recipient_rate"), 30)
+            self._recipient_burst = self._to_int(config.get("recipient_burst"), 5)
+            self._outbox_enabled = config.get("outbox") or False
+            self._retry_max = self._to_int(config.get("retry_max"), 8)
+            self._retry_delay = self._to_int(config.get("retry_delay"), 30)
+            self._history_enabled = config.get("history", True)
+            self._history_size = self._to_int(config.get("history_size"), 10000)
+            self._history_disk = config.get("history_disk") or False
+            self._history_days = self._to_int(config.get("history_days"), 7)
+            self._quiet_hours = config.get("quiet_hours")
+            self._quiet_summary = config.get("quiet_summary", True)
+            self._quiet_batch_size = self._to_int(config.get("quiet_batch_size"), 20)
+            self._quiet_batch_interval = self._to_int(config.get("quiet_batch_interval"), 1)
+            self._breaker_enabled = config.get("breaker", True)
+            self._breaker_threshold = self._to_int(config.get("breaker_threshold"), 5)
+            self._breaker_reset = self._to_int(config.get("breaker_reset"), 60)
+            self._trace_enabled = config.get("trace") or False
+            self._trace_size = self._to_int(config.get("trace_size"), 20)
+            self._log_mode = config.get("log_mode") or LOG_VERBOSE
+            self._log_sample_rate = self._to_non_negative(config.get("log_sample_rate"), 10, 100)
+            self._log_body_limit = self._to_non_negative(config.get("log_body_limit"), 50)
 
-            # 解析用户ID和密钥的映射关系
-            self._user_keys = {}
-            if self._apikey:
-                for line in self._apikey.split():
-                    if ':' in line:
-                        user_id, device_key = line.split(':', 1)
-                        self._user_keys[user_id.strip()] = device_key.strip()
+        # 解析附加参数、消息类型和用户ID到密钥的映射关系，未变化的部分复用上一次的解析结果
+        if self._reloader.changed("routes", self._params, self._apikey, self._groups, tuple(self._msgtypes),
+                                  tuple(self._high_msgtypes), tuple(self._bulk_msgtypes)):
+            routes = RoutingTable.build(params=self._params,
+                                        apikey=self._apikey,
+                                        msgtypes=self._msgtypes,
+                                        high_msgtypes=self._high_msgtypes,
+                                        bulk_msgtypes=self._bulk_msgtypes,
+                                        groups=self._groups,
+                                        previous=self._routes)
+            previous = self._routes or RoutingTable()
+            if routes.user_keys is not previous.user_keys:
+                if routes.user_keys.duplicates:
+                    logger.warn(f"Bark用户密钥配置中有 {routes.user_keys.duplicates} 条重复，已忽略")
+                diff = previous.user_keys.diff(routes.user_keys)
+                if any(diff.values()):
+                    logger.info(f"Bark用户密钥已更新：新增 {len(diff['added'])} 个，移除 {len(diff['removed'])} 个，"
+                                f"变更 {len(diff['changed'])} 个")
+            self._routes = routes
 
-        if self._onlyonce:
-            self._onlyonce = False
-            # 发送测试消息
-            self._send("Bark消息测试通知", "Bark消息通知插件已启用")
-            config['onlyonce'] = False
-            self.update_config(config)
+        # 免打扰时段中的组名展开为组内用户
+        if self._reloader.changed("quiet", self._quiet_hours, self._groups):
+            self._quiet = parse_quiet_hours(self._quiet_hours, self._routes.groups)
+
+    def _apply_config(self):
+        """
+        按配置创建、调整或停止各组件，配置未变化的组件原样保留。
+        组件整体替换，正在发送的消息继续使用已取到的旧组件，旧组件在替换后关闭
+        """
+        reloader = self._reloader
+
+        # 多个服务器时按用户指定或设备密钥分配，后台检查健康状态，共享设备注册时不健康的服务器由其余服务器接替
+        if reloader.changed("servers", self._server, self._server_mode, self._user_servers, self._shared_servers,
+                            self._health_interval, self._connect_timeout):
+            servers = ServerPool(parse_servers(self._server),
+                                 mode=self._server_mode,
+                                 assignments=parse_assignments(self._user_servers),
+                                 interval=self._health_interval,
+                                 timeout=self._connect_timeout,
+                                 name="BarkMultiUserMsg",
+                                 shared=self._shared_servers)
+            servers.start()
+            servers, self._servers = self._servers, servers
+            if servers:
+                servers.stop()
+
+        # 发送日志，结构化模式下每次投递一行并按比例采样
+        if reloader.changed("log", self._log_mode, self._log_sample_rate, self._log_body_limit):
+            self._log = DeliveryLog("bark", mode=self._log_mode,
+                                    sample_rate=self._log_sample_rate,
+                                    body_limit=self._log_body_limit)
+
+        # 发送指标，通过 /metrics 以 Prometheus 格式输出，重新加载时计数保留
+        if not self._metrics:
+            self._metrics = self._init_metrics()
+
+        # 连接参数变化时才重建连接池，已建立的长连接保留
+        if reloader.changed("pool", self._transport, self._pool_size, self._keepalive,
+                            self._connect_timeout, self._read_timeout, self._trace_enabled):
+            pool, self._pool = self._pool, self._create_pool()
+            if pool:
+                pool.close()
+
+        # 记录请求各阶段耗时，保留最慢的若干次
+        if reloader.changed("tracer", self._trace_enabled, self._trace_size):
+            self._tracer = Tracer(size=self._trace_size) if self._trace_enabled else None
+
+        # 并发数大于1时启用线程池广播，旧线程池执行完已提交的任务后退出
+        if reloader.changed("executor", self._concurrency):
+            executor = self._executor
+            self._executor = ThreadPoolExecutor(max_workers=self._concurrency,
+                                                thread_name_prefix="BarkMultiUserMsg") \
+                if self._concurrency > 1 else None
+            if executor:
+                executor.shutdown(wait=False)
+
+        # 同一用户相同内容的消息在窗口期内只发送一次
+        if reloader.changed("dedup", self._dedup, self._dedup_size, self._dedup_window):
+            if self._dedup and self._dedup_cache:
+                self._dedup_cache.configure(maxsize=self._dedup_size, ttl=self._dedup_window)
+            else:
+                self._dedup_cache = TTLCache(maxsize=self._dedup_size, ttl=self._dedup_window) \
+                    if self._dedup else None
+
+        # 按服务端和设备限流，超出速率时延迟发送
+        if reloader.changed("ratelimit", self._rate_limit, self._rate, self._burst,
+                            self._recipient_rate, self._recipient_burst):
+            if self._rate_limit and self._limiter:
+                self._limiter.configure(rate=self._rate / 60, burst=self._burst,
+                                        recipient_rate=self._recipient_rate / 60,
+                                        recipient_burst=self._recipient_burst)
+            else:
+                self._limiter = RateLimiter(rate=self._rate / 60, burst=self._burst,
+                                            recipient_rate=self._recipient_rate / 60,
+                                            recipient_burst=self._recipient_burst) if self._rate_limit else None
+
+        # 服务端连续失败时熔断，直接失败而不再等待连接超时
+        if reloader.changed("breaker", self._breaker_enabled, self._breaker_threshold, self._breaker_reset):
+            if self._breaker_enabled and self._breaker:
+                self._breaker.configure(threshold=self._breaker_threshold, reset_timeout=self._breaker_reset)
+            else:
+                self._breaker = CircuitBreaker(threshold=self._breaker_threshold,
+                                               reset_timeout=self._breaker_reset) if self._breaker_enabled else None
+
+        # 发送失败的消息写入发件箱，按指数退避重试，重启后继续
+        if reloader.changed("outbox", self._outbox_enabled, self._retry_max, self._retry_delay):
+            if self._outbox_enabled and self._outbox:
+                self._outbox.configure(max_attempts=self._retry_max, base_delay=self._retry_delay)
+            elif self._outbox_enabled:
+                self._outbox = Outbox(self.get_data_path() / "outbox.db", self._redeliver,
+                                      name="BarkMultiUserMsg-outbox",
+                                      max_attempts=self._retry_max,
+                                      base_delay=self._retry_delay)
+                self._outbox.start()
+            elif self._outbox:
+                outbox, self._outbox = self._outbox, None
+                outbox.stop()
+
+        # 投递历史，按用户名、消息摘要和时间查询，切换是否落盘时内存中的记录转交给新的实例
+        if reloader.changed("history", self._history_enabled, self._history_size,
+                            self._history_disk, self._history_days):
+            history = self._history
+            if self._history_enabled and history and history.persistent == self._history_disk:
+                history.configure(size=self._history_size, retention_days=self._history_days)
+            else:
+                self._history = DeliveryHistory(size=self._history_size,
+                                                path=self.get_data_path() / "history.db" if self._history_disk else None,
+                                                retention_days=self._history_days,
+                                                name="BarkMultiUserMsg-history") if self._history_enabled else None
+                if history:
+                    if self._history:
+                        history.handover(self._history)
+                    history.close()
+
+        # 异步发送队列，事件处理函数入队后立即返回；调整参数时队列中的消息保留
+        if reloader.changed("queue", self._async_send, self._queue_workers, self._queue_size,
+                            self._overflow, self._block_timeout):
+            if self._async_send and self._queue:
+                self._queue.configure(workers=self._queue_workers,
+                                      maxsize=self._queue_size,
+                                      overflow=self._overflow,
+                                      block_timeout=self._block_timeout)
+            elif self._async_send:
+                self._queue = DispatchQueue(self._send, name="BarkMultiUserMsg",
+                                            workers=self._queue_workers,
+                                            maxsize=self._queue_size,
+                                            overflow=self._overflow,
+                                            block_timeout=self._block_timeout)
+                self._queue.start()
+            elif self._queue:
+                # 关闭异步发送后新消息直接发送，队列中已有的消息发送完再停止
+                queue, self._queue = self._queue, None
+                self._stop_queue(queue)
+
+        # 同一用户同类型的突发消息合并为摘要发送
+        if reloader.changed("coalesce", self._coalesce, self._coalesce_window,
+                            self._coalesce_max_items, self._coalesce_max_delay):
+            if self._coalesce and self._coalescer:
+                self._coalescer.configure(window=self._coalesce_window,
+                                          max_items=self._coalesce_max_items,
+                                          max_delay=self._coalesce_max_delay)
+            elif self._coalesce:
+                self._coalescer = Coalescer(self._flush_digest, name="BarkMultiUserMsg-coalesce",
+                                            window=self._coalesce_window,
+                                            max_items=self._coalesce_max_items,
+                                            max_delay=self._coalesce_max_delay)
+                self._coalescer.start()
+            elif self._coalescer:
+                coalescer, self._coalescer = self._coalescer, None
+                coalescer.stop()
+
+        # 免打扰时段内的消息延后到时段结束后按批释放，重启后继续；取消免打扰时已延后的消息立即释放并停止
+        if reloader.changed("scheduler", bool(self._quiet), self._quiet_batch_size, self._quiet_batch_interval):
+            deferred_db = self.get_data_path() / "deferred.db"
+            if self._scheduler:
+                self._scheduler.configure(batch_size=self._quiet_batch_size,
+                                          batch_interval=self._quiet_batch_interval)
+            elif self._quiet or deferred_db.exists():
+                self._scheduler = DeferredScheduler(deferred_db, self._release_deferred,
+                                                    name="BarkMultiUserMsg-deferred",
+                                                    batch_size=self._quiet_batch_size,
+                                                    batch_interval=self._quiet_batch_interval)
+                self._scheduler.start()
+            if self._scheduler and not self._quiet:
+                scheduler, self._scheduler = self._scheduler, None
+                scheduler.stop(drain=True)
+
+    def _create_pool(self) -> Union[SessionPool, AsyncTransport]:
+        """
+        按传输方式创建连接池
+        """
+        # 异步传输在插件自己的事件循环中发送，同一主机的请求复用 HTTP/2 连接
+        if self._transport == TRANSPORT_ASYNC and not async_available():
+            logger.warn("Bark异步传输需要安装 httpx，已改为阻塞传输")
+        if self._transport == TRANSPORT_ASYNC and async_available():
+            return AsyncTransport(pool_size=self._pool_size,
+                                  keepalive=self._keepalive,
+                                  connect_timeout=self._connect_timeout,
+                                  read_timeout=self._read_timeout,
+                                  name="BarkMultiUserMsg")
+        # 按主机复用的长连接池
+        return SessionPool(pool_size=self._pool_size,
+                           keepalive=self._keepalive,
+                           connect_timeout=self._connect_timeout,
+                           read_timeout=self._read_timeout,
+                           trace=self._trace_enabled)
 
     def get_state(self) -> bool:
         return self._enabled and (True if self._server and self._apikey else False)
 
+    @staticmethod
+    def _to_int(value: Any, default: int) -> int:
+        """
+        转换数值配置，非法值使用默认值
+        """
+        try:
+            return max(int(value), 1)
+        except (TypeError, ValueError):
+            return default
+
+    @staticmethod
+    def _to_non_negative(value: Any, default: int, maximum: Optional[int] = None) -> int:
+        """
+        转换允许为 0 的数值配置，负数按 0 处理，超过上限时取上限，非法值使用默认值
+        """
+        try:
+            number = max(int(value), 0)
+        except (TypeError, ValueError):
+            return default
+        return min(number, maximum) if maximum is not None else number
+
     @staticmethod
     def get_command() -> List[Dict[str, Any]]:
         pass
 
     def get_api(self) -> List[Dict[str, Any]]:
-        pass
+        return [{
+            "path": "/pool",
+            "endpoint": self.pool_stats,
+            "methods": ["GET"],
+            "summary": "连接池状态",
+            "description": "查询Bark推送连接池的连接数和复用率"
+        }, {
+            "path": "/dedup",
+            "endpoint": self.dedup_stats,
+            "methods": ["GET"],
+            "summary": "去重缓存状态",
+            "description": "查询重复消息去重缓存的容量和命中情况"
+        }, {
+            "path": "/ratelimit",
+            "endpoint": self.ratelimit_stats,
+            "methods": ["GET"],
+            "summary": "限流状态",
+            "description": "查询Bark服务端当前速率及延迟发送次数"
+        }, {
+            "path": "/outbox",
+            "endpoint": self.outbox_items,
+            "methods": ["GET"],
+            "summary": "发件箱",
+            "description": "查询等待重试和已转为死信的Bark消息"
+        }, {
+            "path": "/deferred",
+            "endpoint": self.deferred_items,
+            "methods": ["GET"],
+            "summary": "免打扰延后消息",
+            "description": "查询免打扰时段内延后发送的Bark消息及其释放时间"
+        }, {
+            "path": "/queue",
+            "endpoint": self.queue_stats,
+            "methods": ["GET"],
+            "summary": "发送队列状态",
+            "description": "查询Bark异步发送队列的深度、排队延迟及消息合并情况"
+        }, {
+            "path": "/metrics",
+            "endpoint": self.metrics,
+            "methods": ["GET"],
+            "summary": "Prometheus指标",
+            "description": "以Prometheus文本格式输出发送数、请求耗时、队列深度、重试次数和服务端错误码"
+        }, {
+            "path": "/history",
+            "endpoint": self.delivery_history,
+            "methods": ["GET"],
+            "summary": "投递历史",
+            "description": "按用户名、消息摘要、时间范围和标题关键字查询Bark投递记录，时间格式为 YYYY-MM-DD HH:MM:SS"
+        }, {
+            "path": "/servers",
+            "endpoint": self.server_states,
+            "methods": ["GET"],
+            "summary": "服务器状态",
+            "description": "查询各Bark服务器的健康检查结果和指定的用户数"
+        }, {
+            "path": "/traces",
+            "endpoint": self.slow_traces,
+            "methods": ["GET"],
+            "summary": "慢请求跟踪",
+            "description": "查询最慢的Bark请求在限流、DNS、连接、TLS、等待响应和解析JSON各阶段的耗时"
+        }]
+
+    def metrics(self) -> PlainTextResponse:
+        """
+        输出Prometheus指标
+        """
+        return PlainTextResponse(self._metrics.render() if self._metrics else "", media_type=CONTENT_TYPE)
+
+    def _init_metrics(self) -> DeliveryMetrics:
+        """
+        创建发送指标，队列深度、发件箱和熔断状态在采集时读取
+        """
+        metrics = DeliveryMetrics("bark")
+        metrics.gauge("queue_depth", "异步发送队列中等待的消息数",
+                      lambda: self._queue.stats()["depth"] if self._queue else 0)
+        metrics.gauge("outbox_messages", "发件箱中等待重试和死信的消息数",
+                      lambda: {(state,): count for state, count in self._outbox.stats().items()} if self._outbox else {},
+                      labelnames=("state",))
+        metrics.gauge("circuit_open", "服务器是否处于熔断状态",
+                      lambda: {(host,): int(state["state"] == STATE_OPEN)
+                               for host, state in self._breaker.states().items()} if self._breaker else {},
+                      labelnames=("provider",))
+        return metrics
+
+    def delivery_history(self, username: str = None, digest: str = None, since: str = None, until: str = None,
+                         keyword: str = None, limit: int = 100) -> Dict[str, Any]:
+        """
+        查询投递历史
+        """
+        if not self._history:
+            return {"code": 0, "data": {"records": []}}
+        try:
+            records = self._history.query(user=username, digest=digest, since=parse_time(since),
+                                          until=parse_time(until), keyword=keyword, limit=limit)
+        except ValueError as err:
+            return {"code": 1, "msg": str(err)}
+        return {"code": 0, "data": {**self._history.stats(), "records": records}}
+
+    def server_states(self) -> Dict[str, Any]:
+        """
+        查询各服务器的健康状态
+        """
+        return {"code": 0, "data": self._servers.states() if self._servers else {}}
+
+    def slow_traces(self) -> Dict[str, Any]:
+        """
+        查询最慢的请求跟踪
+        """
+        return {"code": 0, "data": self._tracer.slowest() if self._tracer else []}
+
+    def pool_stats(self) -> Dict[str, Any]:
+        """
+        查询连接池状态
+        """
+        return {"code": 0, "data": self._pool.stats() if self._pool else {}}
+
+    def dedup_stats(self) -> Dict[str, Any]:
+        """
+        查询去重缓存状态
+        """
+        return {"code": 0, "data": self._dedup_cache.stats() if self._dedup_cache else {}}
+
+    def ratelimit_stats(self) -> Dict[str, Any]:
+        """
+        查询限流状态
+        """
+        return {"code": 0, "data": self._limiter.stats() if self._limiter else {}}
+
+    def outbox_items(self) -> Dict[str, Any]:
+        """
+        查询发件箱中等待重试和死信消息
+        """
+        if not self._outbox:
+            return {"code": 0, "data": {}}
+        return {"code": 0, "data": {
+            **self._outbox.stats(),
+            "pending_items": self._outbox.items(dead=False),
+            "dead_items": self._outbox.items(dead=True)
+        }}
+
+    def deferred_items(self) -> Dict[str, Any]:
+        """
+        查询免打扰期间延后发送的消息
+        """
+        if not self._scheduler:
+            return {"code": 0, "data": {}}
+        return {"code": 0, "data": {**self._scheduler.stats(), "items": self._scheduler.items()}}
+
+    def queue_stats(self) -> Dict[str, Any]:
+        """
+        查询发送队列状态
+        """
+        return {"code": 0, "data": {
+            "queue": self._queue.stats() if self._queue else {},
+            "coalesce": self._coalescer.stats() if self._coalescer else {}
+        }}
 
     def get_form(self) -> Tuple[List[dict], Dict[str, Any]]:
         """
@@ -139,6 +692,7 @@ class BarkMultiUserMsg(_PluginBase):
                                             'model': 'server',
                                             'label': '服务器',
                                             'placeholder': 'https://api.day.app',
+                                            'hint': '多个服务器用逗号分隔',
                                         }
                                     }
                                 ]
@@ -188,6 +742,29 @@ class BarkMultiUserMsg(_PluginBase):
                                 'props': {
                                     'cols': 12
                                 },
+                                'content': [
+                                    {
+                                        'component': 'VTextarea',
+                                        'props': {
+                                            'model': 'groups',
+                                            'label': '用户组',
+                                            'placeholder': '每行一个配置，格式：组名:用户名1,用户名2',
+                                            'hint': '消息的用户名可以是组名或用户名列表，发送给多个用户时合并为批量推送',
+                                        }
+                                    }
+                                ]
+                            }
+                        ]
+                    },
+                    {
+                        'component': 'VRow',
+                        'content': [
+                            {
+                                'component': 'VCol',
+                                'props': {
+                                    'cols': 12,
+                                    'md': 4
+                                },
                                 'content': [
                                     {
                                         'component': 'VSelect',
@@ -200,93 +777,1646 @@ class BarkMultiUserMsg(_PluginBase):
                                         }
                                     }
                                 ]
+                            },
+                            {
+                                'component': 'VCol',
+                                'props': {
+                                    'cols': 12,
+                                    'md': 4
+                                },
+                                'content': [
+                                    {
+                                        'component': 'VSelect',
+                                        'props': {
+                                            'multiple': True,
+                                            'chips': True,
+                                            'model': 'high_msgtypes',
+                                            'label': '高优先级类型',
+                                            'hint': '异步发送时优先发送',
+                                            'items': MsgTypeOptions
+                                        }
+                                    }
+                                ]
+                            },
+                            {
+                                'component': 'VCol',
+                                'props': {
+                                    'cols': 12,
+                                    'md': 4
+                                },
+                                'content': [
+                                    {
+                                        'component': 'VSelect',
+                                        'props': {
+                                            'multiple': True,
+                                            'chips': True,
+                                            'model': 'bulk_msgtypes',
+                                            'label': '低优先级类型',
+                                            'hint': '异步发送时按较低权重发送',
+                                            'items': MsgTypeOptions
+                                        }
+                                    }
+                                ]
                             }
                         ]
                     },
+                    {
+                        'component': 'VExpansionPanels',
+                        'props': {'variant': 'accordion', 'class': 'mt-2'},
+                        'content': [
+                            {
+                                'component': 'VExpansionPanel',
+                                'content': [
+                                    {
+                                        'component': 'VExpansionPanelTitle',
+                                        'text': '发送方式'
+                                    },
+                                    {
+                                        'component': 'VExpansionPanelText',
+                                        'content': [
+                                            {
+                                                'component': 'VRow',
+                                                'content': [
+                                                    {
+                                                        'component': 'VCol',
+                                                        'props': {
+                                                            'cols': 12,
+                                                            'md': 6
+                                                        },
+                                                        'content': [
+                                                            {
+                                                                'component': 'VTextField',
+                                                                'props': {
+                                                                    'model': 'concurrency',
+                                                                    'label': '广播并发数',
+                                                                    'type': 'number',
+                                                                    'placeholder': '8',
+                                                                    'hint': '发送给所有用户时的最大并发请求数，1为逐个发送'
+                                                                }
+                                                            }
+                                                        ]
+                                                    },
+                                                    {
+                                                        'component': 'VCol',
+                                                        'props': {
+                                                            'cols': 12,
+                                                            'md': 6
+                                                        },
+                                                        'content': [
+                                                            {
+                                                                'component': 'VTextField',
+                                                                'props': {
+                                                                    'model': 'timeout',
+                                                                    'label': '广播超时（秒）',
+                                                                    'type': 'number',
+                                                                    'placeholder': '30',
+                                                                    'hint': '单次广播的截止时间，超时未完成的用户记为失败'
+                                                                }
+                                                            }
+                                                        ]
+                                                    }
+                                                ]
+                                            },
+                                            {
+                                                'component': 'VRow',
+                                                'content': [
+                                                    {
+                                                        'component': 'VCol',
+                                                        'props': {
+                                                            'cols': 12,
+                                                            'md': 6
+                                                        },
+                                                        'content': [
+                                                            {
+                                                                'component': 'VSwitch',
+                                                                'props': {
+                                                                    'model': 'batch',
+                                                                    'label': '批量推送',
+                                                                    'hint': '群发时使用 device_keys 合并为一次请求，需要 Bark 服务端支持'
+                                                                }
+                                                            }
+                                                        ]
+                                                    },
+                                                    {
+                                                        'component': 'VCol',
+                                                        'props': {
+                                                            'cols': 12,
+                                                            'md': 6
+                                                        },
+                                                        'content': [
+                                                            {
+                                                                'component': 'VTextField',
+                                                                'props': {
+                                                                    'model': 'batch_size',
+                                                                    'label': '单次批量设备数',
+                                                                    'type': 'number',
+                                                                    'placeholder': '100'
+                                                                }
+                                                            }
+                                                        ]
+                                                    }
+                                                ]
+                                            },
+                                            {
+                                                'component': 'VRow',
+                                                'content': [
+                                                    {
+                                                        'component': 'VCol',
+                                                        'props': {
+                                                            'cols': 12,
+                                                            'md': 6
+                                                        },
+                                                        'content': [
+                                                            {
+                                                                'component': 'VSelect',
+                                                                'props': {
+                                                                    'model': 'server_mode',
+                                                                    'label': '多服务器分配',
+                                                                    'items': [
+                                                                        {'title': '按用户指定服务器', 'value': SERVER_ASSIGN},
+                                                                        {'title': '按设备密钥分片（服务器共享设备数据）', 'value': SERVER_SHARD}
+                                                                    ],
+                                                                    'hint': '各服务器独立部署时设备只注册在其中一个上，只能按用户指定'
+                                                                }
+                                                            }
+                                                        ]
+                                                    },
+                                                    {
+                                                        'component': 'VCol',
+                                                        'props': {
+                                                            'cols': 12,
+                                                            'md': 6
+                                                        },
+                                                        'content': [
+                                                            {
+                                                                'component': 'VTextField',
+                                                                'props': {
+                                                                    'model': 'health_interval',
+                                                                    'label': '健康检查间隔（秒）',
+                                                                    'type': 'number',
+                                                                    'placeholder': '30',
+                                                                    'hint': '定时请求各服务器的 /healthz，分片或共享设备注册时不健康的服务器由其余服务器接替'
+                                                                }
+                                                            }
+                                                        ]
+                                                    },
+                                                    {
+                                                        'component': 'VCol',
+                                                        'props': {
+                                                            'cols': 12
+                                                        },
+                                                        'content': [
+                                                            {
+                                                                'component': 'VTextarea',
+                                                                'props': {
+                                                                    'model': 'user_servers',
+                                                                    'label': '用户服务器',
+                                                                    'placeholder': '每行一个配置，格式：用户名:服务器地址',
+                                                                    'hint': '按用户指定服务器时生效，未指定的用户使用第一个服务器',
+                                                                }
+                                                            }
+                                                        ]
+                                                    },
+                                                    {
+                                                        'component': 'VCol',
+                                                        'props': {
+                                                            'cols': 12,
+                                                            'md': 6
+                                                        },
+                                                        'content': [
+                                                            {
+                                                                'component': 'VSwitch',
+                                                                'props': {
+                                                                    'model': 'shared_servers',
+                                                                    'label': '服务器共享设备注册',
+                                                                    'hint': '按用户指定服务器时，开启后指定的服务器不可用会转移到其余服务器'
+                                                                }
+                                                            }
+                                                        ]
+                                                    }
+                                                ]
+                                            },
+                                            {
+                                                'component': 'VRow',
+                                                'content': [
+                                                    {
+                                                        'component': 'VCol',
+                                                        'props': {
+                                                            'cols': 12,
+                                                            'md': 6
+                                                        },
+                                                        'content': [
+                                                            {
+                                                                'component': 'VSelect',
+                                                                'props': {
+                                                                    'model': 'transport',
+                                                                    'label': '传输方式',
+                                                                    'items': [
+                                                                        {'title': '阻塞（线程池）', 'value': TRANSPORT_BLOCKING},
+                                                                        {'title': '异步（HTTP/2 多路复用）', 'value': TRANSPORT_ASYNC}
+                                                                    ],
+                                                                    'hint': '异步传输需要安装 httpx，安装 h2 后同一服务器的请求复用一个 HTTP/2 连接'
+                                                                }
+                                                            }
+                                                        ]
+                                                    }
+                                                ]
+                                            },
+                                            {
+                                                'component': 'VRow',
+                                                'content': [
+                                                    {
+                                                        'component': 'VCol',
+                                                        'props': {
+                                                            'cols': 12,
+                                                            'md': 3
+                                                        },
+                                                        'content': [
+                                                            {
+                                                                'component': 'VSwitch',
+                                                                'props': {
+                                                                    'model': 'keepalive',
+                                                                    'label': '保持长连接',
+                                                                }
+                                                            }
+                                                        ]
+                                                    },
+                                                    {
+                                                        'component': 'VCol',
+                                                        'props': {
+                                                            'cols': 12,
+                                                            'md': 3
+                                                        },
+                                                        'content': [
+                                                            {
+                                                                'component': 'VTextField',
+                                                                'props': {
+                                                                    'model': 'pool_size',
+                                                                    'label': '连接池大小',
+                                                                    'type': 'number',
+                                                                    'placeholder': '10'
+                                                                }
+                                                            }
+                                                        ]
+                                                    },
+                                                    {
+                                                        'component': 'VCol',
+                                                        'props': {
+                                                            'cols': 12,
+                                                            'md': 3
+                                                        },
+                                                        'content': [
+                                                            {
+                                                                'component': 'VTextField',
+                                                                'props': {
+                                                                    'model': 'connect_timeout',
+                                                                    'label': '连接超时（秒）',
+                                                                    'type': 'number',
+                                                                    'placeholder': '5'
+                                                                }
+                                                            }
+                                                        ]
+                                                    },
+                                                    {
+                                                        'component': 'VCol',
+                                                        'props': {
+                                                            'cols': 12,
+                                                            'md': 3
+                                                        },
+                                                        'content': [
+                                                            {
+                                                                'component': 'VTextField',
+                                                                'props': {
+                                                                    'model': 'read_timeout',
+                                                                    'label': '读取超时（秒）',
+                                                                    'type': 'number',
+                                                                    'placeholder': '20'
+                                                                }
+                                                            }
+                                                        ]
+                                                    }
+                                                ]
+                                            }
+                                        ]
+                                    }
+                                ]
+                            },
+                            {
+                                'component': 'VExpansionPanel',
+                                'content': [
+                                    {
+                                        'component': 'VExpansionPanelTitle',
+                                        'text': '发送队列'
+                                    },
+                                    {
+                                        'component': 'VExpansionPanelText',
+                                        'content': [
+                                            {
+                                                'component': 'VRow',
+                                                'content': [
+                                                    {
+                                                        'component': 'VCol',
+                                                        'props': {
+                                                            'cols': 12,
+                                                            'md': 4
+                                                        },
+                                                        'content': [
+                                                            {
+                                                                'component': 'VSwitch',
+                                                                'props': {
+                                                                    'model': 'async_send',
+                                                                    'label': '异步发送',
+                                                                    'hint': '消息进入队列由后台线程发送，不阻塞事件处理'
+                                                                }
+                                                            }
+                                                        ]
+                                                    },
+                                                    {
+                                                        'component': 'VCol',
+                                                        'props': {
+                                                            'cols': 12,
+                                                            'md': 4
+                                                        },
+                                                        'content': [
+                                                            {
+                                                                'component': 'VSelect',
+                                                                'props': {
+                                                                    'model': 'overflow',
+                                                                    'label': '队列满时',
+                                                                    'items': [
+                                                                        {'title': '丢弃最早的消息', 'value': OVERFLOW_DROP_OLDEST},
+                                                                        {'title': '丢弃最新的消息', 'value': OVERFLOW_DROP_NEWEST},
+                                                                        {'title': '等待（超时丢弃）', 'value': OVERFLOW_BLOCK}
+                                                                    ]
+                                                                }
+                                                            }
+                                                        ]
+                                                    },
+                                                    {
+                                                        'component': 'VCol',
+                                                        'props': {
+                                                            'cols': 12,
+                                                            'md': 4
+                                                        },
+                                                        'content': [
+                                                            {
+                                                                'component': 'VTextField',
+                                                                'props': {
+                                                                    'model': 'block_timeout',
+                                                                    'label': '等待超时（秒）',
+                                                                    'type': 'number',
+                                                                    'placeholder': '5'
+                                                                }
+                                                            }
+                                                        ]
+                                                    }
+                                                ]
+                                            },
+                                            {
+                                                'component': 'VRow',
+                                                'content': [
+                                                    {
+                                                        'component': 'VCol',
+                                                        'props': {
+                                                            'cols': 12,
+                                                            'md': 6
+                                                        },
+                                                        'content': [
+                                                            {
+                                                                'component': 'VTextField',
+                                                                'props': {
+                                                                    'model': 'queue_size',
+                                                                    'label': '队列长度',
+                                                                    'type': 'number',
+                                                                    'placeholder': '1000'
+                                                                }
+                                                            }
+                                                        ]
+                                                    },
+                                                    {
+                                                        'component': 'VCol',
+                                                        'props': {
+                                                            'cols': 12,
+                                                            'md': 6
+                                                        },
+                                                        'content': [
+                                                            {
+                                                                'component': 'VTextField',
+                                                                'props': {
+                                                                    'model': 'queue_workers',
+                                                                    'label': '发送线程数',
+                                                                    'type': 'number',
+                                                                    'placeholder': '2'
+                                                                }
+                                                            }
+                                                        ]
+                                                    }
+                                                ]
+                                            },
+                                            {
+                                                'component': 'VRow',
+                                                'content': [
+                                                    {
+                                                        'component': 'VCol',
+                                                        'props': {
+                                                            'cols': 12,
+                                                            'md': 3
+                                                        },
+                                                        'content': [
+                                                            {
+                                                                'component': 'VSwitch',
+                                                                'props': {
+                                                                    'model': 'coalesce',
+                                                                    'label': '合并突发消息',
+                                                                    'hint': '同一用户同类型的消息在窗口期内合并为一条摘要'
+                                                                }
+                                                            }
+                                                        ]
+                                                    },
+                                                    {
+                                                        'component': 'VCol',
+                                                        'props': {
+                                                            'cols': 12,
+                                                            'md': 3
+                                                        },
+                                                        'content': [
+                                                            {
+                                                                'component': 'VTextField',
+                                                                'props': {
+                                                                    'model': 'coalesce_window',
+                                                                    'label': '合并窗口（秒）',
+                                                                    'type': 'number',
+                                                                    'placeholder': '10'
+                                                                }
+                                                            }
+                                                        ]
+                                                    },
+                                                    {
+                                                        'component': 'VCol',
+                                                        'props': {
+                                                            'cols': 12,
+                                                            'md': 3
+                                                        },
+                                                        'content': [
+                                                            {
+                                                                'component': 'VTextField',
+                                                                'props': {
+                                                                    'model': 'coalesce_max_items',
+                                                                    'label': '合并条数上限',
+                                                                    'type': 'number',
+                                                                    'placeholder': '20'
+                                                                }
+                                                            }
+                                                        ]
+                                                    },
+                                                    {
+                                                        'component': 'VCol',
+                                                        'props': {
+                                                            'cols': 12,
+                                                            'md': 3
+                                                        },
+                                                        'content': [
+                                                            {
+                                                                'component': 'VTextField',
+                                                                'props': {
+                                                                    'model': 'coalesce_max_delay',
+                                                                    'label': '最大延迟（秒）',
+                                                                    'type': 'number',
+                                                                    'placeholder': '60'
+                                                                }
+                                                            }
+                                                        ]
+                                                    }
+                                                ]
+                                            },
+                                            {
+                                                'component': 'VRow',
+                                                'content': [
+                                                    {
+                                                        'component': 'VCol',
+                                                        'props': {
+                                                            'cols': 12,
+                                                            'md': 4
+                                                        },
+                                                        'content': [
+                                                            {
+                                                                'component': 'VSwitch',
+                                                                'props': {
+                                                                    'model': 'dedup',
+                                                                    'label': '忽略重复消息',
+                                                                    'hint': '同一用户相同标题和内容的消息在窗口期内只发送一次'
+                                                                }
+                                                            }
+                                                        ]
+                                                    },
+                                                    {
+                                                        'component': 'VCol',
+                                                        'props': {
+                                                            'cols': 12,
+                                                            'md': 4
+                                                        },
+                                                        'content': [
+                                                            {
+                                                                'component': 'VTextField',
+                                                                'props': {
+                                                                    'model': 'dedup_window',
+                                                                    'label': '去重窗口（秒）',
+                                                                    'type': 'number',
+                                                                    'placeholder': '300'
+                                                                }
+                                                            }
+                                                        ]
+                                                    },
+                                                    {
+                                                        'component': 'VCol',
+                                                        'props': {
+                                                            'cols': 12,
+                                                            'md': 4
+                                                        },
+                                                        'content': [
+                                                            {
+                                                                'component': 'VTextField',
+                                                                'props': {
+                                                                    'model': 'dedup_size',
+                                                                    'label': '去重缓存容量',
+                                                                    'type': 'number',
+                                                                    'placeholder': '10000'
+                                                                }
+                                                            }
+                                                        ]
+                                                    }
+                                                ]
+                                            }
+                                        ]
+                                    }
+                                ]
+                            },
+                            {
+                                'component': 'VExpansionPanel',
+                                'content': [
+                                    {
+                                        'component': 'VExpansionPanelTitle',
+                                        'text': '限流与免打扰'
+                                    },
+                                    {
+                                        'component': 'VExpansionPanelText',
+                                        'content': [
+                                            {
+                                                'component': 'VRow',
+                                                'content': [
+                                                    {
+                                                        'component': 'VCol',
+                                                        'props': {
+                                                            'cols': 12,
+                                                            'md': 4
+                                                        },
+                                                        'content': [
+                                                            {
+                                                                'component': 'VSwitch',
+                                                                'props': {
+                                                                    'model': 'rate_limit',
+                                                                    'label': '限流',
+                                                                    'hint': '超出速率的消息延迟发送，服务端报错时自动降速'
+                                                                }
+                                                            }
+                                                        ]
+                                                    },
+                                                    {
+                                                        'component': 'VCol',
+                                                        'props': {
+                                                            'cols': 12,
+                                                            'md': 4
+                                                        },
+                                                        'content': [
+                                                            {
+                                                                'component': 'VTextField',
+                                                                'props': {
+                                                                    'model': 'rate',
+                                                                    'label': '全局速率（条/分钟）',
+                                                                    'type': 'number',
+                                                                    'placeholder': '600'
+                                                                }
+                                                            }
+                                                        ]
+                                                    },
+                                                    {
+                                                        'component': 'VCol',
+                                                        'props': {
+                                                            'cols': 12,
+                                                            'md': 4
+                                                        },
+                                                        'content': [
+                                                            {
+                                                                'component': 'VTextField',
+                                                                'props': {
+                                                                    'model': 'burst',
+                                                                    'label': '全局突发数',
+                                                                    'type': 'number',
+                                                                    'placeholder': '20'
+                                                                }
+                                                            }
+                                                        ]
+                                                    }
+                                                ]
+                                            },
+                                            {
+                                                'component': 'VRow',
+                                                'content': [
+                                                    {
+                                                        'component': 'VCol',
+                                                        'props': {
+                                                            'cols': 12,
+                                                            'md': 6
+                                                        },
+                                                        'content': [
+                                                            {
+                                                                'component': 'VTextField',
+                                                                'props': {
+                                                                    'model': 'recipient_rate',
+                                                                    'label': '单设备速率（条/分钟）',
+                                                                    'type': 'number',
+                                                                    'placeholder': '30'
+                                                                }
+                                                            }
+                                                        ]
+                                                    },
+                                                    {
+                                                        'component': 'VCol',
+                                                        'props': {
+                                                            'cols': 12,
+                                                            'md': 6
+                                                        },
+                                                        'content': [
+                                                            {
+                                                                'component': 'VTextField',
+                                                                'props': {
+                                                                    'model': 'recipient_burst',
+                                                                    'label': '单设备突发数',
+                                                                    'type': 'number',
+                                                                    'placeholder': '5'
+                                                                }
+                                                            }
+                                                        ]
+                                                    }
+                                                ]
+                                            },
+                                            {
+                                                'component': 'VRow',
+                                                'content': [
+                                                    {
+                                                        'component': 'VCol',
+                                                        'props': {
+                                                            'cols': 12,
+                                                            'md': 6
+                                                        },
+                                                        'content': [
+                                                            {
+                                                                'component': 'VTextarea',
+                                                                'props': {
+                                                                    'model': 'quiet_hours',
+                                                                    'label': '免打扰时段',
+                                                                    'rows': 2,
+                                                                    'placeholder': '每行一个配置，格式：用户名:22:00-07:00',
+                                                                    'hint': '省略用户名或写 * 表示所有用户，也可以写组名；时段内的消息延后到结束后发送'
+                                                                }
+                                                            }
+                                                        ]
+                                                    },
+                                                    {
+                                                        'component': 'VCol',
+                                                        'props': {
+                                                            'cols': 12,
+                                                            'md': 2
+                                                        },
+                                                        'content': [
+                                                            {
+                                                                'component': 'VSwitch',
+                                                                'props': {
+                                                                    'model': 'quiet_summary',
+                                                                    'label': '合并为摘要'
+                                                                }
+                                                            }
+                                                        ]
+                                                    },
+                                                    {
+                                                        'component': 'VCol',
+                                                        'props': {
+                                                            'cols': 12,
+                                                            'md': 2
+                                                        },
+                                                        'content': [
+                                                            {
+                                                                'component': 'VTextField',
+                                                                'props': {
+                                                                    'model': 'quiet_batch_size',
+                                                                    'label': '每批释放用户数',
+                                                                    'type': 'number',
+                                                                    'placeholder': '20'
+                                                                }
+                                                            }
+                                                        ]
+                                                    },
+                                                    {
+                                                        'component': 'VCol',
+                                                        'props': {
+                                                            'cols': 12,
+                                                            'md': 2
+                                                        },
+                                                        'content': [
+                                                            {
+                                                                'component': 'VTextField',
+                                                                'props': {
+                                                                    'model': 'quiet_batch_interval',
+                                                                    'label': '批次间隔（秒）',
+                                                                    'type': 'number',
+                                                                    'placeholder': '1'
+                                                                }
+                                                            }
+                                                        ]
+                                                    }
+                                                ]
+                                            }
+                                        ]
+                                    }
+                                ]
+                            },
+                            {
+                                'component': 'VExpansionPanel',
+                                'content': [
+                                    {
+                                        'component': 'VExpansionPanelTitle',
+                                        'text': '失败重试与熔断'
+                                    },
+                                    {
+                                        'component': 'VExpansionPanelText',
+                                        'content': [
+                                            {
+                                                'component': 'VRow',
+                                                'content': [
+                                                    {
+                                                        'component': 'VCol',
+                                                        'props': {
+                                                            'cols': 12,
+                                                            'md': 4
+                                                        },
+                                                        'content': [
+                                                            {
+                                                                'component': 'VSwitch',
+                                                                'props': {
+                                                                    'model': 'outbox',
+                                                                    'label': '失败重试',
+                                                                    'hint': '发送失败的消息保存到本地，按指数退避重试，重启后继续'
+                                                                }
+                                                            }
+                                                        ]
+                                                    },
+                                                    {
+                                                        'component': 'VCol',
+                                                        'props': {
+                                                            'cols': 12,
+                                                            'md': 4
+                                                        },
+                                                        'content': [
+                                                            {
+                                                                'component': 'VTextField',
+                                                                'props': {
+                                                                    'model': 'retry_max',
+                                                                    'label': '最大重试次数',
+                                                                    'type': 'number',
+                                                                    'placeholder': '8'
+                                                                }
+                                                            }
+                                                        ]
+                                                    },
+                                                    {
+                                                        'component': 'VCol',
+                                                        'props': {
+                                                            'cols': 12,
+                                                            'md': 4
+                                                        },
+                                                        'content': [
+                                                            {
+                                                                'component': 'VTextField',
+                                                                'props': {
+                                                                    'model': 'retry_delay',
+                                                                    'label': '首次重试间隔（秒）',
+                                                                    'type': 'number',
+                                                                    'placeholder': '30'
+                                                                }
+                                                            }
+                                                        ]
+                                                    }
+                                                ]
+                                            },
+                                            {
+                                                'component': 'VRow',
+                                                'content': [
+                                                    {
+                                                        'component': 'VCol',
+                                                        'props': {
+                                                            'cols': 12,
+                                                            'md': 4
+                                                        },
+                                                        'content': [
+                                                            {
+                                                                'component': 'VSwitch',
+                                                                'props': {
+                                                                    'model': 'breaker',
+                                                                    'label': '熔断',
+                                                                    'hint': '服务器连续失败后暂停请求，期间消息直接失败（启用失败重试时稍后重试）'
+                                                                }
+                                                            }
+                                                        ]
+                                                    },
+                                                    {
+                                                        'component': 'VCol',
+                                                        'props': {
+                                                            'cols': 12,
+                                                            'md': 4
+                                                        },
+                                                        'content': [
+                                                            {
+                                                                'component': 'VTextField',
+                                                                'props': {
+                                                                    'model': 'breaker_threshold',
+                                                                    'label': '连续失败次数',
+                                                                    'type': 'number',
+                                                                    'placeholder': '5'
+                                                                }
+                                                            }
+                                                        ]
+                                                    },
+                                                    {
+                                                        'component': 'VCol',
+                                                        'props': {
+                                                            'cols': 12,
+                                                            'md': 4
+                                                        },
+                                                        'content': [
+                                                            {
+                                                                'component': 'VTextField',
+                                                                'props': {
+                                                                    'model': 'breaker_reset',
+                                                                    'label': '探测间隔（秒）',
+                                                                    'type': 'number',
+                                                                    'placeholder': '60'
+                                                                }
+                                                            }
+                                                        ]
+                                                    }
+                                                ]
+                                            },
+                                            {
+                                                'component': 'VRow',
+                                                'content': [
+                                                    {
+                                                        'component': 'VCol',
+                                                        'props': {
+                                                            'cols': 12,
+                                                            'md': 3
+                                                        },
+                                                        'content': [
+                                                            {
+                                                                'component': 'VSwitch',
+                                                                'props': {
+                                                                    'model': 'history',
+                                                                    'label': '记录投递历史',
+                                                                    'hint': '按用户名、消息摘要和时间通过 /history 接口查询'
+                                                                }
+                                                            }
+                                                        ]
+                                                    },
+                                                    {
+                                                        'component': 'VCol',
+                                                        'props': {
+                                                            'cols': 12,
+                                                            'md': 3
+                                                        },
+                                                        'content': [
+                                                            {
+                                                                'component': 'VTextField',
+                                                                'props': {
+                                                                    'model': 'history_size',
+                                                                    'label': '内存保留记录数',
+                                                                    'type': 'number',
+                                                                    'placeholder': '10000'
+                                                                }
+                                                            }
+                                                        ]
+                                                    },
+                                                    {
+                                                        'component': 'VCol',
+                                                        'props': {
+                                                            'cols': 12,
+                                                            'md': 3
+                                                        },
+                                                        'content': [
+                                                            {
+                                                                'component': 'VSwitch',
+                                                                'props': {
+                                                                    'model': 'history_disk',
+                                                                    'label': '淘汰记录写入磁盘'
+                                                                }
+                                                            }
+                                                        ]
+                                                    },
+                                                    {
+                                                        'component': 'VCol',
+                                                        'props': {
+                                                            'cols': 12,
+                                                            'md': 3
+                                                        },
+                                                        'content': [
+                                                            {
+                                                                'component': 'VTextField',
+                                                                'props': {
+                                                                    'model': 'history_days',
+                                                                    'label': '磁盘保留天数',
+                                                                    'type': 'number',
+                                                                    'placeholder': '7'
+                                                                }
+                                                            }
+                                                        ]
+                                                    }
+                                                ]
+                                            }
+                                        ]
+                                    }
+                                ]
+                            },
+                            {
+                                'component': 'VExpansionPanel',
+                                'content': [
+                                    {
+                                        'component': 'VExpansionPanelTitle',
+                                        'text': '日志与诊断'
+                                    },
+                                    {
+                                        'component': 'VExpansionPanelText',
+                                        'content': [
+                                            {
+                                                'component': 'VRow',
+                                                'content': [
+                                                    {
+                                                        'component': 'VCol',
+                                                        'props': {
+                                                            'cols': 12,
+                                                            'md': 4
+                                                        },
+                                                        'content': [
+                                                            {
+                                                                'component': 'VSelect',
+                                                                'props': {
+                                                                    'model': 'log_mode',
+                                                                    'label': '日志模式',
+                                                                    'items': [
+                                                                        {'title': '详细（逐个用户）', 'value': LOG_VERBOSE},
+                                                                        {'title': '结构化（每次投递一行）', 'value': LOG_STRUCTURED}
+                                                                    ]
+                                                                }
+                                                            }
+                                                        ]
+                                                    },
+                                                    {
+                                                        'component': 'VCol',
+                                                        'props': {
+                                                            'cols': 12,
+                                                            'md': 4
+                                                        },
+                                                        'content': [
+                                                            {
+                                                                'component': 'VTextField',
+                                                                'props': {
+                                                                    'model': 'log_sample_rate',
+                                                                    'label': '成功日志采样比例（%）',
+                                                                    'type': 'number',
+                                                                    'placeholder': '10',
+                                                                    'hint': '结构化模式下成功投递按比例输出，失败总是输出'
+                                                                }
+                                                            }
+                                                        ]
+                                                    },
+                                                    {
+                                                        'component': 'VCol',
+                                                        'props': {
+                                                            'cols': 12,
+                                                            'md': 4
+                                                        },
+                                                        'content': [
+                                                            {
+                                                                'component': 'VTextField',
+                                                                'props': {
+                                                                    'model': 'log_body_limit',
+                                                                    'label': '日志内容字数',
+                                                                    'type': 'number',
+                                                                    'placeholder': '50',
+                                                                    'hint': '结构化日志中标题和内容的截断长度，0 表示只记录长度和摘要'
+                                                                }
+                                                            }
+                                                        ]
+                                                    }
+                                                ]
+                                            },
+                                            {
+                                                'component': 'VRow',
+                                                'content': [
+                                                    {
+                                                        'component': 'VCol',
+                                                        'props': {
+                                                            'cols': 12,
+                                                            'md': 6
+                                                        },
+                                                        'content': [
+                                                            {
+                                                                'component': 'VSwitch',
+                                                                'props': {
+                                                                    'model': 'trace',
+                                                                    'label': '慢请求跟踪',
+                                                                    'hint': '记录每次请求在DNS、连接、TLS、等待响应等阶段的耗时，通过 /traces 接口查询'
+                                                                }
+                                                            }
+                                                        ]
+                                                    },
+                                                    {
+                                                        'component': 'VCol',
+                                                        'props': {
+                                                            'cols': 12,
+                                                            'md': 6
+                                                        },
+                                                        'content': [
+                                                            {
+                                                                'component': 'VTextField',
+                                                                'props': {
+                                                                    'model': 'trace_size',
+                                                                    'label': '保留最慢请求数',
+                                                                    'type': 'number',
+                                                                    'placeholder': '20'
+                                                                }
+                                                            }
+                                                        ]
+                                                    }
+                                                ]
+                                            }
+                                        ]
+                                    }
+                                ]
+                            }
+                        ]
+                    }
                 ]
             }
         ], {
             "enabled": False,
             'msgtypes': [],
+            'high_msgtypes': ['Download', 'Manual'],
+            'bulk_msgtypes': ['SiteMessage'],
             'server': 'https://api.day.app',
             'apikey': '',
-            'params': ''
+            'params': '',
+            'groups': '',
+            'server_mode': SERVER_ASSIGN,
+            'user_servers': '',
+            'shared_servers': False,
+            'health_interval': 30,
+            'concurrency': 8,
+            'timeout': 30,
+            'batch': False,
+            'batch_size': 100,
+            'transport': TRANSPORT_BLOCKING,
+            'keepalive': True,
+            'pool_size': 10,
+            'connect_timeout': 5,
+            'read_timeout': 20,
+            'async_send': True,
+            'queue_size': 1000,
+            'queue_workers': 2,
+            'overflow': OVERFLOW_DROP_OLDEST,
+            'block_timeout': 5,
+            'coalesce': False,
+            'coalesce_window': 10,
+            'coalesce_max_items': 20,
+            'coalesce_max_delay': 60,
+            'dedup': False,
+            'dedup_window': 300,
+            'dedup_size': 10000,
+            'rate_limit': False,
+            'rate': 600,
+            'burst': 20,
+            'recipient_rate': 30,
+            'recipient_burst': 5,
+            'outbox': False,
+            'retry_max': 8,
+            'retry_delay': 30,
+            'history': True,
+            'history_size': 10000,
+            'history_disk': False,
+            'history_days': 7,
+            'quiet_hours': '',
+            'quiet_summary': True,
+            'quiet_batch_size': 20,
+            'quiet_batch_interval': 1,
+            'breaker': True,
+            'breaker_threshold': 5,
+            'breaker_reset': 60,
+            'trace': False,
+            'trace_size': 20,
+            'log_mode': LOG_VERBOSE,
+            'log_sample_rate': 10,
+            'log_body_limit': 50
         }
 
     def get_page(self) -> List[dict]:
-        pass
+        """
+        拼装插件详情页面，展示各服务器的熔断状态
+        """
+        state_text = {"closed": "正常", "open": "熔断中", "half_open": "探测中"}
+        states = self._breaker.states() if self._breaker else {}
+        if not states:
+            return [
+                {
+                    'component': 'div',
+                    'text': '暂无数据',
+                    'props': {
+                        'class': 'text-center',
+                    }
+                }
+            ]
+        return [
+            {
+                'component': 'VRow',
+                'content': [
+                    {
+                        'component': 'VCol',
+                        'props': {
+                            'cols': 12,
+                        },
+                        'content': [
+                            {
+                                'component': 'VTable',
+                                'props': {
+                                    'hover': True
+                                },
+                                'content': [
+                                    {
+                                        'component': 'thead',
+                                        'content': [
+                                            {
+                                                'component': 'th',
+                                                'props': {
+                                                    'class': 'text-start ps-4'
+                                                },
+                                                'text': title
+                                            } for title in ['服务器', '状态', '连续失败', '拒绝请求', '熔断次数', '下次探测（秒）']
+                                        ]
+                                    },
+                                    {
+                                        'component': 'tbody',
+                                        'content': [
+                                            {
+                                                'component': 'tr',
+                                                'content': [
+                                                    {
+                                                        'component': 'td',
+                                                        'props': {
+                                                            'class': 'ps-4'
+                                                        },
+                                                        'text': text
+                                                    } for text in [host,
+                                                                   state_text.get(state["state"], state["state"]),
+                                                                   state["failures"],
+                                                                   state["rejected"],
+                                                                   state["trips"],
+                                                                   state["retry_in"]]
+                                                ]
+                                            } for host, state in states.items()
+                                        ]
+                                    }
+                                ]
+                            }
+                        ]
+                    }
+                ]
+            }
+        ]
 
-    def _send(self, title: str, text: str, username: str = None) -> Optional[Tuple[bool, str]]:
+    def _send(self, title: str, text: str,
+              username: Union[str, Sequence[str], None] = None) -> Dict[str, PushResult]:
         """
         发送消息
         :param title: 标题
         :param text: 内容
-        :param username: 用户ID
+        :param username: 用户ID，多个用户时为列表
+        :return: 各用户的发送结果
         """
+        # 去重时使用的接收方，下面未指定用户时会改为 admin
+        recipients = username
         try:
-            if not self._server or not self._user_keys:
-                return False, "参数未配置"
+            routes = self._routes
+            if not self._server or not routes.user_keys:
+                logger.warn("Bark消息发送失败：参数未配置")
+                return {}
 
-            req_body = {k: v[0] for k, v in parse_qs(self._params).items()}
-            req_body.update(
-                {
-                    "title": title,
-                    "body": text,
-                }
-            )
+            req_body = {
+                "title": title,
+                "body": text,
+            }
 
             # 打印消息信息
-            logger.info(f"=== Bark消息发送 ===")
-            logger.info(f"标题: {title}")
-            logger.info(f"内容: {text}")
-            logger.info(f"用户: {username}")
-            logger.info("===================")
-            
-            # 如果username为空，默认使用admin
+            self._log.detail("info", "=== Bark消息发送 ===")
+            self._log.detail("info", "标题: %s", title)
+            self._log.detail("info", "内容: %s", text)
+            self._log.detail("info", "用户: %s", username)
+            self._log.detail("info", "===================")
+            start = time.monotonic()
+
+            # 如果username为空，默认使用admin，admin未配置时发送给所有用户；指定了用户时只发送给已配置的用户
+            broadcast = not username
             if not username:
                 username = "admin"
 
             # 根据用户ID发送消息
-            if username and username in self._user_keys:
-                # 发送给指定用户
-                device_key = self._user_keys[username]
-                req_body.update({"device_key": device_key})
-                res = RequestUtils().post_res(f"{self._server}/push", data=req_body)
-                if res and res.status_code == 200:
-                    ret_json = res.json()
-                    code = ret_json["code"]
-                    message = ret_json["message"]
-                    if code == 200:
-                        logger.info(f"用户 {username} Bark消息发送成功")
-                    else:
-                        logger.warn(f"用户 {username} Bark消息发送失败：{message}")
-                elif res is not None:
-                    logger.warn(
-                        f"用户 {username} Bark消息发送失败，错误码：{res.status_code}，错误原因：{res.reason}"
-                    )
+            if isinstance(username, (list, tuple)):
+                # 发送给多个用户，内容相同，启用批量推送时合并为少量请求
+                targets = routes.select(username)
+                if len(targets) < len(username):
+                    logger.info(f"用户 {','.join(u for u in username if u not in targets)} 未配置Bark密钥，跳过发送")
+                if not targets:
+                    return {}
+                if self._batch and len(targets) > 1:
+                    results = self._batch_broadcast(req_body, routes, targets)
                 else:
-                    logger.warn(f"用户 {username} Bark消息发送失败：未获取到返回信息")
+                    results = self._broadcast(self._form(req_body, routes), targets)
+            elif username in routes.user_keys:
+                # 发送给指定用户
+                results = {username: self._push(username, routes.user_keys[username], self._form(req_body, routes))}
+            elif not broadcast:
+                # 指定的用户未配置密钥，不发送
+                logger.info(f"用户 {username} 未配置Bark密钥，跳过发送")
+                return {}
+            elif self._batch:
+                # 批量发送给所有用户
+                results = self._batch_broadcast(req_body, routes)
             else:
                 # 发送给所有用户
-                for user_id, device_key in self._user_keys.items():
-                    req_body.update({"device_key": device_key})
-                    res = RequestUtils().post_res(f"{self._server}/push", data=req_body)
-                    if res and res.status_code == 200:
-                        ret_json = res.json()
-                        code = ret_json["code"]
-                        message = ret_json["message"]
-                        if code == 200:
-                            logger.info(f"用户 {user_id} Bark消息发送成功")
-                        else:
-                            logger.warn(f"用户 {user_id} Bark消息发送失败：{message}")
-                    elif res is not None:
-                        logger.warn(
-                            f"用户 {user_id} Bark消息发送失败，错误码：{res.status_code}，错误原因：{res.reason}"
-                        )
-                    else:
-                        logger.warn(f"用户 {user_id} Bark消息发送失败：未获取到返回信息")
+                results = self._broadcast(self._form(req_body, routes), routes.user_keys)
+            self._record_results(results)
+            self._record_history(title, text, results)
+            self._log.delivery(title, text, username if isinstance(username, str) else f"{len(username)}个用户",
+                               total=len(results),
+                               failures=[(user_id, result.message) for user_id, result in results.items()
+                                         if not result.ok],
+                               elapsed=time.monotonic() - start)
+            self._save_failed(results, req_body, routes)
+            if not any(result.ok for result in results.values()):
+                self._forget_duplicate(title, text, recipients)
+            return results
         except Exception as msg_e:
             logger.error(f"Bark消息发送失败：{str(msg_e)}")
+            self._forget_duplicate(title, text, recipients)
+            return {}
+
+    def _save_failed(self, results: Dict[str, PushResult], req_body: dict, routes: RoutingTable):
+        """
+        发送失败的用户写入发件箱等待重试
+        """
+        if not self._outbox:
+            return
+        for user_id, result in results.items():
+            if result.ok or user_id not in routes.user_keys:
+                continue
+            self._outbox.add({"user_id": user_id, "device_key": routes.user_keys[user_id], "body": req_body},
+                             recipient=user_id, title=req_body.get("title"), error=result.message)
+
+    def _redeliver(self, item: dict) -> bool:
+        """
+        重试发件箱中的消息
+        :return: 是否发送成功
+        """
+        if self._metrics:
+            self._metrics.retries.inc(self._host, "outbox")
+        if "device_key" in item:
+            start = time.monotonic()
+            result = self._push(item["user_id"], item["device_key"], self._form(item["body"], self._routes))
+            self._record_results({item["user_id"]: result})
+            self._record_history(item["body"].get("title"), item["body"].get("body"), {item["user_id"]: result})
+            self._log.delivery(item["body"].get("title"), item["body"].get("body"), item["user_id"], total=1,
+                               failures=[] if result.ok else [(item["user_id"], result.message)],
+                               elapsed=time.monotonic() - start, kind="outbox")
+            return result.ok
+        # 停止时队列中未发送的消息，重新走完整发送流程，失败的用户会再次写入发件箱
+        self._send(item.get("title"), item.get("text"), item.get("username"))
+        return True
+
+    def _batch_broadcast(self, req_body: dict, routes: RoutingTable,
+                         user_keys: Optional[Mapping[str, str]] = None) -> Dict[str, PushResult]:
+        """
+        使用 device_keys 将用户合并为少量请求发送，失败的设备再逐个重发
+        :param req_body: 消息内容
+        :param routes: 路由表
+        :param user_keys: 发送的用户ID到密钥的映射，默认所有用户
+        :return: 各用户的发送结果
+        """
+        if user_keys is None:
+            user_keys = routes.user_keys
+        body = JsonBody({**routes.params, **req_body}, exclude=("device_key", "device_keys"))
+        succeeded: Dict[str, PushResult] = {}
+        # 多个服务器时按各设备的首选健康服务器分组，分别批量推送
+        for server, server_keys in self._servers.partition(user_keys, self._unavailable).items():
+            device_keys = tuple(dict.fromkeys(server_keys.values()))
+            for i in range(0, len(device_keys), self._batch_size):
+                succeeded.update(self._push_batch(server, list(device_keys[i:i + self._batch_size]), body))
+
+        results = {user_id: succeeded[device_key] for user_id, device_key in user_keys.items()
+                   if device_key in succeeded}
+        if results:
+            self._log.detail("info", "Bark批量推送成功 %s 个用户", len(results))
+        failed = {user_id: device_key for user_id, device_key in user_keys.items()
+                  if device_key not in succeeded}
+        if failed:
+            self._log.detail("info", "Bark批量推送失败 %s 个用户，改为逐个发送", len(failed))
+            if self._metrics:
+                self._metrics.retries.inc(self._host, "batch_fallback", value=len(failed))
+            results.update(self._broadcast(self._form(req_body, routes), failed))
+        return results
+
+    def _push_batch(self, server: str, device_keys: List[str], body: JsonBody) -> Dict[str, PushResult]:
+        """
+        单次请求推送到多个设备
+        :param server: 服务器地址
+        :param device_keys: 设备密钥列表
+        :param body: 已序列化的公共请求体
+        :return: 推送成功的设备密钥及服务端返回的结果
+        """
+        with self._trace(f"batch:{len(device_keys)}"):
+            try:
+                res = self._request(server, device_keys, content_type="application/json",
+                                    data=body.encode(device_keys=device_keys))
+                if not res or res.status_code != 200:
+                    self._throttle_feedback(server, res)
+                    return {}
+                ret_json = decode_json(res)
+                self._throttle_feedback(server, res, ret_json.get("code"))
+                self._record_code(server, ret_json.get("code"))
+                # 服务端返回了逐个设备的结果
+                data = ret_json.get("data")
+                if isinstance(data, list):
+                    return {item.get("device_key"): PushResult(True, item.get("message") or "success", 200,
+                                                               self._message_id(item))
+                            for item in data if isinstance(item, dict) and item.get("code") == 200}
+                if ret_json.get("code") != 200:
+                    return {}
+                message = ret_json.get("message") or "success"
+                return {device_key: PushResult(True, message, 200, self._message_id(ret_json))
+                        for device_key in device_keys}
+            except Exception as err:
+                logger.warn(f"Bark批量推送异常：{str(err)}")
+                return {}
+
+    def _broadcast(self, body: FormBody, user_keys: Mapping[str, str]) -> Dict[str, PushResult]:
+        """
+        逐个设备发送，启用线程池时并发发送，总耗时取决于最慢的请求
+        :param body: 已编码的公共请求体
+        :param user_keys: 用户ID到密钥的映射
+        :return: 各用户的发送结果
+        """
+        if isinstance(self._pool, AsyncTransport):
+            return self._broadcast_async(body, user_keys)
+        if not self._executor:
+            # 逐个发送时同样按截止时间结束，超时后剩余的用户不再发送
+            deadline = time.monotonic() + self._timeout
+            results = {}
+            for user_id, device_key in user_keys.items():
+                if time.monotonic() >= deadline:
+                    self._log.detail("warn", "用户 %s Bark消息发送超时", user_id)
+                    results[user_id] = PushResult(False, "发送超时")
+                    continue
+                results[user_id] = self._push(user_id, device_key, body)
+            return results
+
+        futures = {
+            self._executor.submit(self._push, user_id, device_key, body): user_id
+            for user_id, device_key in user_keys.items()
+        }
+        done, not_done = wait(futures, timeout=self._timeout)
+        results = {}
+        for future in done:
+            try:
+                results[futures[future]] = future.result()
+            except Exception as err:
+                results[futures[future]] = PushResult(False, str(err))
+        for future in not_done:
+            future.cancel()
+            user_id = futures[future]
+            self._log.detail("warn", "用户 %s Bark消息发送超时", user_id)
+            results[user_id] = PushResult(False, "发送超时")
+        return results
+
+    def _broadcast_async(self, body: FormBody, user_keys: Mapping[str, str]) -> Dict[str, PushResult]:
+        """
+        所有设备的请求提交到异步传输的事件循环并发发送，不占用线程池
+        :param body: 已编码的公共请求体
+        :param user_keys: 用户ID到密钥的映射
+        :return: 各用户的发送结果
+        """
+        results = {}
+        futures = {}
+        for user_id, device_key in user_keys.items():
+            server = self._servers.route(device_key, user_id, self._unavailable)[0]
+            try:
+                self._before_request(server, [device_key])
+            except CircuitOpenError as err:
+                self._log.detail("warn", "用户 %s Bark消息发送失败：%s", user_id, err)
+                results[user_id] = PushResult(False, str(err))
+                continue
+            future = self._pool.submit(f"{server}/push", content_type="application/x-www-form-urlencoded",
+                                       data=body.encode(device_key=device_key))
+            futures[future] = (user_id, server, time.monotonic())
+        done, not_done = wait(futures, timeout=self._timeout)
+        for future in done:
+            user_id, server, start = futures[future]
+            try:
+                res = future.result()
+            except Exception as err:
+                # 未获取到响应同样要记录结果，否则半开状态的探测请求一直占用，熔断器无法恢复
+                self._after_request(server, None, time.monotonic() - start)
+                results[user_id] = PushResult(False, str(err))
+                continue
+            self._after_request(server, res, res.elapsed if res is not None else time.monotonic() - start)
+            results[user_id] = self._push_result(server, user_id, res)
+        for future in not_done:
+            future.cancel()
+            user_id, server, start = futures[future]
+            self._after_request(server, None, time.monotonic() - start)
+            self._log.detail("warn", "用户 %s Bark消息发送超时", user_id)
+            results[user_id] = PushResult(False, "发送超时")
+        return results
+
+    def _push(self, user_id: str, device_key: str, body: FormBody) -> PushResult:
+        """
+        推送消息到单个设备
+        :param user_id: 用户ID
+        :param device_key: 设备密钥
+        :param body: 已编码的公共请求体，只拼接设备密钥
+        """
+        with self._trace(user_id):
+            result = PushResult(False, "未获取到返回信息")
+            # 依次尝试首选服务器和故障转移服务器，只有服务器不可用时才换下一个
+            for server in self._servers.route(device_key, user_id, self._unavailable):
+                try:
+                    res = self._request(server, [device_key], content_type="application/x-www-form-urlencoded",
+                                        data=body.encode(device_key=device_key))
+                except CircuitOpenError as err:
+                    self._log.detail("warn", "用户 %s Bark消息发送失败：%s", user_id, err)
+                    result = PushResult(False, str(err))
+                    continue
+                result = self._push_result(server, user_id, res)
+                if res is not None and res.status_code < 500:
+                    break
+            return result
+
+    def _push_result(self, server: str, user_id: str, res: Any) -> PushResult:
+        """
+        解析单个设备的推送结果
+        :param server: 服务器地址
+        :param user_id: 用户ID
+        :param res: 响应，未获取到时为 None
+        """
+        if res and res.status_code == 200:
+            ret_json = decode_json(res)
+            code = ret_json["code"]
+            message = ret_json["message"]
+            self._throttle_feedback(server, res, code)
+            self._record_code(server, code)
+            message_id = self._message_id(ret_json)
+            if code == 200:
+                self._log.detail("info", "用户 %s Bark消息发送成功", user_id)
+                return PushResult(True, message, code, message_id)
+            self._log.detail("warn", "用户 %s Bark消息发送失败：%s", user_id, message)
+            return PushResult(False, message, code, message_id)
+        elif res is not None:
+            self._throttle_feedback(server, res)
+            self._log.detail("warn", "用户 %s Bark消息发送失败，错误码：%s，错误原因：%s",
+                             user_id, res.status_code, res.reason)
+            return PushResult(False, f"错误码：{res.status_code}", res.status_code)
+        self._log.detail("warn", "用户 %s Bark消息发送失败：未获取到返回信息", user_id)
+        return PushResult(False, "未获取到返回信息")
+
+    @staticmethod
+    def _message_id(ret_json: dict) -> Any:
+        """
+        服务端返回的消息ID；Bark 服务端通常不返回，此时为每次投递生成一个，用于在发送记录中区分
+        """
+        return ret_json.get("id") or uuid.uuid4().hex
+
+    @staticmethod
+    def _form(req_body: dict, routes: RoutingTable) -> FormBody:
+        """
+        附加参数和消息内容编码一次，逐个设备发送时只拼接设备密钥
+        """
+        return FormBody({**routes.params, **req_body}, exclude=("device_key",))
+
+    def _request(self, server: str, device_keys: List[str], **kwargs) -> Optional[Response]:
+        """
+        发送推送请求，依次经过熔断检查和限流，并记录服务器是否可用
+        :param server: 服务器地址
+        :param device_keys: 本次请求的设备密钥
+        """
+        self._before_request(server, device_keys)
+        start = time.monotonic()
+        res = self._pool.post(f"{server}/push", **kwargs)
+        self._after_request(server, res, time.monotonic() - start)
+        return res
+
+    def _before_request(self, server: str, device_keys: List[str]):
+        """
+        熔断检查和限流，熔断时抛出 CircuitOpenError
+        """
+        if self._breaker:
+            self._breaker.check(urlparse(server).netloc)
+        with phase("throttle"):
+            self._throttle(server, device_keys)
+
+    def _after_request(self, server: str, res: Any, elapsed: float):
+        """
+        记录请求耗时、错误和服务器是否可用
+        """
+        host = urlparse(server).netloc
+        if self._metrics:
+            self._metrics.latency.observe(elapsed, host)
+            if res is None:
+                self._metrics.errors.inc(host, "no_response")
+            elif res.status_code != 200:
+                self._metrics.errors.inc(host, f"http_{res.status_code}")
+        if self._breaker:
+            # 未获取到响应或服务端错误视为不可用，业务错误（如密钥无效）不计入
+            self._breaker.record(host, res is not None and res.status_code < 500)
+
+    def _trace(self, label: str):
+        """
+        开启慢请求跟踪时记录本次请求各阶段耗时
+        """
+        return self._tracer.trace(label) if self._tracer else nullcontext()
+
+    @property
+    def _host(self) -> str:
+        """
+        第一个服务器的主机，作为发送数和重试次数的标签，请求耗时、错误码和熔断按实际服务器统计
+        """
+        return urlparse(self._servers.primary or "").netloc
+
+    def _unavailable(self, server: str) -> bool:
+        """
+        服务器是否熔断中，选择服务器时跳过
+        """
+        return bool(self._breaker and self._breaker.is_open(urlparse(server).netloc))
+
+    def _record_code(self, server: str, code: Any):
+        """
+        记录服务端返回的业务错误码
+        """
+        if self._metrics and code != 200:
+            self._metrics.errors.inc(urlparse(server).netloc, code)
+
+    def _record_results(self, results: Dict[str, PushResult]):
+        """
+        按用户记录发送结果
+        """
+        if not self._metrics:
+            return
+        host = self._host
+        for user_id, result in results.items():
+            self._metrics.sends.inc(host, user_id, "success" if result.ok else "failure")
+
+    def _record_history(self, title: Optional[str], text: Optional[str], results: Dict[str, PushResult]):
+        """
+        记录各用户的投递结果，同一条消息的摘要相同
+        """
+        if not self._history:
+            return
+        digest = content_key(title, text).hex()
+        for user_id, result in results.items():
+            self._history.add(user_id, digest, result.ok, title=title, code=result.code,
+                              message_id=result.message_id, error=None if result.ok else result.message)
+
+    def _throttle(self, server: str, device_keys: List[str]):
+        """
+        限流，令牌不足时等待，每个服务器单独计算速率
+        """
+        if self._limiter:
+            self._limiter.acquire(server, device_keys)
+
+    def _throttle_feedback(self, server: str, res: Any, code: Optional[int] = None):
+        """
+        根据服务端响应调整限流速率：成功时逐步恢复，限流或服务端错误时降速；
+        设备密钥失效等单个设备的错误以及未获取到响应时不调整
+        :param code: 服务端返回的业务码
+        """
+        if not self._limiter or res is None:
+            return
+        if res.status_code == 200 and code == 200:
+            self._limiter.feedback(server, True)
+        elif overloaded(res.status_code) or overloaded(code):
+            self._limiter.feedback(server, False)
 
     @eventmanager.register(EventType.NoticeMessage)
     def send(self, event: Event):
@@ -310,22 +2440,154 @@ class BarkMultiUserMsg(_PluginBase):
         title = msg_body.get("title")
         # 文本
         text = msg_body.get("text")
-        # 用户ID
+        # 用户ID，可以是单个用户、组名或列表
         username = msg_body.get("username")
+        if username and (not isinstance(username, str) or username in self._routes.groups):
+            recipients = self._routes.resolve(username)
+            if not recipients:
+                # 组内没有用户时不发送，而不是当作未指定用户发送给所有人
+                logger.info(f"用户 {self._recipient(username)} 未配置Bark密钥，跳过发送")
+                return
+            username = recipients[0] if len(recipients) == 1 else recipients
 
         if not title and not text:
             logger.warn("标题和内容不能同时为空")
             return
 
-        if (msg_type and self._msgtypes
-                and msg_type.name not in self._msgtypes):
+        if not self._routes.accepts(msg_type):
             logger.info(f"消息类型 {msg_type.value} 未开启消息发送")
             return
 
+        if self._dedup_cache and self._dedup_cache.seen(self._dedup_key(title, text, username)):
+            logger.info(f"用户 {self._recipient(username)} 的重复消息已忽略：{title}")
+            return
+
+        # 处于免打扰时段的用户延后到时段结束后发送，全部延后时返回空元组
+        if self._scheduler and self._quiet:
+            username = self._defer_quiet(title, text, username, msg_type)
+            if username == ():
+                return
+
+        if self._coalescer and self._coalescer.add((username, msg_type), title, text):
+            return
+        return self._dispatch(title, text, username, msg_type)
+
+    @staticmethod
+    def _recipient(username: Union[str, Sequence[str], None]) -> Optional[str]:
+        """
+        接收方的文本表示，多个用户时以逗号连接
+        """
+        return ",".join(username) if isinstance(username, (list, tuple)) else username
+
+    def _dedup_key(self, title: str, text: str, username: Union[str, Sequence[str], None]) -> bytes:
+        """
+        去重缓存的键，同一接收方的相同内容视为重复
+        """
+        return content_key(self._recipient(username), title, text)
+
+    def _forget_duplicate(self, title: str, text: str, username: Union[str, Sequence[str], None]):
+        """
+        未开启发件箱时发送失败的消息不会重试，移除去重记录，来源重新发送时不被当作重复而丢弃
+        """
+        if self._dedup_cache and not self._outbox:
+            self._dedup_cache.forget(self._dedup_key(title, text, username))
+
+    def _defer_quiet(self, title: str, text: str, username: Union[str, Tuple[str, ...], None],
+                     msg_type: Optional[NotificationType]) -> Union[str, Tuple[str, ...], None]:
+        """
+        将处于免打扰时段的用户的消息延后，返回需要立即发送的用户；未指定用户时按 admin 的时段判断
+        """
+        now = time.time()
+        if not self._quiet.active(now):
+            return username
+        users = username if isinstance(username, tuple) else (username or "admin",)
+        item = {"title": title, "text": text, "type": msg_type.name if msg_type else None}
+        active = []
+        for user in users:
+            release_at = self._quiet.until(user, now)
+            # 延后的消息数达到上限时直接发送
+            if not release_at or not self._scheduler.add(release_at, user, item):
+                active.append(user)
+        if len(active) == len(users):
+            return username
+        logger.info(f"{len(users) - len(active)} 个用户处于免打扰时段，Bark消息延后发送：{title}")
+        return active[0] if len(active) == 1 else tuple(active)
+
+    def _release_deferred(self, user_id: str, items: List[dict]):
+        """
+        免打扰结束后发送延后的消息，开启汇总时合并为一条摘要
+        """
+        if self._quiet_summary and len(items) > 1:
+            logger.info(f"用户 {user_id} 免打扰期间的 {len(items)} 条消息合并为摘要发送")
+            title, text = build_digest([(item.get("title"), item.get("text")) for item in items])
+            self._dispatch(title, text, user_id, None)
+            return
+        for item in items:
+            msg_type = NotificationType[item["type"]] if item.get("type") in NotificationType.__members__ else None
+            self._dispatch(item.get("title"), item.get("text"), user_id, msg_type)
+
+    def _dispatch(self, title: str, text: str, username: Optional[str],
+                  msg_type: Optional[NotificationType]) -> Optional[Dict[str, PushResult]]:
+        """
+        异步发送时放入队列，否则直接发送
+        """
+        if self._queue:
+            self._queue.put(title, text, username, priority=self._routes.priority(msg_type))
+            return None
         return self._send(title, text, username)
 
+    def _flush_digest(self, key: Tuple[Optional[str], Optional[NotificationType]], items: List[tuple]):
+        """
+        发送合并后的摘要消息
+        """
+        username, msg_type = key
+        if len(items) > 1:
+            logger.info(f"用户 {username} 合并 {len(items)} 条消息为摘要发送")
+        title, text = build_digest(items)
+        self._dispatch(title, text, username, msg_type)
+
+    def _stop_queue(self, queue: DispatchQueue):
+        """
+        停止发送队列，超时未发送的消息保存到发件箱，下次启动后发送
+        """
+        remaining = queue.stop(timeout=self._timeout)
+        if self._outbox:
+            for (title, text, username), _ in remaining:
+                self._outbox.add({"title": title, "text": text, "username": username},
+                                 recipient=username, title=title, attempts=0)
+
     def stop_service(self):
         """
         退出插件
         """
-        pass
+        # 先停止延后释放，再发送合并中和队列中的消息，最后关闭线程池和连接池
+        if self._scheduler:
+            self._scheduler.stop()
+            self._scheduler = None
+        if self._coalescer:
+            self._coalescer.stop()
+            self._coalescer = None
+        self._dedup_cache = None
+        if self._queue:
+            queue, self._queue = self._queue, None
+            self._stop_queue(queue)
+        if self._outbox:
+            self._outbox.stop()
+            self._outbox = None
+        if self._history:
+            self._history.close()
+            self._history = None
+        self._limiter = None
+        self._breaker = None
+        if self._servers:
+            self._servers.stop()
+            self._servers = None
+        if self._executor:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+        if self._pool:
+            self._pool.close()
+            self._pool = None
+        # 下次加载时重建全部组件
+        if self._reloader:
+            self._reloader.reset()
@@ -0,0 +1,158 @@
+import threading
+import time
+from typing import Any, Callable, Dict, Hashable, List, Optional, Tuple
+
+from app.log import logger
+
+
+def build_digest(items: List[Tuple[Optional[str], Optional[str]]],
+                 max_lines: int = 10, line_width: int = 60) -> Tuple[Optional[str], Optional[str]]:
+    """
+    将多条消息合并为一条摘要
+    :param items: (标题, 内容) 列表
+    :param max_lines: 摘要最多列出的消息条数
+    :param line_width: 每条消息的最大长度
+    :return: 摘要标题和内容，只有一条消息时原样返回
+    """
+    if len(items) == 1:
+        return items[0]
+    first_title, first_text = items[0]
+    head = first_title or (first_text or "").split("\n")[0]
+    title = f"{head} 等{len(items)}条消息"
+    lines = []
+    for item_title, item_text in items[:max_lines]:
+        line = (item_title or item_text or "").replace("\n", " ").strip()
+        if len(line) > line_width:
+            line = f"{line[:line_width]}…"
+        lines.append(f"• {line}")
+    if len(items) > max_lines:
+        lines.append(f"…还有 {len(items) - max_lines} 条")
+    return title, "\n".join(lines)
+
+
+class _Bucket:
+    """
+    同一合并键下等待发送的消息
+    """
+    __slots__ = ("first_at", "deadline", "items")
+
+    def __init__(self, now: float):
+        self.first_at = now
+        self.deadline = now
+        self.items: List[tuple] = []
+
+
+class Coalescer:
+    """
+    突发消息合并：同一键（用户、消息类型）在窗口期内到达的消息合并后一次性交给回调发送。
+    每条新消息把发送时间推迟一个窗口，但不超过首条消息后的最大延迟；条数达到上限时立即发送。
+    """
+
+    def __init__(self, flush: Callable[[Hashable, List[tuple]], Any], name: str = "coalesce",
+                 window: float = 10, max_items: int = 20, max_delay: float = 60):
+        self._flush = flush
+        self._name = name
+        self._window = window
+        self._max_items = max(max_items, 1)
+        self._max_delay = max(max_delay, window)
+        self._buckets: Dict[Hashable, _Bucket] = {}
+        self._cond = threading.Condition()
+        self._thread: Optional[threading.Thread] = None
+        self._closing = False
+        # 统计
+        self._received = 0
+        self._flushed = 0
+
+    def start(self):
+        """
+        启动后台定时线程
+        """
+        self._thread = threading.Thread(target=self._run, name=self._name, daemon=True)
+        self._thread.start()
+
+    def add(self, key: Hashable, *item) -> bool:
+        """
+        加入一条消息
+        :return: 是否已接收，停止后返回 False 由调用方直接发送
+        """
+        now = time.monotonic()
+        with self._cond:
+            if self._closing:
+                return False
+            bucket = self._buckets.get(key)
+            if not bucket:
+                bucket = self._buckets[key] = _Bucket(now)
+            bucket.items.append(item)
+            if len(bucket.items) >= self._max_items:
+                bucket.deadline = now
+            else:
+                bucket.deadline = min(now + self._window, bucket.first_at + self._max_delay)
+            self._received += 1
+            self._cond.notify_all()
+            return True
+
+    def _due(self) -> List[Tuple[Hashable, List[tuple]]]:
+        """
+        取出已到期的消息，调用方需持有锁
+        """
+        now = time.monotonic()
+        due = [key for key, bucket in self._buckets.items() if bucket.deadline <= now or self._closing]
+        return [(key, self._buckets.pop(key).items) for key in due]
+
+    def _run(self):
+        """
+        后台线程：在最早的到期时间唤醒并发送到期的消息
+        """
+        while True:
+            with self._cond:
+                due = self._due()
+                if not due:
+                    if self._closing:
+                        return
+                    timeout = min((b.deadline for b in self._buckets.values()), default=None)
+                    self._cond.wait(None if timeout is None else max(timeout - time.monotonic(), 0))
+                    continue
+            for key, items in due:
+                try:
+                    self._flush(key, items)
+                except Exception as err:
+                    logger.error(f"{self._name} 合并消息发送异常：{str(err)}")
+                with self._cond:
+                    self._flushed += 1
+
+    def configure(self, window: float, max_items: int, max_delay: float):
+        """
+        运行中调整合并窗口和上限，等待中的消息按新参数计算发送时间
+        """
+        with self._cond:
+            self._window = window
+            self._max_items = max(max_items, 1)
+            self._max_delay = max(max_delay, window)
+            now = time.monotonic()
+            for bucket in self._buckets.values():
+                bucket.deadline = now if len(bucket.items) >= self._max_items \
+                    else min(bucket.deadline, bucket.first_at + self._max_delay)
+            self._cond.notify_all()
+
+    def stop(self, timeout: float = 10):
+        """
+        停止合并，立即发送所有等待中的消息
+        """
+        with self._cond:
+            self._closing = True
+            self._cond.notify_all()
+        if self._thread:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def stats(self) -> Dict[str, int]:
+        """
+        合并统计
+        """
+        with self._cond:
+            return {
+                "pending_keys": len(self._buckets),
+                "pending_items": sum(len(b.items) for b in self._buckets.values()),
+                "received": self._received,
+                "flushed": self._flushed
+            }
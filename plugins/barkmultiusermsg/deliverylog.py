@@ -0,0 +1,123 @@
+import hashlib
+import random
+from typing import Any, List, Optional, Sequence, Tuple
+
+from app.log import logger
+
+# 日志模式
+LOG_VERBOSE = "verbose"
+LOG_STRUCTURED = "structured"
+# 单行最多列出的失败接收方，其余只计数
+MAX_FAILURES = 10
+
+
+def preview(text: Optional[str], limit: int) -> str:
+    """
+    截断消息内容，limit 不大于 0 时不输出内容，只保留长度和摘要便于比对
+    """
+    if not text:
+        return ""
+    if limit <= 0:
+        return f"<{len(text)}字 {hashlib.blake2b(text.encode('utf-8'), digest_size=4).hexdigest()}>"
+    if len(text) <= limit:
+        return text
+    return f"{text[:limit]}…(+{len(text) - limit})"
+
+
+def _quote(value: Any) -> str:
+    """
+    logfmt 取值，含空格、等号或引号时加引号
+    """
+    text = str(value)
+    if text and not any(char in text for char in ' ="\\\n'):
+        return text
+    return '"' + text.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") + '"'
+
+
+class _Line:
+    """
+    一行 key=value 格式的日志，日志系统实际输出时才截断内容和拼接
+    """
+    __slots__ = ("_fields", "_title", "_text", "_failures", "_limit")
+
+    def __init__(self, fields: List[Tuple[str, Any]], title: Optional[str], text: Optional[str],
+                 failures: Sequence[Tuple[str, str]], limit: int):
+        self._fields = fields
+        self._title = title
+        self._text = text
+        self._failures = failures
+        self._limit = limit
+
+    def __str__(self) -> str:
+        fields = list(self._fields)
+        if self._failures:
+            shown = ",".join(f"{recipient}:{reason}" for recipient, reason in self._failures[:MAX_FAILURES])
+            if len(self._failures) > MAX_FAILURES:
+                shown += f",…(+{len(self._failures) - MAX_FAILURES})"
+            fields.append(("errors", shown))
+        fields.append(("title", preview(self._title, self._limit)))
+        fields.append(("body", preview(self._text, self._limit)))
+        return " ".join(f"{key}={_quote(value)}" for key, value in fields if value is not None)
+
+
+class DeliveryLog:
+    """
+    发送日志。普通模式下保留逐个接收方的明细；结构化模式下每次投递只输出一行，
+    成功按比例采样，失败总是输出，消息内容截断或隐藏。
+    """
+
+    def __init__(self, provider: str, mode: str = LOG_VERBOSE, sample_rate: int = 100, body_limit: int = 50):
+        """
+        :param provider: 服务名称，作为日志的 provider 字段
+        :param mode: 日志模式
+        :param sample_rate: 成功投递的采样比例（百分比）
+        :param body_limit: 标题和内容保留的字数，0 表示不输出内容
+        """
+        self.provider = provider
+        self.structured = mode == LOG_STRUCTURED
+        self._sample_rate = min(max(sample_rate, 0), 100)
+        self._body_limit = body_limit
+
+    def detail(self, level: str, message: str, *args: Any):
+        """
+        逐个接收方的明细日志，只在普通模式下输出，参数由日志系统延迟格式化
+        """
+        if not self.structured:
+            getattr(logger, level)(message, *args)
+
+    def _sampled(self) -> bool:
+        """
+        成功投递是否输出
+        """
+        return self._sample_rate >= 100 or random.random() * 100 < self._sample_rate
+
+    def delivery(self, title: Optional[str], text: Optional[str], recipient: Optional[str], total: int,
+                 failures: Sequence[Tuple[str, str]], elapsed: float, failed: Optional[int] = None,
+                 **extra: Any):
+        """
+        一次投递的汇总，只在结构化模式下输出
+        :param recipient: 接收方描述
+        :param total: 接收方总数
+        :param failures: 失败的接收方及原因
+        :param elapsed: 投递耗时（秒）
+        :param failed: 失败的接收方数，默认为 failures 的数量
+        :param extra: 附加字段，如分片数
+        """
+        if not self.structured or (not failures and not self._sampled()):
+            return
+        failed = len(failures) if failed is None else failed
+        fields = [
+            ("provider", self.provider),
+            ("event", "delivery"),
+            ("to", recipient),
+            ("total", total),
+            ("ok", total - failed),
+            ("failed", failed),
+            ("ms", round(elapsed * 1000)),
+            *extra.items()
+        ]
+        line = _Line(fields, title, text, failures, self._body_limit)
+        if failures:
+            logger.warn("%s", line)
+        else:
+            logger.info("%s", line)
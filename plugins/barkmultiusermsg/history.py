@@ -0,0 +1,395 @@
+import sqlite3
+import threading
+import time
+from collections import deque
+from pathlib import Path
+from typing import Any, Deque, Dict, Iterable, List, Optional
+
+from app.log import logger
+
+# 淘汰的记录攒够该数量后批量写入磁盘
+SPILL_BATCH = 500
+# 磁盘记录的清理间隔（秒）
+PURGE_INTERVAL = 3600
+# 标题保留的字数
+TITLE_LIMIT = 64
+
+
+def _format_time(ts: float) -> str:
+    return time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(ts))
+
+
+def parse_time(value: Optional[str]) -> Optional[float]:
+    """
+    解析查询时间，支持时间戳、YYYY-MM-DD 和 YYYY-MM-DD HH:MM:SS
+    """
+    if not value:
+        return None
+    try:
+        return float(value)
+    except ValueError:
+        pass
+    for fmt in ("%Y-%m-%d %H:%M:%S", "%Y-%m-%d %H:%M", "%Y-%m-%d"):
+        try:
+            return time.mktime(time.strptime(value.strip(), fmt))
+        except ValueError:
+            continue
+    raise ValueError(f"无法识别的时间：{value}")
+
+
+class DeliveryRecord:
+    """
+    一条投递记录：一个接收方收到一条消息的结果
+    """
+    __slots__ = ("ts", "user", "target", "digest", "title", "ok", "code", "message_id", "error")
+
+    def __init__(self, ts: float, user: str, target: Optional[str], digest: str, title: Optional[str],
+                 ok: bool, code: Any = None, message_id: Optional[str] = None, error: Optional[str] = None):
+        self.ts = ts
+        self.user = user
+        self.target = target
+        self.digest = digest
+        self.title = title
+        self.ok = ok
+        self.code = code
+        self.message_id = message_id
+        self.error = error
+
+    def row(self) -> tuple:
+        """
+        写入磁盘的字段
+        """
+        return (self.ts, self.user, self.target, self.digest, self.title, int(self.ok),
+                None if self.code is None else str(self.code), self.message_id, self.error)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "time": _format_time(self.ts),
+            "user": self.user,
+            "target": self.target,
+            "digest": self.digest,
+            "title": self.title,
+            "ok": self.ok,
+            "code": self.code,
+            "message_id": self.message_id,
+            "error": self.error
+        }
+
+
+class DeliveryHistory:
+    """
+    投递历史：内存中是固定容量的环形缓冲区，按用户名、消息摘要和消息ID建立索引，按时间二分查找；
+    开启落盘时被淘汰的记录批量写入 SQLite，查询时内存中不足的部分从磁盘补齐，磁盘记录按保留天数清理。
+    """
+
+    def __init__(self, size: int = 10000, path: Optional[Path] = None, retention_days: int = 7,
+                 name: str = "history"):
+        """
+        :param size: 内存中保留的记录数
+        :param path: 落盘文件路径，为空时不落盘
+        :param retention_days: 磁盘记录保留天数
+        """
+        self._size = max(size, 1)
+        self._ring: List[Optional[DeliveryRecord]] = [None] * self._size
+        self._next = 0
+        self._by_user: Dict[str, Deque[int]] = {}
+        self._by_digest: Dict[str, Deque[int]] = {}
+        self._by_message: Dict[str, int] = {}
+        self._pending: List[DeliveryRecord] = []
+        self._retention = retention_days * 86400
+        self._purged_at = 0.0
+        self._name = name
+        self._lock = threading.Lock()
+        self._db_lock = threading.Lock()
+        self._conn = self._connect(path) if path else None
+
+    @staticmethod
+    def _connect(path: Path) -> sqlite3.Connection:
+        """
+        打开数据库并建表
+        """
+        path.parent.mkdir(parents=True, exist_ok=True)
+        conn = sqlite3.connect(str(path), check_same_thread=False, isolation_level=None)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS history (
+                ts REAL NOT NULL,
+                user TEXT,
+                target TEXT,
+                digest TEXT,
+                title TEXT,
+                ok INTEGER NOT NULL,
+                code TEXT,
+                message_id TEXT,
+                error TEXT
+            )
+        """)
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_history_user ON history (user, ts)")
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_history_digest ON history (digest)")
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_history_ts ON history (ts)")
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_history_message ON history (message_id)")
+        return conn
+
+    @property
+    def persistent(self) -> bool:
+        """
+        是否将淘汰的记录写入磁盘
+        """
+        return self._conn is not None
+
+    @property
+    def _first(self) -> int:
+        """
+        内存中最早一条记录的序号
+        """
+        return max(self._next - self._size, 0)
+
+    def add(self, user: Optional[str], digest: str, ok: bool, target: Optional[str] = None,
+            title: Optional[str] = None, code: Any = None, message_id: Any = None, error: Optional[str] = None):
+        """
+        记录一次投递结果
+        :param user: 用户名，纯UID、主题等没有用户名时为空
+        :param digest: 消息内容摘要，同一条消息的各接收方相同
+        :param target: 推送目标，如设备密钥、UID或主题
+        :param message_id: 服务端返回的消息ID
+        """
+        if title and len(title) > TITLE_LIMIT:
+            title = title[:TITLE_LIMIT]
+        message_id = None if message_id is None else str(message_id)
+        with self._lock:
+            seq = self._next
+            slot = seq % self._size
+            evicted = self._ring[slot]
+            if evicted is not None:
+                self._evict(evicted, seq - self._size)
+            record = DeliveryRecord(time.time(), user or "", target, digest, title, ok, code, message_id, error)
+            self._ring[slot] = record
+            self._by_user.setdefault(record.user, deque()).append(seq)
+            self._by_digest.setdefault(digest, deque()).append(seq)
+            if message_id:
+                self._by_message[message_id] = seq
+            self._next = seq + 1
+            spill = len(self._pending) >= SPILL_BATCH
+        if spill:
+            self.flush()
+
+    def _evict(self, record: DeliveryRecord, seq: int):
+        """
+        淘汰最早的记录，调用时需持有锁。记录按序号淘汰，一定是各索引中最早的一条
+        """
+        for index, key in ((self._by_user, record.user), (self._by_digest, record.digest)):
+            seqs = index.get(key)
+            if seqs and seqs[0] == seq:
+                seqs.popleft()
+                if not seqs:
+                    del index[key]
+        if record.message_id and self._by_message.get(record.message_id) == seq:
+            del self._by_message[record.message_id]
+        if self._conn:
+            self._pending.append(record)
+
+    def _take(self) -> List[DeliveryRecord]:
+        """
+        取出内存中的全部记录并清空，调用时需持有锁
+        """
+        records = [self._ring[seq % self._size] for seq in range(self._first, self._next)]
+        self._ring = [None] * self._size
+        self._by_user.clear()
+        self._by_digest.clear()
+        self._by_message.clear()
+        self._next = 0
+        return records
+
+    def _restore(self, records: List[DeliveryRecord]):
+        """
+        按时间顺序重新载入记录，超出容量的最早记录按淘汰处理。调用时需持有锁且内存为空
+        """
+        overflow = max(len(records) - self._size, 0)
+        if self._conn:
+            self._pending.extend(records[:overflow])
+        for seq, record in enumerate(records[overflow:]):
+            self._ring[seq] = record
+            self._by_user.setdefault(record.user, deque()).append(seq)
+            self._by_digest.setdefault(record.digest, deque()).append(seq)
+            if record.message_id:
+                self._by_message[record.message_id] = seq
+        self._next = len(records) - overflow
+
+    def configure(self, size: int, retention_days: int):
+        """
+        调整内存容量和磁盘保留天数，内存中的记录保留，容量调小时淘汰最早的记录
+        """
+        with self._lock:
+            self._retention = retention_days * 86400
+            size = max(size, 1)
+            if size != self._size:
+                records = self._take()
+                self._size = size
+                self._ring = [None] * size
+                self._restore(records)
+
+    def handover(self, other: "DeliveryHistory"):
+        """
+        将内存中的记录转交给新的投递历史，用于切换是否落盘
+        """
+        with self._lock:
+            records = self._take()
+        with other._lock:
+            other._restore(records + other._take())
+
+    def _seq_since(self, ts: float) -> int:
+        """
+        第一条不早于指定时间的记录序号，记录按时间顺序写入，二分查找。调用时需持有锁
+        """
+        low, high = self._first, self._next
+        while low < high:
+            mid = (low + high) // 2
+            if self._ring[mid % self._size].ts < ts:
+                low = mid + 1
+            else:
+                high = mid
+        return low
+
+    def query(self, user: Optional[str] = None, digest: Optional[str] = None, since: Optional[float] = None,
+              until: Optional[float] = None, keyword: Optional[str] = None, limit: int = 100) -> List[Dict[str, Any]]:
+        """
+        按用户名、消息摘要、时间范围和标题关键字查询，按时间从新到旧
+        """
+        limit = max(limit, 1)
+        results: List[Dict[str, Any]] = []
+        with self._lock:
+            first = self._first
+            if user is not None:
+                seqs: Iterable[int] = self._by_user.get(user, ())
+            elif digest is not None:
+                seqs = self._by_digest.get(digest, ())
+            else:
+                seqs = range(self._seq_since(since) if since else first, self._next)
+            for seq in reversed(seqs):
+                record = self._ring[seq % self._size]
+                if until is not None and record.ts > until:
+                    continue
+                if since is not None and record.ts < since:
+                    break
+                if (digest is not None and record.digest != digest) \
+                        or (keyword and keyword not in (record.title or "")):
+                    continue
+                results.append(record.to_dict())
+                if len(results) >= limit:
+                    return results
+            oldest = self._ring[first % self._size].ts if self._next else None
+        # 内存中的记录不足时从磁盘补齐更早的记录，重启后内存为空时全部从磁盘查询
+        if self._conn and (oldest is None or since is None or since < oldest):
+            results.extend(self._query_disk(user, digest, since, until, oldest, keyword, limit - len(results)))
+        return results
+
+    def _query_disk(self, user: Optional[str], digest: Optional[str], since: Optional[float],
+                    until: Optional[float], before: Optional[float], keyword: Optional[str],
+                    limit: int) -> List[Dict[str, Any]]:
+        """
+        查询已落盘的记录
+        :param before: 内存中最早一条记录的时间，只查询更早的记录
+        """
+        self.flush()
+        clauses, params = ["1 = 1"], []
+        if before is not None:
+            clauses.append("ts < ?")
+            params.append(before)
+        if until is not None:
+            clauses.append("ts <= ?")
+            params.append(until)
+        for column, value in (("user", user), ("digest", digest)):
+            if value is not None:
+                clauses.append(f"{column} = ?")
+                params.append(value)
+        if since is not None:
+            clauses.append("ts >= ?")
+            params.append(since)
+        if keyword:
+            clauses.append("title LIKE ?")
+            params.append(f"%{keyword}%")
+        with self._db_lock:
+            rows = self._conn.execute(
+                f"SELECT ts, user, target, digest, title, ok, code, message_id, error FROM history "
+                f"WHERE {' AND '.join(clauses)} ORDER BY ts DESC LIMIT ?", (*params, limit)
+            ).fetchall()
+        return [DeliveryRecord(row[0], row[1], row[2], row[3], row[4], bool(row[5]), *row[6:]).to_dict()
+                for row in rows]
+
+    def lookup(self, message_ids: Iterable[Any]) -> Dict[str, Optional[Dict[str, Any]]]:
+        """
+        按服务端消息ID批量查询投递结果，内存中没有的一次性从磁盘查询
+        """
+        message_ids = list(dict.fromkeys(str(message_id) for message_id in message_ids))
+        found: Dict[str, Optional[Dict[str, Any]]] = dict.fromkeys(message_ids)
+        with self._lock:
+            for message_id in message_ids:
+                seq = self._by_message.get(message_id)
+                if seq is not None:
+                    found[message_id] = self._ring[seq % self._size].to_dict()
+        missing = [message_id for message_id, record in found.items() if record is None]
+        if self._conn and missing:
+            self.flush()
+            with self._db_lock:
+                for i in range(0, len(missing), 500):
+                    chunk = missing[i:i + 500]
+                    rows = self._conn.execute(
+                        f"SELECT ts, user, target, digest, title, ok, code, message_id, error FROM history "
+                        f"WHERE message_id IN ({','.join('?' * len(chunk))})", chunk
+                    ).fetchall()
+                    for row in rows:
+                        found[row[7]] = DeliveryRecord(row[0], row[1], row[2], row[3], row[4], bool(row[5]),
+                                                       *row[6:]).to_dict()
+        return found
+
+    def flush(self):
+        """
+        将已淘汰的记录写入磁盘，并清理超过保留天数的记录
+        """
+        if not self._conn:
+            return
+        with self._lock:
+            pending, self._pending = self._pending, []
+        try:
+            with self._db_lock:
+                if pending:
+                    self._conn.executemany("INSERT INTO history VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                                           [record.row() for record in pending])
+                now = time.time()
+                if now - self._purged_at > PURGE_INTERVAL:
+                    self._purged_at = now
+                    self._conn.execute("DELETE FROM history WHERE ts < ?", (now - self._retention,))
+        except Exception as err:
+            logger.error(f"{self._name} 投递记录写入失败：{str(err)}")
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        内存记录数、索引大小和磁盘记录数
+        """
+        with self._lock:
+            stats = {
+                "memory": self._next - self._first,
+                "capacity": self._size,
+                "total": self._next,
+                "users": len(self._by_user),
+                "messages": len(self._by_digest),
+                "pending": len(self._pending)
+            }
+        if self._conn:
+            with self._db_lock:
+                stats["disk"] = self._conn.execute("SELECT COUNT(*) FROM history").fetchone()[0]
+        return stats
+
+    def close(self):
+        """
+        内存中的记录全部落盘后关闭
+        """
+        if not self._conn:
+            return
+        with self._lock:
+            self._pending.extend(self._take())
+        self.flush()
+        with self._db_lock:
+            self._conn.close()
+        self._conn = None
@@ -0,0 +1,222 @@
+import bisect
+import threading
+from typing import Callable, Dict, List, Optional, Sequence, Tuple, Union
+
+# Prometheus 文本格式的 Content-Type
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+# 请求耗时分桶（秒）
+DEFAULT_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+# 单个指标最多的标签组合数，超出后归入 other，避免用户数很多时无限增长
+MAX_SERIES = 1000
+OVERFLOW_LABEL = "other"
+
+GaugeValue = Union[float, Dict[Tuple[str, ...], float]]
+
+
+def _escape(value: str) -> str:
+    """
+    转义标签值
+    """
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    """
+    格式化标签，如 {user="admin",result="success"}
+    """
+    pairs = [f'{name}="{_escape(str(value))}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value: float) -> str:
+    """
+    整数不带小数点输出
+    """
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+
+class _Metric:
+    """
+    指标基类，按标签值保存序列
+    """
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str], lock: threading.Lock):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = lock
+        self._series: Dict[Tuple[str, ...], object] = {}
+
+    def _key(self, labels: Sequence[object]) -> Tuple[str, ...]:
+        """
+        调用时需持有锁
+        """
+        key = tuple("" if value is None else str(value) for value in labels)
+        if key not in self._series and len(self._series) >= MAX_SERIES:
+            return (OVERFLOW_LABEL,) * len(self.labelnames)
+        return key
+
+    def header(self) -> List[str]:
+        """
+        HELP 和 TYPE 注释行
+        """
+        return [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+
+
+class Counter(_Metric):
+    """
+    只增计数器
+    """
+    kind = "counter"
+
+    def inc(self, *labels: object, value: float = 1):
+        """
+        按标签值计数，标签顺序与 labelnames 一致
+        """
+        with self._lock:
+            key = self._key(labels)
+            self._series[key] = self._series.get(key, 0) + value
+
+    def render(self) -> List[str]:
+        """
+        输出文本格式的各行
+        """
+        with self._lock:
+            series = list(self._series.items())
+        return self.header() + [f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}"
+                                for key, value in series]
+
+
+class Histogram(_Metric):
+    """
+    直方图，保存各分桶计数、总和和总数
+    """
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str], lock: threading.Lock,
+                 buckets: Sequence[float] = DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames, lock)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value: float, *labels: object):
+        """
+        记录一次观测值
+        """
+        with self._lock:
+            key = self._key(labels)
+            series = self._series.get(key)
+            if series is None:
+                # 各分桶计数（最后一个为 +Inf）、总和
+                series = self._series[key] = [[0] * (len(self.buckets) + 1), 0.0]
+            series[0][bisect.bisect_left(self.buckets, value)] += 1
+            series[1] += value
+
+    def render(self) -> List[str]:
+        """
+        输出文本格式的各行
+        """
+        with self._lock:
+            series = [(key, list(counts), total) for key, (counts, total) in self._series.items()]
+        lines = self.header()
+        for key, counts, total in series:
+            cumulative = 0
+            for bound, count in zip((*self.buckets, "+Inf"), counts):
+                cumulative += count
+                le = 'le="%s"' % (bound if bound == "+Inf" else _format_value(bound))
+                lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, key, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(self.labelnames, key)} {_format_value(total)}")
+            lines.append(f"{self.name}_count{_format_labels(self.labelnames, key)} {cumulative}")
+        return lines
+
+
+class Gauge(_Metric):
+    """
+    瞬时值，采集时调用回调读取，回调返回单个值或 标签值 -> 值
+    """
+    kind = "gauge"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str], lock: threading.Lock,
+                 callback: Callable[[], GaugeValue]):
+        super().__init__(name, documentation, labelnames, lock)
+        self._callback = callback
+
+    def render(self) -> List[str]:
+        """
+        输出文本格式的各行
+        """
+        value = self._callback()
+        series = value if isinstance(value, dict) else {(): value}
+        return self.header() + [f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(val)}"
+                                for key, val in series.items()]
+
+
+class MetricsRegistry:
+    """
+    轻量的 Prometheus 指标注册表，不依赖 prometheus_client，按插件实例独立保存。
+    """
+
+    def __init__(self, namespace: str):
+        self._namespace = namespace
+        self._lock = threading.Lock()
+        self._metrics: Dict[str, _Metric] = {}
+
+    def _register(self, metric: _Metric) -> _Metric:
+        """
+        注册指标，同名指标会被替换
+        """
+        self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+        """
+        注册计数器，名称自动加上命名空间前缀
+        """
+        return self._register(Counter(f"{self._namespace}_{name}", documentation, labelnames, self._lock))
+
+    def histogram(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                  buckets: Sequence[float] = DEFAULT_BUCKETS) -> Histogram:
+        """
+        注册直方图
+        """
+        return self._register(Histogram(f"{self._namespace}_{name}", documentation, labelnames, self._lock,
+                                        buckets=buckets))
+
+    def gauge(self, name: str, documentation: str, callback: Callable[[], GaugeValue],
+              labelnames: Sequence[str] = ()) -> Gauge:
+        """
+        注册瞬时值，采集时调用回调
+        """
+        return self._register(Gauge(f"{self._namespace}_{name}", documentation, labelnames, self._lock,
+                                    callback=callback))
+
+    def get(self, name: str) -> Optional[_Metric]:
+        """
+        按不带前缀的名称获取指标
+        """
+        return self._metrics.get(f"{self._namespace}_{name}")
+
+    def render(self) -> str:
+        """
+        输出 Prometheus 文本格式
+        """
+        lines = []
+        for metric in list(self._metrics.values()):
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+class DeliveryMetrics(MetricsRegistry):
+    """
+    消息推送的公共指标：发送结果、请求耗时、服务端错误码和重试次数
+    """
+
+    def __init__(self, namespace: str):
+        super().__init__(namespace)
+        self.sends = self.counter("sends_total", "按服务端、用户和结果统计的发送数",
+                                  ("provider", "user", "result"))
+        self.latency = self.histogram("request_duration_seconds", "HTTP 请求往返耗时（秒）", ("provider",))
+        self.errors = self.counter("provider_errors_total", "服务端返回的错误码", ("provider", "code"))
+        self.retries = self.counter("retries_total", "重试次数", ("provider", "kind"))
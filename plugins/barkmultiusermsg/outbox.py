@@ -0,0 +1,212 @@
+import json
+import random
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+
+from app.log import logger
+
+# 每轮最多重试的消息数
+BATCH_SIZE = 100
+# 死信保留时间（秒）及最大数量
+DEAD_RETENTION = 7 * 24 * 3600
+DEAD_MAX = 1000
+# 压缩间隔（秒）
+COMPACT_INTERVAL = 3600
+
+
+class Outbox:
+    """
+    持久化发件箱：发送失败的消息写入插件数据目录下的 SQLite 文件，
+    后台线程按指数退避加随机抖动重试，超过最大次数后转为死信，重启后继续重试。
+    """
+
+    def __init__(self, path: Path, deliver: Callable[[dict], bool], name: str = "outbox",
+                 max_attempts: int = 8, base_delay: float = 30, max_delay: float = 3600):
+        self._path = path
+        self._deliver = deliver
+        self._name = name
+        self._max_attempts = max(max_attempts, 1)
+        self._base_delay = base_delay
+        self._max_delay = max(max_delay, base_delay)
+        self._lock = threading.Lock()
+        self._event = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._compacted_at = 0.0
+        self._conn = self._connect()
+
+    def _connect(self) -> sqlite3.Connection:
+        """
+        打开数据库并建表
+        """
+        self._path.parent.mkdir(parents=True, exist_ok=True)
+        conn = sqlite3.connect(str(self._path), check_same_thread=False, isolation_level=None)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS outbox (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                recipient TEXT,
+                title TEXT,
+                payload TEXT NOT NULL,
+                attempts INTEGER NOT NULL DEFAULT 0,
+                next_at REAL NOT NULL,
+                created_at REAL NOT NULL,
+                last_error TEXT,
+                dead INTEGER NOT NULL DEFAULT 0
+            )
+        """)
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_outbox_due ON outbox (dead, next_at)")
+        return conn
+
+    def backoff(self, attempts: int) -> float:
+        """
+        第 N 次失败后的等待时间：指数增长，上限 max_delay，取 50%~100% 的随机抖动
+        """
+        delay = min(self._max_delay, self._base_delay * 2 ** max(attempts - 1, 0))
+        return delay * random.uniform(0.5, 1.0)
+
+    def configure(self, max_attempts: int, base_delay: float):
+        """
+        调整最大重试次数和首次重试间隔，已排队的消息在下次重试时按新参数计算
+        """
+        self._max_attempts = max(max_attempts, 1)
+        self._base_delay = base_delay
+        self._max_delay = max(self._max_delay, base_delay)
+
+    def add(self, payload: dict, recipient: str = None, title: str = None,
+            error: str = None, attempts: int = 1):
+        """
+        写入一条待重试的消息
+        :param payload: 重试所需的数据，需可序列化为 JSON
+        :param recipient: 接收方，仅用于展示
+        :param title: 标题，仅用于展示
+        :param error: 失败原因
+        :param attempts: 已尝试次数，0 表示尚未发送
+        """
+        now = time.time()
+        next_at = now + self.backoff(attempts) if attempts else now
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO outbox (recipient, title, payload, attempts, next_at, created_at, last_error) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (recipient, title, json.dumps(payload, ensure_ascii=False), attempts, next_at, now, error)
+            )
+        self._event.set()
+
+    def start(self):
+        """
+        启动后台重试线程
+        """
+        self._thread = threading.Thread(target=self._run, name=self._name, daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        """
+        后台线程：重试到期的消息，定期压缩
+        """
+        while self._thread is not None:
+            try:
+                self._retry_due()
+                if time.time() - self._compacted_at > COMPACT_INTERVAL:
+                    self.compact()
+            except Exception as err:
+                logger.error(f"{self._name} 重试异常：{str(err)}")
+            self._event.wait(self._wait_time())
+            self._event.clear()
+
+    def _wait_time(self) -> float:
+        """
+        距离下一条消息到期的时间
+        """
+        with self._lock:
+            row = self._conn.execute("SELECT MIN(next_at) FROM outbox WHERE dead = 0").fetchone()
+        if not row or row[0] is None:
+            return COMPACT_INTERVAL
+        return min(max(row[0] - time.time(), 0.1), COMPACT_INTERVAL)
+
+    def _retry_due(self):
+        """
+        重试所有到期的消息
+        """
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT id, payload, attempts FROM outbox WHERE dead = 0 AND next_at <= ? ORDER BY next_at LIMIT ?",
+                (time.time(), BATCH_SIZE)
+            ).fetchall()
+        for row_id, payload, attempts in rows:
+            if self._thread is None:
+                return
+            error = None
+            try:
+                ok = self._deliver(json.loads(payload))
+            except Exception as err:
+                ok, error = False, str(err)
+            attempts += 1
+            with self._lock:
+                if ok:
+                    self._conn.execute("DELETE FROM outbox WHERE id = ?", (row_id,))
+                elif attempts >= self._max_attempts:
+                    logger.warn(f"{self._name} 消息重试 {attempts} 次仍失败，转为死信")
+                    self._conn.execute("UPDATE outbox SET attempts = ?, dead = 1, "
+                                       "last_error = COALESCE(?, last_error, '重试次数已用尽') WHERE id = ?",
+                                       (attempts, error, row_id))
+                else:
+                    self._conn.execute("UPDATE outbox SET attempts = ?, next_at = ?, "
+                                       "last_error = COALESCE(?, last_error) WHERE id = ?",
+                                       (attempts, time.time() + self.backoff(attempts), error, row_id))
+
+    def compact(self):
+        """
+        清理过期和超量的死信，回收文件空间
+        """
+        with self._lock:
+            self._conn.execute("DELETE FROM outbox WHERE dead = 1 AND created_at < ?",
+                               (time.time() - DEAD_RETENTION,))
+            self._conn.execute(
+                "DELETE FROM outbox WHERE dead = 1 AND id NOT IN "
+                "(SELECT id FROM outbox WHERE dead = 1 ORDER BY id DESC LIMIT ?)", (DEAD_MAX,)
+            )
+            self._conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+            self._conn.execute("VACUUM")
+        self._compacted_at = time.time()
+
+    def items(self, dead: bool = False, limit: int = 100) -> List[Dict[str, Any]]:
+        """
+        查询待重试或死信消息
+        """
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT id, recipient, title, attempts, next_at, created_at, last_error "
+                "FROM outbox WHERE dead = ? ORDER BY id DESC LIMIT ?", (int(dead), limit)
+            ).fetchall()
+        return [{
+            "id": row[0],
+            "recipient": row[1],
+            "title": row[2],
+            "attempts": row[3],
+            "next_at": time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(row[4])),
+            "created_at": time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(row[5])),
+            "last_error": row[6]
+        } for row in rows]
+
+    def stats(self) -> Dict[str, int]:
+        """
+        待重试和死信数量
+        """
+        with self._lock:
+            rows = dict(self._conn.execute("SELECT dead, COUNT(*) FROM outbox GROUP BY dead").fetchall())
+        return {"pending": rows.get(0, 0), "dead": rows.get(1, 0)}
+
+    def stop(self, timeout: float = 10):
+        """
+        停止重试线程并关闭数据库，未发送的消息保留到下次启动
+        """
+        thread, self._thread = self._thread, None
+        self._event.set()
+        if thread:
+            thread.join(timeout)
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,63 @@
+import json
+from typing import Iterable, Mapping
+from urllib.parse import urlencode
+
+
+class FormBody:
+    """
+    表单请求体：公共字段只编码一次，发送时在前面拼接每个接收方的字段（如设备密钥）。
+    值为 None 的字段不发送，与 requests 的表单编码一致。
+    """
+    __slots__ = ("_tail",)
+
+    def __init__(self, fields: Mapping[str, object], exclude: Iterable[str] = ()):
+        """
+        :param fields: 公共字段
+        :param exclude: 由接收方字段覆盖的字段，不编码到公共部分
+        """
+        exclude = frozenset(exclude)
+        self._tail = urlencode([(k, v) for k, v in fields.items()
+                                if k not in exclude and v is not None]).encode("utf-8")
+
+    def encode(self, **fields: object) -> bytes:
+        """
+        拼接接收方字段，返回完整请求体
+        """
+        head = urlencode([(k, v) for k, v in fields.items() if v is not None]).encode("utf-8")
+        if head and self._tail:
+            return head + b"&" + self._tail
+        return head or self._tail
+
+
+class JsonBody:
+    """
+    JSON 请求体：公共字段只序列化一次，发送时在末尾拼接每个请求的接收方字段（如 UID 列表）。
+    """
+    __slots__ = ("_head", "_empty")
+
+    def __init__(self, fields: Mapping[str, object], exclude: Iterable[str] = ()):
+        """
+        :param fields: 公共字段
+        :param exclude: 由接收方字段覆盖的字段，不序列化到公共部分
+        """
+        exclude = frozenset(exclude)
+        shared = {k: v for k, v in fields.items() if k not in exclude}
+        # 去掉末尾的 }，拼接时补上
+        self._head = _dumps(shared)[:-1]
+        self._empty = not shared
+
+    def encode(self, **fields: object) -> bytes:
+        """
+        拼接接收方字段，返回完整请求体
+        """
+        if not fields:
+            return self._head + b"}"
+        tail = _dumps(fields)[1:]
+        return self._head + tail if self._empty else self._head + b"," + tail
+
+
+def _dumps(value: object) -> bytes:
+    """
+    紧凑序列化为 UTF-8 JSON
+    """
+    return json.dumps(value, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
@@ -0,0 +1,304 @@
+import heapq
+import itertools
+import json
+import re
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Mapping, Optional, Tuple
+
+from app.log import logger
+
+# 所有用户的默认免打扰时段
+DEFAULT_USER = "*"
+# 延后消息的数量上限，超出后不再延后而是立即发送
+MAX_DEFERRED = 10000
+
+_WINDOW = re.compile(r"^(?:(?P<name>[^:]+?)\s*:\s*)?(?P<start>\d{1,2}:\d{2})\s*-\s*(?P<end>\d{1,2}:\d{2})$")
+
+
+def _minutes(value: str) -> int:
+    """
+    HH:MM 转为当天的分钟数，24:00 表示当天结束
+    """
+    hour, minute = (int(part) for part in value.split(":"))
+    if hour > 24 or minute > 59 or (hour == 24 and minute):
+        raise ValueError(value)
+    return hour * 60 + minute
+
+
+class QuietHours:
+    """
+    免打扰时段：每个用户一个每日时段，开始时间大于结束时间表示跨午夜，未单独配置的用户使用默认时段
+    """
+
+    def __init__(self, windows: Mapping[str, Tuple[int, int]] = None):
+        """
+        :param windows: 用户名 -> (开始分钟, 结束分钟)，DEFAULT_USER 为默认时段
+        """
+        self._windows = dict(windows or {})
+        self._distinct = tuple(set(self._windows.values()))
+
+    def __bool__(self) -> bool:
+        return bool(self._windows)
+
+    @staticmethod
+    def _contains(window: Tuple[int, int], minute: int) -> bool:
+        start, end = window
+        if start <= end:
+            return start <= minute < end
+        return minute >= start or minute < end
+
+    def active(self, now: float) -> bool:
+        """
+        当前是否有任一时段生效，均未生效时无需逐个用户判断
+        """
+        moment = datetime.fromtimestamp(now)
+        minute = moment.hour * 60 + moment.minute
+        return any(self._contains(window, minute) for window in self._distinct)
+
+    def until(self, user: Optional[str], now: float) -> Optional[float]:
+        """
+        用户当前处于免打扰时段时返回时段结束的时间戳，否则返回 None
+        """
+        window = self._windows.get(user) if user else None
+        window = window or self._windows.get(DEFAULT_USER)
+        if not window:
+            return None
+        moment = datetime.fromtimestamp(now)
+        if not self._contains(window, moment.hour * 60 + moment.minute):
+            return None
+        end = moment.replace(hour=0, minute=0, second=0, microsecond=0) + timedelta(minutes=window[1])
+        if end <= moment:
+            end += timedelta(days=1)
+        return end.timestamp()
+
+
+def parse_quiet_hours(value: Optional[str], groups: Mapping[str, Tuple[str, ...]] = None) -> QuietHours:
+    """
+    解析免打扰配置，每行一个 用户名:开始-结束，如 user1:22:00-07:00；
+    省略用户名或写 * 表示所有用户，写组名时对组内每个用户生效，后面的行覆盖前面的
+    """
+    windows: Dict[str, Tuple[int, int]] = {}
+    for line in (value or "").splitlines():
+        line = line.strip()
+        if not line:
+            continue
+        match = _WINDOW.match(line)
+        try:
+            window = (_minutes(match.group("start")), _minutes(match.group("end"))) if match else None
+        except ValueError:
+            window = None
+        if not window or window[0] == window[1]:
+            logger.warn(f"无法识别的免打扰时段：{line}")
+            continue
+        name = (match.group("name") or DEFAULT_USER).strip()
+        for user in (groups or {}).get(name, (name,)):
+            windows[user] = window
+    return QuietHours(windows)
+
+
+class DeferredScheduler:
+    """
+    延后发送：消息按释放时间放入最小堆，后台线程在最早的释放时间唤醒。
+    到期的消息按接收方分组，每批最多释放 batch_size 个接收方，批次之间间隔 batch_interval 秒，
+    避免免打扰结束时集中推送。消息同时写入 SQLite，重启后恢复。
+    """
+
+    def __init__(self, path: Path, release: Callable[[str, List[dict]], Any], name: str = "deferred",
+                 batch_size: int = 20, batch_interval: float = 1, max_items: int = MAX_DEFERRED):
+        """
+        :param path: 数据库文件路径
+        :param release: 释放回调，参数为接收方和按到达顺序排列的消息
+        :param batch_size: 每批释放的接收方数
+        :param batch_interval: 批次间隔（秒）
+        :param max_items: 延后消息的数量上限
+        """
+        self._path = path
+        self._release = release
+        self._name = name
+        self._batch_size = max(batch_size, 1)
+        self._batch_interval = batch_interval
+        self._max_items = max(max_items, 1)
+        # 堆元素：(释放时间, 序号, 接收方, 消息, 行ID)
+        self._heap: List[Tuple[float, int, str, dict, int]] = []
+        self._seq = itertools.count()
+        self._cond = threading.Condition()
+        self._thread: Optional[threading.Thread] = None
+        self._closing = False
+        self._draining = False
+        self._released = 0
+        self._conn = self._connect()
+        self._load()
+
+    def _connect(self) -> sqlite3.Connection:
+        self._path.parent.mkdir(parents=True, exist_ok=True)
+        conn = sqlite3.connect(str(self._path), check_same_thread=False, isolation_level=None)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS deferred (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                release_at REAL NOT NULL,
+                recipient TEXT NOT NULL,
+                payload TEXT NOT NULL,
+                created_at REAL NOT NULL
+            )
+        """)
+        return conn
+
+    def _load(self):
+        """
+        恢复上次停止时未释放的消息，已过释放时间的在启动后立即释放
+        """
+        rows = self._conn.execute(
+            "SELECT id, release_at, recipient, payload FROM deferred ORDER BY release_at, id"
+        ).fetchall()
+        for row_id, release_at, recipient, payload in rows:
+            self._heap.append((release_at, next(self._seq), recipient, json.loads(payload), row_id))
+        heapq.heapify(self._heap)
+        if rows:
+            logger.info(f"{self._name} 恢复 {len(rows)} 条延后发送的消息")
+
+    def add(self, release_at: float, recipient: str, item: dict) -> bool:
+        """
+        加入一条延后消息
+        :return: 是否已接收，超出上限或已停止时返回 False 由调用方直接发送
+        """
+        with self._cond:
+            if self._closing or len(self._heap) >= self._max_items:
+                return False
+            row_id = self._conn.execute(
+                "INSERT INTO deferred (release_at, recipient, payload, created_at) VALUES (?, ?, ?, ?)",
+                (release_at, recipient, json.dumps(item, ensure_ascii=False), time.time())
+            ).lastrowid
+            entry = (release_at, next(self._seq), recipient, item, row_id)
+            heapq.heappush(self._heap, entry)
+            # 新消息成为最早释放的消息时唤醒后台线程重新计算等待时间
+            if self._heap[0] is entry:
+                self._cond.notify_all()
+            return True
+
+    def configure(self, batch_size: int, batch_interval: float):
+        """
+        调整每批释放的接收方数和批次间隔
+        """
+        with self._cond:
+            self._batch_size = max(batch_size, 1)
+            self._batch_interval = batch_interval
+
+    def release_now(self):
+        """
+        所有延后消息立即按批释放，用于取消免打扰
+        """
+        with self._cond:
+            self._heap = [(0, seq, recipient, item, row_id) for _, seq, recipient, item, row_id in self._heap]
+            heapq.heapify(self._heap)
+            self._cond.notify_all()
+
+    def start(self):
+        """
+        启动后台释放线程
+        """
+        self._thread = threading.Thread(target=self._run, name=self._name, daemon=True)
+        self._thread.start()
+
+    def _due(self) -> "OrderedDict[str, List[Tuple[dict, int]]]":
+        """
+        取出已到期的消息并按接收方分组，调用方需持有锁
+        """
+        now = time.time()
+        groups: "OrderedDict[str, List[Tuple[dict, int]]]" = OrderedDict()
+        while self._heap and self._heap[0][0] <= now:
+            _, _, recipient, item, row_id = heapq.heappop(self._heap)
+            groups.setdefault(recipient, []).append((item, row_id))
+        return groups
+
+    def _run(self):
+        """
+        后台线程：等待最早的释放时间，到期后分批释放
+        """
+        while True:
+            with self._cond:
+                due = self._due()
+                if not due:
+                    if self._closing:
+                        return
+                    timeout = self._heap[0][0] - time.time() if self._heap else None
+                    self._cond.wait(None if timeout is None else max(timeout, 0))
+                    continue
+                batch_size, batch_interval = self._batch_size, self._batch_interval
+            recipients = list(due.items())
+            for i in range(0, len(recipients), batch_size):
+                if i:
+                    with self._cond:
+                        if self._cond.wait_for(lambda: self._closing, timeout=batch_interval) and not self._draining:
+                            # 停止时尚未释放的消息放回，下次启动后释放
+                            for recipient, entries in recipients[i:]:
+                                for item, row_id in entries:
+                                    heapq.heappush(self._heap, (0, next(self._seq), recipient, item, row_id))
+                            return
+                for recipient, entries in recipients[i:i + batch_size]:
+                    self._release_one(recipient, entries)
+
+    def _release_one(self, recipient: str, entries: List[Tuple[dict, int]]):
+        """
+        释放一个接收方的消息，无论成功与否都从数据库删除，发送失败由发件箱重试
+        """
+        try:
+            self._release(recipient, [item for item, _ in entries])
+        except Exception as err:
+            logger.error(f"{self._name} 延后消息发送异常：{str(err)}")
+        row_ids = [row_id for _, row_id in entries]
+        with self._cond:
+            self._released += len(entries)
+            try:
+                self._conn.execute(f"DELETE FROM deferred WHERE id IN ({','.join('?' * len(row_ids))})", row_ids)
+            except sqlite3.Error as err:
+                # 停止超时后数据库已关闭，下次启动时会重复发送这些消息
+                logger.warn(f"{self._name} 删除已释放的消息失败：{str(err)}")
+
+    def items(self, limit: int = 100) -> List[Dict[str, Any]]:
+        """
+        按释放时间排列的延后消息
+        """
+        with self._cond:
+            entries = heapq.nsmallest(limit, self._heap)
+        return [{
+            "recipient": recipient,
+            "release_at": time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(release_at)),
+            "title": item.get("title")
+        } for release_at, _, recipient, item, _ in entries]
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        等待释放的消息数、接收方数和已释放数
+        """
+        with self._cond:
+            return {
+                "pending": len(self._heap),
+                "recipients": len({entry[2] for entry in self._heap}),
+                "next_release": time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(self._heap[0][0]))
+                if self._heap else None,
+                "released": self._released
+            }
+
+    def stop(self, timeout: float = 10, drain: bool = False):
+        """
+        停止释放线程并关闭数据库，未释放的消息保留到下次启动
+        :param drain: 先立即释放全部消息再停止，批次之间不再等待，用于取消免打扰
+        """
+        with self._cond:
+            self._closing = True
+            if drain:
+                self._draining = True
+                self._heap = [(0, seq, recipient, item, row_id) for _, seq, recipient, item, row_id in self._heap]
+                heapq.heapify(self._heap)
+            self._cond.notify_all()
+        if self._thread:
+            self._thread.join(timeout)
+            self._thread = None
+        with self._cond:
+            self._conn.close()
@@ -0,0 +1,136 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Iterable, Optional
+
+# 单个接收方令牌桶的最大缓存数量，超出后淘汰最久未使用的
+MAX_RECIPIENT_BUCKETS = 10000
+
+
+def overloaded(code: Optional[int]) -> bool:
+    """
+    状态码是否表示服务端限流（429）或服务端错误（5xx），只有这两类需要降低全局速率；
+    其它错误（如单个设备密钥失效）只影响单个接收方，不代表服务端过载
+    """
+    return code is not None and (code == 429 or 500 <= code < 600)
+
+
+class TokenBucket:
+    """
+    令牌桶，令牌不足时预支并返回需要等待的时间
+    """
+    __slots__ = ("base_rate", "rate", "capacity", "tokens", "updated")
+
+    def __init__(self, rate: float, capacity: float):
+        self.base_rate = rate
+        self.rate = rate
+        self.capacity = max(capacity, 1)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+
+    def reserve(self, now: float, tokens: float = 1) -> float:
+        """
+        取出令牌，允许透支
+        :return: 需要等待的秒数
+        """
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        self.tokens -= tokens
+        return -self.tokens / self.rate if self.tokens < 0 else 0
+
+
+class RateLimiter:
+    """
+    分级限流：服务端（推送地址）全局令牌桶 + 每个接收方的令牌桶。
+    令牌不足时延迟发送而不是丢弃；服务端返回限流或服务端错误时降低全局速率，成功后逐步恢复。
+    """
+
+    def __init__(self, rate: float, burst: float, recipient_rate: float, recipient_burst: float):
+        self._rate = rate
+        self._burst = burst
+        self._recipient_rate = recipient_rate
+        self._recipient_burst = recipient_burst
+        self._providers: Dict[Hashable, TokenBucket] = {}
+        self._recipients: "OrderedDict[Hashable, TokenBucket]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._delayed = 0
+        self._delay_total = 0.0
+
+    def acquire(self, provider: Hashable, recipients: Iterable[Hashable] = ()) -> float:
+        """
+        获取发送许可，必要时阻塞等待
+        :param provider: 服务端标识
+        :param recipients: 本次请求的接收方
+        :return: 实际等待的秒数
+        """
+        with self._lock:
+            now = time.monotonic()
+            bucket = self._providers.get(provider)
+            if not bucket:
+                bucket = self._providers[provider] = TokenBucket(self._rate, self._burst)
+            wait = bucket.reserve(now)
+            for recipient in recipients:
+                bucket = self._recipients.get(recipient)
+                if not bucket:
+                    bucket = self._recipients[recipient] = TokenBucket(self._recipient_rate,
+                                                                       self._recipient_burst)
+                    if len(self._recipients) > MAX_RECIPIENT_BUCKETS:
+                        self._recipients.popitem(last=False)
+                else:
+                    self._recipients.move_to_end(recipient)
+                wait = max(wait, bucket.reserve(now))
+            if wait > 0:
+                self._delayed += 1
+                self._delay_total += wait
+        if wait > 0:
+            time.sleep(wait)
+        return wait
+
+    def feedback(self, provider: Hashable, ok: bool):
+        """
+        根据发送结果调整服务端速率：服务端过载时减半（不低于基准的10%），成功时按基准的10%逐步恢复；
+        其它失败由调用方忽略，不在这里调整
+        """
+        with self._lock:
+            bucket = self._providers.get(provider)
+            if not bucket:
+                return
+            if ok:
+                bucket.rate = min(bucket.base_rate, bucket.rate + bucket.base_rate * 0.1)
+            else:
+                bucket.rate = max(bucket.base_rate * 0.1, bucket.rate * 0.5)
+
+    def configure(self, rate: float, burst: float, recipient_rate: float, recipient_burst: float):
+        """
+        调整速率和突发容量，已有令牌桶按新参数继续计算，保留当前令牌和降速状态
+        """
+        with self._lock:
+            for buckets, new_rate, new_burst in ((self._providers.values(), rate, burst),
+                                                 (self._recipients.values(), recipient_rate, recipient_burst)):
+                for bucket in buckets:
+                    bucket.rate = min(bucket.rate / bucket.base_rate * new_rate, new_rate)
+                    bucket.base_rate = new_rate
+                    bucket.capacity = max(new_burst, 1)
+                    bucket.tokens = min(bucket.tokens, bucket.capacity)
+            self._rate = rate
+            self._burst = burst
+            self._recipient_rate = recipient_rate
+            self._recipient_burst = recipient_burst
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        限流统计
+        """
+        with self._lock:
+            return {
+                "providers": {
+                    str(provider): {
+                        "rate": round(bucket.rate, 4),
+                        "base_rate": bucket.base_rate,
+                        "tokens": round(bucket.tokens, 2)
+                    } for provider, bucket in self._providers.items()
+                },
+                "recipients": len(self._recipients),
+                "delayed": self._delayed,
+                "delay_total": round(self._delay_total, 2)
+            }
@@ -0,0 +1,97 @@
+from dataclasses import dataclass, field
+from types import MappingProxyType
+from typing import FrozenSet, List, Mapping, Optional, Sequence, Tuple, Union
+from urllib.parse import parse_qs
+
+from app.schemas.types import NotificationType
+
+from .dispatch import PRIORITY_HIGH, PRIORITY_NORMAL, PRIORITY_BULK
+from .registry import RecipientRegistry, parse_groups, resolve_names
+
+
+@dataclass(frozen=True)
+class RoutingTable:
+    """
+    发送路由表，在 init_plugin 中一次性解析配置生成，之后只读，发送时只做查找
+    """
+    # 附加参数
+    params: Mapping[str, str] = field(default_factory=lambda: MappingProxyType({}))
+    # 开启发送的消息类型，为空表示全部
+    msgtypes: FrozenSet[str] = frozenset()
+    high_msgtypes: FrozenSet[str] = frozenset()
+    bulk_msgtypes: FrozenSet[str] = frozenset()
+    # 用户ID -> 设备密钥，请求体由附加参数和设备密钥组成，不再为每个用户单独保存
+    user_keys: RecipientRegistry = field(default_factory=RecipientRegistry)
+    # 组名 -> 用户ID列表
+    groups: Mapping[str, Tuple[str, ...]] = field(default_factory=lambda: MappingProxyType({}))
+    # 生成路由表的原始配置，重新加载时未变化的部分直接复用
+    sources: Mapping[str, Optional[str]] = field(default_factory=lambda: MappingProxyType({}), compare=False)
+
+    @classmethod
+    def build(cls, params: Optional[str], apikey: Optional[str], msgtypes: List[str] = None,
+              high_msgtypes: List[str] = None, bulk_msgtypes: List[str] = None,
+              groups: Optional[str] = None, previous: Optional["RoutingTable"] = None) -> "RoutingTable":
+        """
+        解析配置生成路由表
+        :param params: 附加参数，URL 查询字符串格式
+        :param apikey: 每行一个 用户名:密钥
+        :param groups: 每行一个 组名:用户1,用户2
+        :param previous: 上一次的路由表，原始配置未变化的部分不重新解析
+        """
+        sources = {"params": params, "apikey": apikey, "groups": groups}
+        reused = {key for key, value in sources.items()
+                  if previous and key in previous.sources and previous.sources[key] == value}
+        if "params" in reused:
+            extra = previous.params
+        else:
+            extra = MappingProxyType({k: v[0] for k, v in parse_qs(params or "").items()})
+        if "apikey" in reused:
+            user_keys = previous.user_keys
+        else:
+            entries = (line.split(':', 1) for line in (apikey or "").split() if ':' in line)
+            user_keys = RecipientRegistry((user_id, device_key) for user_id, device_key in entries
+                                          if user_id.strip())
+        return cls(params=extra,
+                   msgtypes=frozenset(msgtypes or ()),
+                   high_msgtypes=frozenset(high_msgtypes or ()),
+                   bulk_msgtypes=frozenset(bulk_msgtypes or ()),
+                   user_keys=user_keys,
+                   groups=previous.groups if "groups" in reused else parse_groups(groups),
+                   sources=MappingProxyType(sources))
+
+    @property
+    def device_keys(self) -> Tuple[str, ...]:
+        """
+        去重后的全部设备密钥，用于批量推送
+        """
+        return self.user_keys.targets
+
+    def resolve(self, names: Union[str, Sequence[str], None]) -> Tuple[str, ...]:
+        """
+        展开用户ID和组名，返回去重后的用户ID
+        """
+        return resolve_names(self.groups, names)
+
+    def select(self, user_ids: Sequence[str]) -> Mapping[str, str]:
+        """
+        已配置密钥的用户ID -> 设备密钥
+        """
+        return {user_id: self.user_keys[user_id] for user_id in user_ids if user_id in self.user_keys}
+
+    def accepts(self, msg_type: Optional[NotificationType]) -> bool:
+        """
+        消息类型是否开启发送
+        """
+        return not msg_type or not self.msgtypes or msg_type.name in self.msgtypes
+
+    def priority(self, msg_type: Optional[NotificationType]) -> int:
+        """
+        消息类型对应的发送队列优先级通道
+        """
+        if not msg_type:
+            return PRIORITY_NORMAL
+        if msg_type.name in self.high_msgtypes:
+            return PRIORITY_HIGH
+        if msg_type.name in self.bulk_msgtypes:
+            return PRIORITY_BULK
+        return PRIORITY_NORMAL
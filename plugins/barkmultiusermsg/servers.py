@@ -0,0 +1,237 @@
+import hashlib
+import re
+import threading
+import time
+from types import MappingProxyType
+from typing import Any, Callable, Dict, List, Mapping, Optional, Tuple
+
+from app.log import logger
+from app.utils.http import RequestUtils
+
+# 多服务器的分配方式
+SERVER_SHARD = "shard"  # 设备密钥按哈希分布到各服务器，要求各服务器共享设备注册数据
+SERVER_ASSIGN = "assign"  # 用户指定服务器，未指定的用户使用第一个服务器，服务器共享设备注册数据时才故障转移
+# 单次推送最多尝试的服务器数（首选 + 故障转移）
+FAILOVER_ATTEMPTS = 2
+# 缓存的设备排序数量上限
+MAX_ORDERS = 100000
+
+
+def parse_servers(value: Optional[str]) -> Tuple[str, ...]:
+    """
+    解析服务器列表，逗号、空白或换行分隔，去掉末尾的斜杠并去重
+    """
+    servers = (server.strip().rstrip("/") for server in re.split(r"[,\s]+", value or ""))
+    return tuple(dict.fromkeys(server for server in servers if server))
+
+
+def parse_assignments(value: Optional[str]) -> Mapping[str, str]:
+    """
+    解析用户指定的服务器，每行一个 用户名:服务器地址
+    """
+    assignments = {}
+    for line in (value or "").splitlines():
+        user_id, _, server = line.partition(":")
+        user_id, server = user_id.strip(), server.strip().rstrip("/")
+        if user_id and server:
+            assignments[user_id] = server
+    return MappingProxyType(assignments)
+
+
+class _Health:
+    """
+    单个服务器的健康状态
+    """
+    __slots__ = ("healthy", "checked_at", "failures", "latency", "error")
+
+    def __init__(self):
+        self.healthy = True
+        self.checked_at = 0.0
+        self.failures = 0
+        self.latency = 0.0
+        self.error: Optional[str] = None
+
+
+class ServerPool:
+    """
+    多个 Bark 服务器：按用户指定或设备密钥哈希选择服务器，后台定时检查健康状态，
+    不健康的服务器被跳过，其设备按最高随机权重哈希（rendezvous）转移到其余服务器，恢复后自动回归。
+    """
+
+    def __init__(self, servers: Tuple[str, ...], mode: str = SERVER_ASSIGN,
+                 assignments: Mapping[str, str] = None, interval: float = 30, timeout: float = 5,
+                 name: str = "servers", shared: bool = False):
+        """
+        :param servers: 服务器地址列表
+        :param mode: 分配方式
+        :param assignments: 用户ID -> 服务器地址，指定但不在列表中的服务器会加入列表
+        :param shared: 各服务器是否共享设备注册数据，按用户指定时只有共享才转移到其余服务器
+        :param interval: 健康检查间隔（秒）
+        :param timeout: 健康检查超时（秒）
+        """
+        self._mode = mode
+        self._shared = shared
+        self._assignments = (assignments or {}) if mode == SERVER_ASSIGN else {}
+        self._servers = tuple(dict.fromkeys((*servers, *self._assignments.values())))
+        self._interval = interval
+        self._timeout = timeout
+        self._name = name
+        self._health: Dict[str, _Health] = {server: _Health() for server in self._servers}
+        self._orders: Dict[str, Tuple[str, ...]] = {}
+        self._lock = threading.Lock()
+        self._event = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def servers(self) -> Tuple[str, ...]:
+        """
+        全部服务器
+        """
+        return self._servers
+
+    @property
+    def primary(self) -> Optional[str]:
+        """
+        第一个服务器，用户未指定服务器时使用
+        """
+        return self._servers[0] if self._servers else None
+
+    def _order(self, device_key: str) -> Tuple[str, ...]:
+        """
+        设备密钥在各服务器上的权重排序，同一设备总是得到相同的顺序，增删服务器时只有少量设备迁移
+        """
+        order = self._orders.get(device_key)
+        if order is None:
+            order = tuple(sorted(self._servers, reverse=True,
+                                 key=lambda server: hashlib.blake2b(f"{server}\0{device_key}".encode("utf-8"),
+                                                                    digest_size=8).digest()))
+            if len(self._orders) >= MAX_ORDERS:
+                self._orders.clear()
+            self._orders[device_key] = order
+        return order
+
+    def preference(self, device_key: str, user_id: Optional[str] = None) -> Tuple[str, ...]:
+        """
+        设备的服务器优先顺序，用户指定的服务器排在最前；
+        按用户指定且服务器不共享设备注册数据时，设备只注册在指定的服务器上，只返回该服务器
+        """
+        if len(self._servers) == 1:
+            return self._servers
+        if self._mode == SERVER_ASSIGN:
+            preferred = self._assignments.get(user_id) or self.primary
+            if not self._shared:
+                return (preferred,)
+            return (preferred, *(server for server in self._order(device_key) if server != preferred))
+        return self._order(device_key)
+
+    def route(self, device_key: str, user_id: Optional[str] = None,
+              unavailable: Callable[[str], bool] = None) -> List[str]:
+        """
+        本次推送依次尝试的服务器：按优先顺序取健康的服务器，全部不健康时只尝试首选服务器
+        :param unavailable: 额外的不可用判断，如熔断状态
+        """
+        preference = self.preference(device_key, user_id)
+        healthy = [server for server in preference
+                   if self.healthy(server) and not (unavailable and unavailable(server))]
+        return healthy[:FAILOVER_ATTEMPTS] or [preference[0]]
+
+    def partition(self, user_keys: Mapping[str, str],
+                  unavailable: Callable[[str], bool] = None) -> Dict[str, Dict[str, str]]:
+        """
+        将用户按首选的健康服务器分组，用于批量推送
+        :return: 服务器 -> {用户ID: 设备密钥}
+        """
+        groups: Dict[str, Dict[str, str]] = {}
+        for user_id, device_key in user_keys.items():
+            server = self.route(device_key, user_id, unavailable)[0]
+            groups.setdefault(server, {})[user_id] = device_key
+        return groups
+
+    def healthy(self, server: str) -> bool:
+        """
+        最近一次健康检查是否通过，未检查过视为健康
+        """
+        health = self._health.get(server)
+        return health is None or health.healthy
+
+    def check(self, server: str) -> bool:
+        """
+        检查单个服务器，请求 /healthz 返回 200 视为健康
+        """
+        start = time.monotonic()
+        error = None
+        try:
+            res = RequestUtils(timeout=self._timeout).get_res(f"{server}/healthz")
+            ok = res is not None and res.status_code == 200
+            if not ok:
+                error = f"错误码：{res.status_code}" if res is not None else "未获取到返回信息"
+        except Exception as err:
+            ok, error = False, str(err)
+        with self._lock:
+            health = self._health[server]
+            if health.healthy and not ok:
+                logger.warn(f"{self._name} 服务器 {server} 健康检查失败：{error}，暂停向其发送")
+            elif not health.healthy and ok:
+                logger.info(f"{self._name} 服务器 {server} 已恢复")
+            health.healthy = ok
+            health.checked_at = time.time()
+            health.failures = 0 if ok else health.failures + 1
+            health.latency = time.monotonic() - start
+            health.error = error
+        return ok
+
+    def check_all(self):
+        """
+        检查所有服务器
+        """
+        for server in self._servers:
+            if self._event.is_set():
+                return
+            self.check(server)
+
+    def start(self):
+        """
+        启动后台健康检查，只有一个服务器时无需检查
+        """
+        if len(self._servers) < 2 or self._thread:
+            return
+        self._event.clear()
+        self._thread = threading.Thread(target=self._run, name=f"{self._name}-health", daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        """
+        定时检查所有服务器
+        """
+        while not self._event.is_set():
+            try:
+                self.check_all()
+            except Exception as err:
+                logger.error(f"{self._name} 健康检查异常：{str(err)}")
+            self._event.wait(self._interval)
+
+    def stop(self):
+        """
+        停止后台健康检查
+        """
+        self._event.set()
+        if self._thread:
+            self._thread.join(timeout=self._timeout + 1)
+            self._thread = None
+
+    def states(self) -> Dict[str, Dict[str, Any]]:
+        """
+        各服务器的健康状态
+        """
+        with self._lock:
+            return {
+                server: {
+                    "healthy": health.healthy,
+                    "failures": health.failures,
+                    "latency_ms": round(health.latency * 1000, 1),
+                    "checked_at": time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(health.checked_at))
+                    if health.checked_at else None,
+                    "error": health.error,
+                    "assigned": sum(1 for assigned in self._assignments.values() if assigned == server)
+                } for server, health in self._health.items()
+            }
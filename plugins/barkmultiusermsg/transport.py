@@ -0,0 +1,188 @@
+import asyncio
+import threading
+from concurrent.futures import Future
+from typing import Any, Dict, Optional
+from urllib.parse import urlparse
+
+from app.log import logger
+
+try:
+    import httpx
+except ImportError:
+    httpx = None
+
+try:
+    import h2  # noqa: F401
+except ImportError:
+    h2 = None
+
+# 传输方式
+TRANSPORT_BLOCKING = "blocking"
+TRANSPORT_ASYNC = "async"
+
+
+def async_available() -> bool:
+    """
+    是否安装了异步传输依赖的 httpx
+    """
+    return httpx is not None
+
+
+class AsyncResponse:
+    """
+    httpx 响应的包装，提供与 requests.Response 相同的常用属性
+    """
+    __slots__ = ("_res",)
+
+    def __init__(self, res: "httpx.Response"):
+        self._res = res
+
+    @property
+    def status_code(self) -> int:
+        return self._res.status_code
+
+    @property
+    def reason(self) -> str:
+        return self._res.reason_phrase
+
+    @property
+    def headers(self) -> Any:
+        return self._res.headers
+
+    @property
+    def text(self) -> str:
+        return self._res.text
+
+    @property
+    def elapsed(self) -> float:
+        """
+        从发送请求到读取完响应的耗时（秒）
+        """
+        return self._res.elapsed.total_seconds()
+
+    @property
+    def http_version(self) -> str:
+        return self._res.http_version
+
+    def json(self) -> Any:
+        return self._res.json()
+
+
+class AsyncTransport:
+    """
+    基于 httpx 的异步传输，运行在插件自己的事件循环线程中。
+    安装了 h2 时同一主机的请求复用一个 HTTP/2 连接多路并发，不再需要每个请求占用一个线程。
+    对外提供与 SessionPool 相同的同步 post 和 stats 接口，另外提供 submit 用于批量并发提交。
+    """
+
+    def __init__(self, pool_size: int = 10, keepalive: bool = True,
+                 connect_timeout: float = 5, read_timeout: float = 20, name: str = "transport"):
+        """
+        :param pool_size: 每个主机的最大连接数，HTTP/2 下通常只使用一个
+        :param name: 事件循环线程名称
+        """
+        if httpx is None:
+            raise RuntimeError("异步传输需要安装 httpx")
+        self._timeout = connect_timeout + read_timeout
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._run, name=f"{name}-loop", daemon=True)
+        self._client = None
+        self._client_args = {
+            "http2": h2 is not None,
+            "timeout": httpx.Timeout(read_timeout, connect=connect_timeout),
+            "limits": httpx.Limits(max_connections=pool_size,
+                                   max_keepalive_connections=pool_size if keepalive else 0)
+        }
+        self._lock = threading.Lock()
+        self._stats: Dict[str, Dict[str, int]] = {}
+        self._thread.start()
+
+    @property
+    def http2(self) -> bool:
+        """
+        是否启用 HTTP/2
+        """
+        return self._client_args["http2"]
+
+    def _run(self):
+        """
+        事件循环线程
+        """
+        asyncio.set_event_loop(self._loop)
+        self._loop.run_forever()
+
+    def _count(self, host: str, **values: int):
+        """
+        累加主机统计
+        """
+        with self._lock:
+            stats = self._stats.setdefault(host, {"requests": 0, "in_flight": 0, "http2": 0, "errors": 0})
+            for key, value in values.items():
+                stats[key] += value
+
+    async def _post(self, url: str, content_type: Optional[str], data: Any) -> Optional[AsyncResponse]:
+        """
+        在事件循环中发送请求，异常时返回 None，与 RequestUtils.post_res 一致
+        """
+        if self._client is None:
+            # 客户端必须在事件循环中创建
+            self._client = httpx.AsyncClient(**self._client_args)
+        host = urlparse(url).netloc
+        headers = {"Content-Type": content_type} if content_type else None
+        self._count(host, requests=1, in_flight=1)
+        try:
+            res = await self._client.post(url, content=data, headers=headers)
+            if res.http_version == "HTTP/2":
+                self._count(host, http2=1)
+            return AsyncResponse(res)
+        except Exception as err:
+            self._count(host, errors=1)
+            logger.debug(f"{url} 请求失败：{str(err)}")
+            return None
+        finally:
+            self._count(host, in_flight=-1)
+
+    def submit(self, url: str, content_type: Optional[str] = None, data: Any = None) -> Future:
+        """
+        提交请求到事件循环，立即返回，结果为响应或 None
+        """
+        return asyncio.run_coroutine_threadsafe(self._post(url, content_type, data), self._loop)
+
+    def post(self, url: str, content_type: Optional[str] = None, data: Any = None) -> Optional[AsyncResponse]:
+        """
+        同步发送请求，等待事件循环返回结果
+        """
+        future = self.submit(url, content_type, data)
+        try:
+            return future.result(timeout=self._timeout)
+        except Exception as err:
+            future.cancel()
+            logger.debug(f"{url} 请求超时：{str(err)}")
+            return None
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        按主机统计请求数、进行中的请求数、HTTP/2 请求数和失败数
+        """
+        with self._lock:
+            return {host: dict(stats) for host, stats in self._stats.items()}
+
+    def close(self, timeout: float = 5):
+        """
+        关闭客户端并停止事件循环
+        """
+        if self._loop.is_closed():
+            return
+
+        async def shutdown():
+            if self._client is not None:
+                await self._client.aclose()
+
+        try:
+            asyncio.run_coroutine_threadsafe(shutdown(), self._loop).result(timeout=timeout)
+        except Exception as err:
+            logger.debug(f"关闭异步传输失败：{str(err)}")
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join(timeout=timeout)
+        if not self._thread.is_alive():
+            self._loop.close()
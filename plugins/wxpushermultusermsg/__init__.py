@@ -1,10 +1,33 @@
-from typing import Any, List, Dict, Tuple, Optional
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import nullcontext
+from typing import Any, List, Dict, Tuple, Optional, Union
+from urllib.parse import urlparse
+
+from fastapi.responses import PlainTextResponse
 
 from app.core.event import eventmanager, Event
 from app.log import logger
 from app.plugins import _PluginBase
 from app.schemas.types import EventType, NotificationType
-from app.utils.http import RequestUtils
+
+from .breaker import CircuitBreaker, CircuitOpenError, STATE_OPEN
+from .cache import TTLCache, content_key
+from .chunking import MAX_UIDS, MAX_TOPIC_IDS, RECIPIENT_FIELDS, merge_report, split_payload
+from .coalesce import Coalescer, build_digest
+from .deliverylog import DeliveryLog, LOG_VERBOSE, LOG_STRUCTURED
+from .dispatch import DispatchQueue, OVERFLOW_DROP_OLDEST, OVERFLOW_DROP_NEWEST, OVERFLOW_BLOCK
+from .history import DeliveryHistory, parse_time
+from .metrics import CONTENT_TYPE, DeliveryMetrics
+from .outbox import Outbox
+from .payload import JsonBody
+from .quiet import DEFAULT_USER, DeferredScheduler, QuietHours, parse_quiet_hours
+from .ratelimit import RateLimiter, overloaded
+from .reloader import Reloader
+from .routing import RoutingTable, parse_uids, split_ids
+from .session import SessionPool
+from .tracing import Tracer, decode_json, phase
+from .transport import AsyncTransport, TRANSPORT_ASYNC, TRANSPORT_BLOCKING, async_available
 
 class WxPusherMultUserMsg(_PluginBase):
     """
@@ -14,7 +37,7 @@ class WxPusherMultUserMsg(_PluginBase):
     plugin_name: str = "WxPusher多用户消息推送"
     plugin_desc: str = "支持微信(暂时停止)、APP(无后台)、浏览器插件通知。"
     plugin_icon: str = "WxPusherMsg_A.png"
-    plugin_version: str = "1.0"
+    plugin_version: str = "3.0"
     plugin_author: str = "weimh"
     author_url: str = "https://github.com/weiminghaoo"
     plugin_config_prefix: str = "wxpushermultmsg_"
@@ -22,6 +45,9 @@ class WxPusherMultUserMsg(_PluginBase):
     auth_level: int = 1
     api_url: str = "https://wxpusher.zjiecode.com/api/send/message"
     default_content_type: int = 1
+    # 分片失败后立即重试的次数及间隔（秒）
+    chunk_retries: int = 1
+    chunk_retry_delay: float = 1
 
     # 插件配置属性
     _enabled: bool = False
@@ -29,64 +55,420 @@ class WxPusherMultUserMsg(_PluginBase):
     _contentType: int = default_content_type
     _uids: Optional[str] = None
     _topicIds: Optional[str] = None
+    _groups: Optional[str] = None
     _msgtypes: List[str] = []
+    _high_msgtypes: List[str] = []
+    _bulk_msgtypes: List[str] = []
     _onlyonce: bool = False
-    _user_uids: dict = {}  # 用户名到UID的映射
+    _routes: Optional[RoutingTable] = None  # 发送路由表
+    _pool_size: int = 10
+    _keepalive: bool = True
+    _connect_timeout: int = 5
+    _read_timeout: int = 20
+    _transport: str = TRANSPORT_BLOCKING
+    _pool: Union[SessionPool, AsyncTransport, None] = None
+    _async_send: bool = True
+    _queue_size: int = 1000
+    _queue_workers: int = 2
+    _overflow: str = OVERFLOW_DROP_OLDEST
+    _block_timeout: int = 5
+    _queue: Optional[DispatchQueue] = None
+    _coalesce: bool = False
+    _coalesce_window: int = 10
+    _coalesce_max_items: int = 20
+    _coalesce_max_delay: int = 60
+    _coalescer: Optional[Coalescer] = None
+    _dedup: bool = False
+    _dedup_window: int = 300
+    _dedup_size: int = 10000
+    _dedup_cache: Optional[TTLCache] = None
+    _rate_limit: bool = False
+    _rate: int = 600
+    _burst: int = 20
+    _recipient_rate: int = 30
+    _recipient_burst: int = 5
+    _limiter: Optional[RateLimiter] = None
+    _outbox_enabled: bool = False
+    _retry_max: int = 8
+    _retry_delay: int = 30
+    _outbox: Optional[Outbox] = None
+    _history_enabled: bool = True
+    _history_size: int = 10000
+    _history_disk: bool = False
+    _history_days: int = 7
+    _history: Optional[DeliveryHistory] = None
+    _quiet_hours: Optional[str] = None
+    _quiet_summary: bool = True
+    _quiet_batch_size: int = 20
+    _quiet_batch_interval: int = 1
+    _quiet: Optional[QuietHours] = None
+    _scheduler: Optional[DeferredScheduler] = None
+    _breaker_enabled: bool = True
+    _breaker_threshold: int = 5
+    _breaker_reset: int = 60
+    _breaker: Optional[CircuitBreaker] = None
+    _uid_chunk_size: int = MAX_UIDS
+    _topic_chunk_size: int = MAX_TOPIC_IDS
+    _chunk_workers: int = 4
+    _executor: Optional[ThreadPoolExecutor] = None
+    _metrics: Optional[DeliveryMetrics] = None
+    _trace_enabled: bool = False
+    _trace_size: int = 20
+    _tracer: Optional[Tracer] = None
+    _log_mode: str = LOG_VERBOSE
+    _log_sample_rate: int = 10
+    _log_body_limit: int = 50
+    _log: Optional[DeliveryLog] = None
+    _reloader: Optional[Reloader] = None
 
     def init_plugin(self, config: Optional[dict] = None) -> None:
         """
-        插件初始化，加载配置。
-        """
-        if config:
-            self._enabled = config.get("enabled", False)
-            self._appToken = config.get("appToken")
-            self._contentType = config.get("contentType", self.default_content_type)
-            self._uids = config.get("uids")
-            self._topicIds = config.get("topicIds")
-            self._msgtypes = config.get("msgtypes") or []
-            self._onlyonce = config.get("onlyonce", False)
-
-            # 解析用户名到UID的映射关系
-            self._user_uids = {}
-            if self._uids:
-                for item in self._uids.split(","):
-                    item = item.strip()
-                    if ':' in item:
-                        # 格式为 username:uid
-                        username, uid = item.split(':', 1)
-                        self._user_uids[username.strip()] = uid.strip()
-                    elif item:
-                        # 格式为纯UID，保留原有行为
-                        # 将纯UID添加到一个特殊列表中，用于没有指定用户名时的默认发送
-                        if not hasattr(self, '_pure_uids'):
-                            self._pure_uids = []
-                        self._pure_uids.append(item)
-
-            # 立即运行一次逻辑
-            if self._onlyonce:
-                try:
-                    event = Event(EventType.NoticeMessage, {
-                        "type": NotificationType.SiteMessage,
-                        "title": "测试消息",
-                        "text": "这是一条测试消息，用于验证WxPusher消息发送功能是否正常。",
-                        "summary": "测试消息",
-                        "force_send": True
-                    })
-                    self.send(event)
-                except Exception as e:
-                    logger.error(f"WxPusher立即运行一次失败：{str(e)}")
-                # 关闭一次性开关并保存配置
-                self._onlyonce = False
-                if hasattr(self, 'update_config'):
-                    self.update_config({
-                        "enabled": self._enabled,
-                        "appToken": self._appToken,
-                        "contentType": self._contentType,
-                        "uids": self._uids,
-                        "topicIds": self._topicIds,
-                        "msgtypes": self._msgtypes,
-                        "onlyonce": False
-                    })
+        插件初始化，加载配置。保存配置时只调整变化的部分，连接池、发送队列和缓存保留。
+        """
+        if not config:
+            self.stop_service()
+            return
+        if not self._reloader:
+            self._reloader = Reloader()
+        with self._reloader.lock:
+            self._reloader.begin()
+            self._load_config(config)
+            if self._enabled:
+                self._apply_config()
+                if self._reloader.summary():
+                    logger.info(f"WxPusher配置已加载，更新：{', '.join(self._reloader.summary())}")
+            else:
+                # 未启用时不创建线程池、发送队列、发件箱和延后调度等后台线程
+                self.stop_service()
+
+        # 立即运行一次逻辑
+        if self._onlyonce:
+            try:
+                event = Event(EventType.NoticeMessage, {
+                    "type": NotificationType.SiteMessage,
+                    "title": "测试消息",
+                    "text": "这是一条测试消息，用于验证WxPusher消息发送功能是否正常。",
+                    "summary": "测试消息",
+                    "force_send": True
+                })
+                self.send(event)
+            except Exception as e:
+                logger.error(f"WxPusher立即运行一次失败：{str(e)}")
+            # 关闭一次性开关并保存配置
+            self._onlyonce = False
+            if hasattr(self, 'update_config'):
+                self.update_config({
+                    "enabled": self._enabled,
+                    "appToken": self._appToken,
+                    "contentType": self._contentType,
+                    "uids": self._uids,
+                    "topicIds": self._topicIds,
+                    "groups": self._groups,
+                    "msgtypes": self._msgtypes,
+                    "high_msgtypes": self._high_msgtypes,
+                    "bulk_msgtypes": self._bulk_msgtypes,
+                    "onlyonce": False,
+                    "pool_size": self._pool_size,
+                    "transport": self._transport,
+                    "keepalive": self._keepalive,
+                    "connect_timeout": self._connect_timeout,
+                    "read_timeout": self._read_timeout,
+                    "async_send": self._async_send,
+                    "queue_size": self._queue_size,
+                    "queue_workers": self._queue_workers,
+                    "overflow": self._overflow,
+                    "block_timeout": self._block_timeout,
+                    "coalesce": self._coalesce,
+                    "coalesce_window": self._coalesce_window,
+                    "coalesce_max_items": self._coalesce_max_items,
+                    "coalesce_max_delay": self._coalesce_max_delay,
+                    "dedup": self._dedup,
+                    "dedup_window": self._dedup_window,
+                    "dedup_size": self._dedup_size,
+                    "rate_limit": self._rate_limit,
+                    "rate": self._rate,
+                    "burst": self._burst,
+                    "recipient_rate": self._recipient_rate,
+                    "recipient_burst": self._recipient_burst,
+                    "outbox": self._outbox_enabled,
+                    "retry_max": self._retry_max,
+                    "retry_delay": self._retry_delay,
+                    "history": self._history_enabled,
+                    "history_size": self._history_size,
+                    "history_disk": self._history_disk,
+                    "history_days": self._history_days,
+                    "quiet_hours": self._quiet_hours,
+                    "quiet_summary": self._quiet_summary,
+                    "quiet_batch_size": self._quiet_batch_size,
+                    "quiet_batch_interval": self._quiet_batch_interval,
+                    "breaker": self._breaker_enabled,
+                    "breaker_threshold": self._breaker_threshold,
+                    "breaker_reset": self._breaker_reset,
+                    "uid_chunk_size": self._uid_chunk_size,
+                    "topic_chunk_size": self._topic_chunk_size,
+                    "chunk_workers": self._chunk_workers,
+                    "trace": self._trace_enabled,
+                    "trace_size": self._trace_size,
+                    "log_mode": self._log_mode,
+                    "log_sample_rate": self._log_sample_rate,
+                    "log_body_limit": self._log_body_limit
+                })
+
+    def _load_config(self, config: dict) -> None:
+        """
+        读取配置，生成新的路由表后整体替换，发送时读到的总是一份完整的配置。
+        """
+        self._enabled = config.get("enabled", False)
+        self._appToken = config.get("appToken")
+        self._contentType = config.get("contentType", self.default_content_type)
+        self._uids = config.get("uids")
+        self._topicIds = config.get("topicIds")
+        self._groups = config.get("groups")
+        self._msgtypes = config.get("msgtypes") or []
+        self._high_msgtypes = config.get("high_msgtypes") or []
+        self._bulk_msgtypes = config.get("bulk_msgtypes") or []
+        self._onlyonce = config.get("onlyonce", False)
+        self._pool_size = self._to_int(config.get("pool_size"), 10)
+        self._keepalive = config.get("keepalive", True)
+        self._connect_timeout = self._to_int(config.get("connect_timeout"), 5)
+        self._read_timeout = self._to_int(config.get("read_timeout"), 20)
+        self._transport = config.get("transport") or TRANSPORT_BLOCKING
+        self._async_send = config.get("async_send", True)
+        self._queue_size = self._to_int(config.get("queue_size"), 1000)
+        self._queue_workers = self._to_int(config.get("queue_workers"), 2)
+        self._overflow = config.get("overflow") or OVERFLOW_DROP_OLDEST
+        self._block_timeout = self._to_int(config.get("block_timeout"), 5)
+        self._coalesce = config.get("coalesce", False)
+        self._coalesce_window = self._to_int(config.get("coalesce_window"), 10)
+        self._coalesce_max_items = self._to_int(config.get("coalesce_max_items"), 20)
+        self._coalesce_max_delay = self._to_int(config.get("coalesce_max_delay"), 60)
+        self._dedup = config.get("dedup", False)
+        self._dedup_window = self._to_int(config.get("dedup_window"), 300)
+        self._dedup_size = self._to_int(config.get("dedup_size"), 10000)
+        self._rate_limit = config.get("rate_limit", False)
+        self._rate = self._to_int(config.get("rate"), 600)
+        self._burst = self._to_int(config.get("burst"), 20)
+        self._recipient_rate = self._to_int(config.get("recipient_rate"), 30)
+        self._recipient_burst = self._to_int(config.get("recipient_burst"), 5)
+        self._outbox_enabled = config.get("outbox", False)
+        self._retry_max = self._to_int(config.get("retry_max"), 8)
+        self._retry_delay = self._to_int(config.get("retry_delay"), 30)
+        self._history_enabled = config.get("history", True)
+        self._history_size = self._to_int(config.get("history_size"), 10000)
+        self._history_disk = config.get("history_disk", False)
+        self._history_days = self._to_int(config.get("history_days"), 7)
+        self._quiet_hours = config.get("quiet_hours")
+        self._quiet_summary = config.get("quiet_summary", True)
+        self._quiet_batch_size = self._to_int(config.get("quiet_batch_size"), 20)
+        self._quiet_batch_interval = self._to_int(config.get("quiet_batch_interval"), 1)
+        self._breaker_enabled = config.get("breaker", True)
+        self._breaker_threshold = self._to_int(config.get("breaker_threshold"), 5)
+        self._breaker_reset = self._to_int(config.get("breaker_reset"), 60)
+        self._uid_chunk_size = self._to_int(config.get("uid_chunk_size"), MAX_UIDS)
+        self._topic_chunk_size = self._to_int(config.get("topic_chunk_size"), MAX_TOPIC_IDS)
+        self._chunk_workers = self._to_int(config.get("chunk_workers"), 4)
+        self._trace_enabled = config.get("trace", False)
+        self._trace_size = self._to_int(config.get("trace_size"), 20)
+        self._log_mode = config.get("log_mode") or LOG_VERBOSE
+        self._log_sample_rate = self._to_non_negative(config.get("log_sample_rate"), 10, 100)
+        self._log_body_limit = self._to_non_negative(config.get("log_body_limit"), 50)
+
+        # 解析用户名到UID的映射、主题和消息类型，未变化的部分复用上一次的解析结果
+        if self._reloader.changed("routes", self._appToken, self._contentType, self._uids, self._topicIds,
+                                  self._groups, tuple(self._msgtypes), tuple(self._high_msgtypes),
+                                  tuple(self._bulk_msgtypes)):
+            routes = RoutingTable.build(app_token=self._appToken,
+                                        content_type=self._contentType,
+                                        uids=self._uids,
+                                        topic_ids=self._topicIds,
+                                        msgtypes=self._msgtypes,
+                                        high_msgtypes=self._high_msgtypes,
+                                        bulk_msgtypes=self._bulk_msgtypes,
+                                        groups=self._groups,
+                                        previous=self._routes)
+            previous = self._routes or RoutingTable()
+            if routes.user_uids is not previous.user_uids:
+                if routes.user_uids.duplicates:
+                    logger.warn(f"WxPusher UID配置中有 {routes.user_uids.duplicates} 条重复，已忽略")
+                diff = previous.user_uids.diff(routes.user_uids)
+                if any(diff.values()):
+                    logger.info(f"WxPusher UID已更新：新增 {len(diff['added'])} 个，移除 {len(diff['removed'])} 个，"
+                                f"变更 {len(diff['changed'])} 个")
+            self._routes = routes
+
+        # 免打扰时段中的组名展开为组内用户
+        if self._reloader.changed("quiet", self._quiet_hours, self._groups):
+            self._quiet = parse_quiet_hours(self._quiet_hours, self._routes.groups)
+
+    def _apply_config(self) -> None:
+        """
+        按配置创建、调整或停止各组件，配置未变化的组件原样保留。
+        组件整体替换，正在发送的消息继续使用已取到的旧组件，旧组件在替换后关闭。
+        """
+        reloader = self._reloader
+
+        # 发送日志，结构化模式下每次投递一行并按比例采样
+        if reloader.changed("log", self._log_mode, self._log_sample_rate, self._log_body_limit):
+            self._log = DeliveryLog("wxpusher", mode=self._log_mode,
+                                    sample_rate=self._log_sample_rate,
+                                    body_limit=self._log_body_limit)
+
+        # 发送指标，通过 /metrics 以 Prometheus 格式输出，重新加载时计数保留
+        if not self._metrics:
+            self._metrics = self._init_metrics()
+
+        # 连接参数变化时才重建连接池，已建立的长连接保留
+        if reloader.changed("pool", self._transport, self._pool_size, self._keepalive,
+                            self._connect_timeout, self._read_timeout, self._trace_enabled):
+            pool, self._pool = self._pool, self._create_pool()
+            if pool:
+                pool.close()
+
+        # 记录请求各阶段耗时，保留最慢的若干次
+        if reloader.changed("tracer", self._trace_enabled, self._trace_size):
+            self._tracer = Tracer(size=self._trace_size) if self._trace_enabled else None
+
+        # 超过单次请求上限的UID和主题拆分为多个请求并行发送，旧线程池执行完已提交的任务后退出
+        if reloader.changed("executor", self._chunk_workers):
+            executor = self._executor
+            self._executor = ThreadPoolExecutor(max_workers=self._chunk_workers,
+                                                thread_name_prefix="WxPusherMultUserMsg-chunk") \
+                if self._chunk_workers > 1 else None
+            if executor:
+                executor.shutdown(wait=False)
+
+        # 相同目标相同内容的消息在窗口期内只发送一次
+        if reloader.changed("dedup", self._dedup, self._dedup_size, self._dedup_window):
+            if self._dedup and self._dedup_cache:
+                self._dedup_cache.configure(maxsize=self._dedup_size, ttl=self._dedup_window)
+            else:
+                self._dedup_cache = TTLCache(maxsize=self._dedup_size, ttl=self._dedup_window) \
+                    if self._dedup else None
+
+        # 按接口和UID限流，超出速率时延迟发送
+        if reloader.changed("ratelimit", self._rate_limit, self._rate, self._burst,
+                            self._recipient_rate, self._recipient_burst):
+            if self._rate_limit and self._limiter:
+                self._limiter.configure(rate=self._rate / 60, burst=self._burst,
+                                        recipient_rate=self._recipient_rate / 60,
+                                        recipient_burst=self._recipient_burst)
+            else:
+                self._limiter = RateLimiter(rate=self._rate / 60, burst=self._burst,
+                                            recipient_rate=self._recipient_rate / 60,
+                                            recipient_burst=self._recipient_burst) if self._rate_limit else None
+
+        # 接口连续失败时熔断，直接失败而不再等待连接超时
+        if reloader.changed("breaker", self._breaker_enabled, self._breaker_threshold, self._breaker_reset):
+            if self._breaker_enabled and self._breaker:
+                self._breaker.configure(threshold=self._breaker_threshold, reset_timeout=self._breaker_reset)
+            else:
+                self._breaker = CircuitBreaker(threshold=self._breaker_threshold,
+                                               reset_timeout=self._breaker_reset) if self._breaker_enabled else None
+
+        # 发送失败的消息写入发件箱，按指数退避重试，重启后继续
+        if reloader.changed("outbox", self._outbox_enabled, self._retry_max, self._retry_delay):
+            if self._outbox_enabled and self._outbox:
+                self._outbox.configure(max_attempts=self._retry_max, base_delay=self._retry_delay)
+            elif self._outbox_enabled:
+                self._outbox = Outbox(self.get_data_path() / "outbox.db",
+                                      self._redeliver,
+                                      name="WxPusherMultUserMsg-outbox",
+                                      max_attempts=self._retry_max,
+                                      base_delay=self._retry_delay)
+                self._outbox.start()
+            elif self._outbox:
+                outbox, self._outbox = self._outbox, None
+                outbox.stop()
+
+        # 按UID和主题记录投递结果及消息ID，切换是否落盘时内存中的记录转交给新的实例
+        if reloader.changed("history", self._history_enabled, self._history_size,
+                            self._history_disk, self._history_days):
+            history = self._history
+            if self._history_enabled and history and history.persistent == self._history_disk:
+                history.configure(size=self._history_size, retention_days=self._history_days)
+            else:
+                self._history = DeliveryHistory(size=self._history_size,
+                                                path=self.get_data_path() / "history.db"
+                                                if self._history_disk else None,
+                                                retention_days=self._history_days,
+                                                name="WxPusherMultUserMsg-history") if self._history_enabled else None
+                if history:
+                    if self._history:
+                        history.handover(self._history)
+                    history.close()
+
+        # 异步发送队列，事件处理函数入队后立即返回；调整参数时队列中的消息保留
+        if reloader.changed("queue", self._async_send, self._queue_workers, self._queue_size,
+                            self._overflow, self._block_timeout):
+            if self._async_send and self._queue:
+                self._queue.configure(workers=self._queue_workers,
+                                      maxsize=self._queue_size,
+                                      overflow=self._overflow,
+                                      block_timeout=self._block_timeout)
+            elif self._async_send:
+                self._queue = DispatchQueue(self._deliver, name="WxPusherMultUserMsg",
+                                            workers=self._queue_workers,
+                                            maxsize=self._queue_size,
+                                            overflow=self._overflow,
+                                            block_timeout=self._block_timeout)
+                self._queue.start()
+            elif self._queue:
+                # 关闭异步发送后新消息直接发送，队列中已有的消息发送完再停止
+                queue, self._queue = self._queue, None
+                self._stop_queue(queue)
+
+        # 同一用户同类型的突发消息合并为摘要发送
+        if reloader.changed("coalesce", self._coalesce, self._coalesce_window,
+                            self._coalesce_max_items, self._coalesce_max_delay):
+            if self._coalesce and self._coalescer:
+                self._coalescer.configure(window=self._coalesce_window,
+                                          max_items=self._coalesce_max_items,
+                                          max_delay=self._coalesce_max_delay)
+            elif self._coalesce:
+                self._coalescer = Coalescer(self._flush_digest, name="WxPusherMultUserMsg-coalesce",
+                                            window=self._coalesce_window,
+                                            max_items=self._coalesce_max_items,
+                                            max_delay=self._coalesce_max_delay)
+                self._coalescer.start()
+            elif self._coalescer:
+                coalescer, self._coalescer = self._coalescer, None
+                coalescer.stop()
+
+        # 免打扰时段内的消息延后到时段结束后按批释放，重启后继续；取消免打扰时已延后的消息立即释放并停止
+        if reloader.changed("scheduler", bool(self._quiet), self._quiet_batch_size, self._quiet_batch_interval):
+            deferred_db = self.get_data_path() / "deferred.db"
+            if self._scheduler:
+                self._scheduler.configure(batch_size=self._quiet_batch_size,
+                                          batch_interval=self._quiet_batch_interval)
+            elif self._quiet or deferred_db.exists():
+                self._scheduler = DeferredScheduler(deferred_db, self._release_deferred,
+                                                    name="WxPusherMultUserMsg-deferred",
+                                                    batch_size=self._quiet_batch_size,
+                                                    batch_interval=self._quiet_batch_interval)
+                self._scheduler.start()
+            if self._scheduler and not self._quiet:
+                scheduler, self._scheduler = self._scheduler, None
+                scheduler.stop(drain=True)
+
+    def _create_pool(self) -> Union[SessionPool, AsyncTransport]:
+        """
+        按传输方式创建连接池。
+        """
+        # 异步传输在插件自己的事件循环中发送，各分片复用同一个 HTTP/2 连接
+        if self._transport == TRANSPORT_ASYNC and not async_available():
+            logger.warn("WxPusher异步传输需要安装 httpx，已改为阻塞传输")
+        if self._transport == TRANSPORT_ASYNC and async_available():
+            return AsyncTransport(pool_size=self._pool_size,
+                                  keepalive=self._keepalive,
+                                  connect_timeout=self._connect_timeout,
+                                  read_timeout=self._read_timeout,
+                                  name="WxPusherMultUserMsg")
+        # 复用到 WxPusher 的长连接
+        return SessionPool(pool_size=self._pool_size,
+                           keepalive=self._keepalive,
+                           connect_timeout=self._connect_timeout,
+                           read_timeout=self._read_timeout,
+                           trace=self._trace_enabled)
 
     def get_state(self) -> bool:
         """
@@ -94,6 +476,27 @@ class WxPusherMultUserMsg(_PluginBase):
         """
         return bool(self._enabled and self._appToken)
 
+    @staticmethod
+    def _to_int(value: Any, default: int) -> int:
+        """
+        转换数值配置，非法值使用默认值。
+        """
+        try:
+            return max(int(value), 1)
+        except (TypeError, ValueError):
+            return default
+
+    @staticmethod
+    def _to_non_negative(value: Any, default: int, maximum: Optional[int] = None) -> int:
+        """
+        转换允许为 0 的数值配置，负数按 0 处理，超过上限时取上限，非法值使用默认值。
+        """
+        try:
+            number = max(int(value), 0)
+        except (TypeError, ValueError):
+            return default
+        return min(number, maximum) if maximum is not None else number
+
     @staticmethod
     def get_command() -> List[Dict[str, Any]]:
         """
@@ -111,8 +514,166 @@ class WxPusherMultUserMsg(_PluginBase):
             "methods": ["GET"],
             "summary": "运行一次",
             "description": "运行一次WxPusher消息发送"
+        }, {
+            "path": "/pool",
+            "endpoint": self.pool_stats,
+            "methods": ["GET"],
+            "summary": "连接池状态",
+            "description": "查询WxPusher连接池的连接数和复用率"
+        }, {
+            "path": "/dedup",
+            "endpoint": self.dedup_stats,
+            "methods": ["GET"],
+            "summary": "去重缓存状态",
+            "description": "查询重复消息去重缓存的容量和命中情况"
+        }, {
+            "path": "/ratelimit",
+            "endpoint": self.ratelimit_stats,
+            "methods": ["GET"],
+            "summary": "限流状态",
+            "description": "查询WxPusher接口当前速率及延迟发送次数"
+        }, {
+            "path": "/outbox",
+            "endpoint": self.outbox_items,
+            "methods": ["GET"],
+            "summary": "发件箱",
+            "description": "查询等待重试和已转为死信的WxPusher消息"
+        }, {
+            "path": "/deferred",
+            "endpoint": self.deferred_items,
+            "methods": ["GET"],
+            "summary": "免打扰延后消息",
+            "description": "查询免打扰时段内延后发送的WxPusher消息及其释放时间"
+        }, {
+            "path": "/queue",
+            "endpoint": self.queue_stats,
+            "methods": ["GET"],
+            "summary": "发送队列状态",
+            "description": "查询WxPusher异步发送队列的深度、排队延迟及消息合并情况"
+        }, {
+            "path": "/metrics",
+            "endpoint": self.metrics,
+            "methods": ["GET"],
+            "summary": "Prometheus指标",
+            "description": "以Prometheus文本格式输出发送数、请求耗时、队列深度、重试次数和接口错误码"
+        }, {
+            "path": "/traces",
+            "endpoint": self.slow_traces,
+            "methods": ["GET"],
+            "summary": "慢请求跟踪",
+            "description": "查询最慢的WxPusher请求在限流、DNS、连接、TLS、等待响应和解析JSON各阶段的耗时"
+        }, {
+            "path": "/history",
+            "endpoint": self.delivery_history,
+            "methods": ["GET"],
+            "summary": "投递历史",
+            "description": "按用户名、消息摘要、时间范围和标题关键字查询WxPusher投递记录，时间格式为 YYYY-MM-DD HH:MM:SS"
+        }, {
+            "path": "/history/messages",
+            "endpoint": self.message_records,
+            "methods": ["GET"],
+            "summary": "按消息ID查询投递记录",
+            "description": "按WxPusher返回的消息ID批量查询插件本地保存的发送结果，多个ID用逗号分隔；"
+                           "只表示WxPusher是否受理，不代表用户是否已收到"
         }]
 
+    def metrics(self) -> PlainTextResponse:
+        """
+        输出Prometheus指标。
+        """
+        return PlainTextResponse(self._metrics.render() if self._metrics else "", media_type=CONTENT_TYPE)
+
+    def _init_metrics(self) -> DeliveryMetrics:
+        """
+        创建发送指标，队列深度、发件箱和熔断状态在采集时读取。
+        """
+        metrics = DeliveryMetrics("wxpusher")
+        metrics.gauge("queue_depth", "异步发送队列中等待的消息数",
+                      lambda: self._queue.stats()["depth"] if self._queue else 0)
+        metrics.gauge("outbox_messages", "发件箱中等待重试和死信的消息数",
+                      lambda: {(state,): count for state, count in self._outbox.stats().items()} if self._outbox else {},
+                      labelnames=("state",))
+        metrics.gauge("circuit_open", "接口是否处于熔断状态",
+                      lambda: {(host,): int(state["state"] == STATE_OPEN)
+                               for host, state in self._breaker.states().items()} if self._breaker else {},
+                      labelnames=("provider",))
+        return metrics
+
+    def slow_traces(self) -> Dict[str, Any]:
+        """
+        查询最慢的请求跟踪。
+        """
+        return {"code": 0, "data": self._tracer.slowest() if self._tracer else []}
+
+    def delivery_history(self, username: str = None, digest: str = None, since: str = None, until: str = None,
+                         keyword: str = None, limit: int = 100) -> Dict[str, Any]:
+        """
+        查询投递历史。
+        """
+        if not self._history:
+            return {"code": 0, "data": {"records": []}}
+        try:
+            records = self._history.query(user=username, digest=digest, since=parse_time(since),
+                                          until=parse_time(until), keyword=keyword, limit=limit)
+        except ValueError as err:
+            return {"code": 1, "msg": str(err)}
+        return {"code": 0, "data": {**self._history.stats(), "records": records}}
+
+    def message_records(self, message_ids: str = None) -> Dict[str, Any]:
+        """
+        按消息ID批量查询本地投递记录，记录的是发送时WxPusher的受理结果，不查询WxPusher的送达状态。
+        """
+        if not self._history:
+            return {"code": 0, "data": {}}
+        return {"code": 0, "data": self._history.lookup(split_ids(message_ids))}
+
+    def pool_stats(self) -> Dict[str, Any]:
+        """
+        查询连接池状态。
+        """
+        return {"code": 0, "data": self._pool.stats() if self._pool else {}}
+
+    def dedup_stats(self) -> Dict[str, Any]:
+        """
+        查询去重缓存状态。
+        """
+        return {"code": 0, "data": self._dedup_cache.stats() if self._dedup_cache else {}}
+
+    def ratelimit_stats(self) -> Dict[str, Any]:
+        """
+        查询限流状态。
+        """
+        return {"code": 0, "data": self._limiter.stats() if self._limiter else {}}
+
+    def outbox_items(self) -> Dict[str, Any]:
+        """
+        查询发件箱中等待重试和死信消息。
+        """
+        if not self._outbox:
+            return {"code": 0, "data": {}}
+        return {"code": 0, "data": {
+            **self._outbox.stats(),
+            "pending_items": self._outbox.items(dead=False),
+            "dead_items": self._outbox.items(dead=True)
+        }}
+
+    def deferred_items(self) -> Dict[str, Any]:
+        """
+        查询免打扰期间延后发送的消息。
+        """
+        if not self._scheduler:
+            return {"code": 0, "data": {}}
+        return {"code": 0, "data": {**self._scheduler.stats(), "items": self._scheduler.items()}}
+
+    def queue_stats(self) -> Dict[str, Any]:
+        """
+        查询发送队列状态。
+        """
+        return {"code": 0, "data": {
+            "queue": self._queue.stats() if self._queue else {},
+            "coalesce": self._coalescer.stats() if self._coalescer else {}
+        }}
+
     def run_once(self) -> Dict[str, Any]:
         """
         运行一次WxPusher消息发送测试。
@@ -205,6 +766,26 @@ class WxPusherMultUserMsg(_PluginBase):
                             }
                         ]
                     },
+                    {
+                        'component': 'VRow',
+                        'content': [
+                            {
+                                'component': 'VCol',
+                                'props': {'cols': 12},
+                                'content': [
+                                    {
+                                        'component': 'VTextarea',
+                                        'props': {
+                                            'model': 'groups',
+                                            'label': '用户组',
+                                            'placeholder': '每行一个配置，格式：组名:用户名1,用户名2',
+                                            'hint': '消息的用户名可以是组名或用户名列表，多个用户合并为一次请求发送'
+                                        }
+                                    }
+                                ]
+                            }
+                        ]
+                    },
                     {
                         'component': 'VRow',
                         'content': [
@@ -230,7 +811,7 @@ class WxPusherMultUserMsg(_PluginBase):
                         'content': [
                             {
                                 'component': 'VCol',
-                                'props': {'cols': 12},
+                                'props': {'cols': 12, 'md': 4},
                                 'content': [
                                     {
                                         'component': 'VSelect',
@@ -243,6 +824,40 @@ class WxPusherMultUserMsg(_PluginBase):
                                         }
                                     }
                                 ]
+                            },
+                            {
+                                'component': 'VCol',
+                                'props': {'cols': 12, 'md': 4},
+                                'content': [
+                                    {
+                                        'component': 'VSelect',
+                                        'props': {
+                                            'multiple': True,
+                                            'chips': True,
+                                            'model': 'high_msgtypes',
+                                            'label': '高优先级类型',
+                                            'hint': '异步发送时优先发送',
+                                            'items': msg_type_options
+                                        }
+                                    }
+                                ]
+                            },
+                            {
+                                'component': 'VCol',
+                                'props': {'cols': 12, 'md': 4},
+                                'content': [
+                                    {
+                                        'component': 'VSelect',
+                                        'props': {
+                                            'multiple': True,
+                                            'chips': True,
+                                            'model': 'bulk_msgtypes',
+                                            'label': '低优先级类型',
+                                            'hint': '异步发送时按较低权重发送',
+                                            'items': msg_type_options
+                                        }
+                                    }
+                                ]
                             }
                         ]
                     },
@@ -268,6 +883,776 @@ class WxPusherMultUserMsg(_PluginBase):
                                 ]
                             }
                         ]
+                    },
+                    {
+                        'component': 'VExpansionPanels',
+                        'props': {'variant': 'accordion', 'class': 'mt-2'},
+                        'content': [
+                            {
+                                'component': 'VExpansionPanel',
+                                'content': [
+                                    {
+                                        'component': 'VExpansionPanelTitle',
+                                        'text': '发送方式'
+                                    },
+                                    {
+                                        'component': 'VExpansionPanelText',
+                                        'content': [
+                                            {
+                                                'component': 'VRow',
+                                                'content': [
+                                                    {
+                                                        'component': 'VCol',
+                                                        'props': {'cols': 12, 'md': 6},
+                                                        'content': [
+                                                            {
+                                                                'component': 'VSelect',
+                                                                'props': {
+                                                                    'model': 'transport',
+                                                                    'label': '传输方式',
+                                                                    'items': [
+                                                                        {'title': '阻塞（线程池）', 'value': TRANSPORT_BLOCKING},
+                                                                        {'title': '异步（HTTP/2 多路复用）', 'value': TRANSPORT_ASYNC}
+                                                                    ],
+                                                                    'hint': '异步传输需要安装 httpx，安装 h2 后各分片复用一个 HTTP/2 连接'
+                                                                }
+                                                            }
+                                                        ]
+                                                    }
+                                                ]
+                                            },
+                                            {
+                                                'component': 'VRow',
+                                                'content': [
+                                                    {
+                                                        'component': 'VCol',
+                                                        'props': {'cols': 12, 'md': 3},
+                                                        'content': [
+                                                            {
+                                                                'component': 'VSwitch',
+                                                                'props': {'model': 'keepalive', 'label': '保持长连接'}
+                                                            }
+                                                        ]
+                                                    },
+                                                    {
+                                                        'component': 'VCol',
+                                                        'props': {'cols': 12, 'md': 3},
+                                                        'content': [
+                                                            {
+                                                                'component': 'VTextField',
+                                                                'props': {
+                                                                    'model': 'pool_size',
+                                                                    'label': '连接池大小',
+                                                                    'type': 'number'
+                                                                }
+                                                            }
+                                                        ]
+                                                    },
+                                                    {
+                                                        'component': 'VCol',
+                                                        'props': {'cols': 12, 'md': 3},
+                                                        'content': [
+                                                            {
+                                                                'component': 'VTextField',
+                                                                'props': {
+                                                                    'model': 'connect_timeout',
+                                                                    'label': '连接超时（秒）',
+                                                                    'type': 'number'
+                                                                }
+                                                            }
+                                                        ]
+                                                    },
+                                                    {
+                                                        'component': 'VCol',
+                                                        'props': {'cols': 12, 'md': 3},
+                                                        'content': [
+                                                            {
+                                                                'component': 'VTextField',
+                                                                'props': {
+                                                                    'model': 'read_timeout',
+                                                                    'label': '读取超时（秒）',
+                                                                    'type': 'number'
+                                                                }
+                                                            }
+                                                        ]
+                                                    }
+                                                ]
+                                            },
+                                            {
+                                                'component': 'VRow',
+                                                'content': [
+                                                    {
+                                                        'component': 'VCol',
+                                                        'props': {'cols': 12, 'md': 4},
+                                                        'content': [
+                                                            {
+                                                                'component': 'VTextField',
+                                                                'props': {
+                                                                    'model': 'uid_chunk_size',
+                                                                    'label': '单次请求UID数上限',
+                                                                    'type': 'number'
+                                                                }
+                                                            }
+                                                        ]
+                                                    },
+                                                    {
+                                                        'component': 'VCol',
+                                                        'props': {'cols': 12, 'md': 4},
+                                                        'content': [
+                                                            {
+                                                                'component': 'VTextField',
+                                                                'props': {
+                                                                    'model': 'topic_chunk_size',
+                                                                    'label': '单次请求主题数上限',
+                                                                    'type': 'number'
+                                                                }
+                                                            }
+                                                        ]
+                                                    },
+                                                    {
+                                                        'component': 'VCol',
+                                                        'props': {'cols': 12, 'md': 4},
+                                                        'content': [
+                                                            {
+                                                                'component': 'VTextField',
+                                                                'props': {
+                                                                    'model': 'chunk_workers',
+                                                                    'label': '分片并发数',
+                                                                    'type': 'number'
+                                                                }
+                                                            }
+                                                        ]
+                                                    }
+                                                ]
+                                            }
+                                        ]
+                                    }
+                                ]
+                            },
+                            {
+                                'component': 'VExpansionPanel',
+                                'content': [
+                                    {
+                                        'component': 'VExpansionPanelTitle',
+                                        'text': '发送队列'
+                                    },
+                                    {
+                                        'component': 'VExpansionPanelText',
+                                        'content': [
+                                            {
+                                                'component': 'VRow',
+                                                'content': [
+                                                    {
+                                                        'component': 'VCol',
+                                                        'props': {'cols': 12, 'md': 4},
+                                                        'content': [
+                                                            {
+                                                                'component': 'VSwitch',
+                                                                'props': {'model': 'async_send', 'label': '异步发送'}
+                                                            }
+                                                        ]
+                                                    },
+                                                    {
+                                                        'component': 'VCol',
+                                                        'props': {'cols': 12, 'md': 4},
+                                                        'content': [
+                                                            {
+                                                                'component': 'VSelect',
+                                                                'props': {
+                                                                    'model': 'overflow',
+                                                                    'label': '队列满时',
+                                                                    'items': [
+                                                                        {'title': '丢弃最早的消息', 'value': OVERFLOW_DROP_OLDEST},
+                                                                        {'title': '丢弃最新的消息', 'value': OVERFLOW_DROP_NEWEST},
+                                                                        {'title': '等待（超时丢弃）', 'value': OVERFLOW_BLOCK}
+                                                                    ]
+                                                                }
+                                                            }
+                                                        ]
+                                                    },
+                                                    {
+                                                        'component': 'VCol',
+                                                        'props': {'cols': 12, 'md': 4},
+                                                        'content': [
+                                                            {
+                                                                'component': 'VTextField',
+                                                                'props': {
+                                                                    'model': 'block_timeout',
+                                                                    'label': '等待超时（秒）',
+                                                                    'type': 'number'
+                                                                }
+                                                            }
+                                                        ]
+                                                    }
+                                                ]
+                                            },
+                                            {
+                                                'component': 'VRow',
+                                                'content': [
+                                                    {
+                                                        'component': 'VCol',
+                                                        'props': {'cols': 12, 'md': 6},
+                                                        'content': [
+                                                            {
+                                                                'component': 'VTextField',
+                                                                'props': {
+                                                                    'model': 'queue_size',
+                                                                    'label': '队列长度',
+                                                                    'type': 'number'
+                                                                }
+                                                            }
+                                                        ]
+                                                    },
+                                                    {
+                                                        'component': 'VCol',
+                                                        'props': {'cols': 12, 'md': 6},
+                                                        'content': [
+                                                            {
+                                                                'component': 'VTextField',
+                                                                'props': {
+                                                                    'model': 'queue_workers',
+                                                                    'label': '发送线程数',
+                                                                    'type': 'number'
+                                                                }
+                                                            }
+                                                        ]
+                                                    }
+                                                ]
+                                            },
+                                            {
+                                                'component': 'VRow',
+                                                'content': [
+                                                    {
+                                                        'component': 'VCol',
+                                                        'props': {'cols': 12, 'md': 3},
+                                                        'content': [
+                                                            {
+                                                                'component': 'VSwitch',
+                                                                'props': {
+                                                                    'model': 'coalesce',
+                                                                    'label': '合并突发消息',
+                                                                    'hint': '同一用户同类型的消息在窗口期内合并为一条摘要'
+                                                                }
+                                                            }
+                                                        ]
+                                                    },
+                                                    {
+                                                        'component': 'VCol',
+                                                        'props': {'cols': 12, 'md': 3},
+                                                        'content': [
+                                                            {
+                                                                'component': 'VTextField',
+                                                                'props': {
+                                                                    'model': 'coalesce_window',
+                                                                    'label': '合并窗口（秒）',
+                                                                    'type': 'number'
+                                                                }
+                                                            }
+                                                        ]
+                                                    },
+                                                    {
+                                                        'component': 'VCol',
+                                                        'props': {'cols': 12, 'md': 3},
+                                                        'content': [
+                                                            {
+                                                                'component': 'VTextField',
+                                                                'props': {
+                                                                    'model': 'coalesce_max_items',
+                                                                    'label': '合并条数上限',
+                                                                    'type': 'number'
+                                                                }
+                                                            }
+                                                        ]
+                                                    },
+                                                    {
+                                                        'component': 'VCol',
+                                                        'props': {'cols': 12, 'md': 3},
+                                                        'content': [
+                                                            {
+                                                                'component': 'VTextField',
+                                                                'props': {
+                                                                    'model': 'coalesce_max_delay',
+                                                                    'label': '最大延迟（秒）',
+                                                                    'type': 'number'
+                                                                }
+                                                            }
+                                                        ]
+                                                    }
+                                                ]
+                                            },
+                                            {
+                                                'component': 'VRow',
+                                                'content': [
+                                                    {
+                                                        'component': 'VCol',
+                                                        'props': {'cols': 12, 'md': 4},
+                                                        'content': [
+                                                            {
+                                                                'component': 'VSwitch',
+                                                                'props': {
+                                                                    'model': 'dedup',
+                                                                    'label': '忽略重复消息',
+                                                                    'hint': '发送给相同用户的相同内容在窗口期内只发送一次'
+                                                                }
+                                                            }
+                                                        ]
+                                                    },
+                                                    {
+                                                        'component': 'VCol',
+                                                        'props': {'cols': 12, 'md': 4},
+                                                        'content': [
+                                                            {
+                                                                'component': 'VTextField',
+                                                                'props': {
+                                                                    'model': 'dedup_window',
+                                                                    'label': '去重窗口（秒）',
+                                                                    'type': 'number'
+                                                                }
+                                                            }
+                                                        ]
+                                                    },
+                                                    {
+                                                        'component': 'VCol',
+                                                        'props': {'cols': 12, 'md': 4},
+                                                        'content': [
+                                                            {
+                                                                'component': 'VTextField',
+                                                                'props': {
+                                                                    'model': 'dedup_size',
+                                                                    'label': '去重缓存容量',
+                                                                    'type': 'number'
+                                                                }
+                                                            }
+                                                        ]
+                                                    }
+                                                ]
+                                            }
+                                        ]
+                                    }
+                                ]
+                            },
+                            {
+                                'component': 'VExpansionPanel',
+                                'content': [
+                                    {
+                                        'component': 'VExpansionPanelTitle',
+                                        'text': '限流与免打扰'
+                                    },
+                                    {
+                                        'component': 'VExpansionPanelText',
+                                        'content': [
+                                            {
+                                                'component': 'VRow',
+                                                'content': [
+                                                    {
+                                                        'component': 'VCol',
+                                                        'props': {'cols': 12, 'md': 4},
+                                                        'content': [
+                                                            {
+                                                                'component': 'VSwitch',
+                                                                'props': {
+                                                                    'model': 'rate_limit',
+                                                                    'label': '限流',
+                                                                    'hint': '超出速率的消息延迟发送，接口报错时自动降速'
+                                                                }
+                                                            }
+                                                        ]
+                                                    },
+                                                    {
+                                                        'component': 'VCol',
+                                                        'props': {'cols': 12, 'md': 4},
+                                                        'content': [
+                                                            {
+                                                                'component': 'VTextField',
+                                                                'props': {
+                                                                    'model': 'rate',
+                                                                    'label': '全局速率（条/分钟）',
+                                                                    'type': 'number'
+                                                                }
+                                                            }
+                                                        ]
+                                                    },
+                                                    {
+                                                        'component': 'VCol',
+                                                        'props': {'cols': 12, 'md': 4},
+                                                        'content': [
+                                                            {
+                                                                'component': 'VTextField',
+                                                                'props': {
+                                                                    'model': 'burst',
+                                                                    'label': '全局突发数',
+                                                                    'type': 'number'
+                                                                }
+                                                            }
+                                                        ]
+                                                    }
+                                                ]
+                                            },
+                                            {
+                                                'component': 'VRow',
+                                                'content': [
+                                                    {
+                                                        'component': 'VCol',
+                                                        'props': {'cols': 12, 'md': 6},
+                                                        'content': [
+                                                            {
+                                                                'component': 'VTextField',
+                                                                'props': {
+                                                                    'model': 'recipient_rate',
+                                                                    'label': '单UID速率（条/分钟）',
+                                                                    'type': 'number'
+                                                                }
+                                                            }
+                                                        ]
+                                                    },
+                                                    {
+                                                        'component': 'VCol',
+                                                        'props': {'cols': 12, 'md': 6},
+                                                        'content': [
+                                                            {
+                                                                'component': 'VTextField',
+                                                                'props': {
+                                                                    'model': 'recipient_burst',
+                                                                    'label': '单UID突发数',
+                                                                    'type': 'number'
+                                                                }
+                                                            }
+                                                        ]
+                                                    }
+                                                ]
+                                            },
+                                            {
+                                                'component': 'VRow',
+                                                'content': [
+                                                    {
+                                                        'component': 'VCol',
+                                                        'props': {'cols': 12, 'md': 6},
+                                                        'content': [
+                                                            {
+                                                                'component': 'VTextarea',
+                                                                'props': {
+                                                                    'model': 'quiet_hours',
+                                                                    'label': '免打扰时段',
+                                                                    'rows': 2,
+                                                                    'placeholder': '每行一个配置，格式：用户名:22:00-07:00',
+                                                                    'hint': '省略用户名或写 * 表示所有用户，也可以写组名；时段内的消息延后到结束后发送'
+                                                                }
+                                                            }
+                                                        ]
+                                                    },
+                                                    {
+                                                        'component': 'VCol',
+                                                        'props': {'cols': 12, 'md': 2},
+                                                        'content': [
+                                                            {
+                                                                'component': 'VSwitch',
+                                                                'props': {'model': 'quiet_summary', 'label': '合并为摘要'}
+                                                            }
+                                                        ]
+                                                    },
+                                                    {
+                                                        'component': 'VCol',
+                                                        'props': {'cols': 12, 'md': 2},
+                                                        'content': [
+                                                            {
+                                                                'component': 'VTextField',
+                                                                'props': {
+                                                                    'model': 'quiet_batch_size',
+                                                                    'label': '每批释放接收方数',
+                                                                    'type': 'number',
+                                                                    'placeholder': '20'
+                                                                }
+                                                            }
+                                                        ]
+                                                    },
+                                                    {
+                                                        'component': 'VCol',
+                                                        'props': {'cols': 12, 'md': 2},
+                                                        'content': [
+                                                            {
+                                                                'component': 'VTextField',
+                                                                'props': {
+                                                                    'model': 'quiet_batch_interval',
+                                                                    'label': '批次间隔（秒）',
+                                                                    'type': 'number',
+                                                                    'placeholder': '1'
+                                                                }
+                                                            }
+                                                        ]
+                                                    }
+                                                ]
+                                            }
+                                        ]
+                                    }
+                                ]
+                            },
+                            {
+                                'component': 'VExpansionPanel',
+                                'content': [
+                                    {
+                                        'component': 'VExpansionPanelTitle',
+                                        'text': '失败重试与熔断'
+                                    },
+                                    {
+                                        'component': 'VExpansionPanelText',
+                                        'content': [
+                                            {
+                                                'component': 'VRow',
+                                                'content': [
+                                                    {
+                                                        'component': 'VCol',
+                                                        'props': {'cols': 12, 'md': 4},
+                                                        'content': [
+                                                            {
+                                                                'component': 'VSwitch',
+                                                                'props': {
+                                                                    'model': 'outbox',
+                                                                    'label': '失败重试',
+                                                                    'hint': '发送失败的消息保存到本地，按指数退避重试，重启后继续'
+                                                                }
+                                                            }
+                                                        ]
+                                                    },
+                                                    {
+                                                        'component': 'VCol',
+                                                        'props': {'cols': 12, 'md': 4},
+                                                        'content': [
+                                                            {
+                                                                'component': 'VTextField',
+                                                                'props': {
+                                                                    'model': 'retry_max',
+                                                                    'label': '最大重试次数',
+                                                                    'type': 'number'
+                                                                }
+                                                            }
+                                                        ]
+                                                    },
+                                                    {
+                                                        'component': 'VCol',
+                                                        'props': {'cols': 12, 'md': 4},
+                                                        'content': [
+                                                            {
+                                                                'component': 'VTextField',
+                                                                'props': {
+                                                                    'model': 'retry_delay',
+                                                                    'label': '首次重试间隔（秒）',
+                                                                    'type': 'number'
+                                                                }
+                                                            }
+                                                        ]
+                                                    }
+                                                ]
+                                            },
+                                            {
+                                                'component': 'VRow',
+                                                'content': [
+                                                    {
+                                                        'component': 'VCol',
+                                                        'props': {'cols': 12, 'md': 4},
+                                                        'content': [
+                                                            {
+                                                                'component': 'VSwitch',
+                                                                'props': {
+                                                                    'model': 'breaker',
+                                                                    'label': '熔断',
+                                                                    'hint': '接口连续失败后暂停请求，期间消息直接失败（启用失败重试时稍后重试）'
+                                                                }
+                                                            }
+                                                        ]
+                                                    },
+                                                    {
+                                                        'component': 'VCol',
+                                                        'props': {'cols': 12, 'md': 4},
+                                                        'content': [
+                                                            {
+                                                                'component': 'VTextField',
+                                                                'props': {
+                                                                    'model': 'breaker_threshold',
+                                                                    'label': '连续失败次数',
+                                                                    'type': 'number'
+                                                                }
+                                                            }
+                                                        ]
+                                                    },
+                                                    {
+                                                        'component': 'VCol',
+                                                        'props': {'cols': 12, 'md': 4},
+                                                        'content': [
+                                                            {
+                                                                'component': 'VTextField',
+                                                                'props': {
+                                                                    'model': 'breaker_reset',
+                                                                    'label': '探测间隔（秒）',
+                                                                    'type': 'number'
+                                                                }
+                                                            }
+                                                        ]
+                                                    }
+                                                ]
+                                            },
+                                            {
+                                                'component': 'VRow',
+                                                'content': [
+                                                    {
+                                                        'component': 'VCol',
+                                                        'props': {'cols': 12, 'md': 3},
+                                                        'content': [
+                                                            {
+                                                                'component': 'VSwitch',
+                                                                'props': {
+                                                                    'model': 'history',
+                                                                    'label': '记录投递历史',
+                                                                    'hint': '按用户名、消息摘要和时间通过 /history 接口查询'
+                                                                }
+                                                            }
+                                                        ]
+                                                    },
+                                                    {
+                                                        'component': 'VCol',
+                                                        'props': {'cols': 12, 'md': 3},
+                                                        'content': [
+                                                            {
+                                                                'component': 'VTextField',
+                                                                'props': {
+                                                                    'model': 'history_size',
+                                                                    'label': '内存保留记录数',
+                                                                    'type': 'number',
+                                                                    'placeholder': '10000'
+                                                                }
+                                                            }
+                                                        ]
+                                                    },
+                                                    {
+                                                        'component': 'VCol',
+                                                        'props': {'cols': 12, 'md': 3},
+                                                        'content': [
+                                                            {
+                                                                'component': 'VSwitch',
+                                                                'props': {'model': 'history_disk', 'label': '淘汰记录写入磁盘'}
+                                                            }
+                                                        ]
+                                                    },
+                                                    {
+                                                        'component': 'VCol',
+                                                        'props': {'cols': 12, 'md': 3},
+                                                        'content': [
+                                                            {
+                                                                'component': 'VTextField',
+                                                                'props': {
+                                                                    'model': 'history_days',
+                                                                    'label': '磁盘保留天数',
+                                                                    'type': 'number',
+                                                                    'placeholder': '7'
+                                                                }
+                                                            }
+                                                        ]
+                                                    }
+                                                ]
+                                            }
+                                        ]
+                                    }
+                                ]
+                            },
+                            {
+                                'component': 'VExpansionPanel',
+                                'content': [
+                                    {
+                                        'component': 'VExpansionPanelTitle',
+                                        'text': '日志与诊断'
+                                    },
+                                    {
+                                        'component': 'VExpansionPanelText',
+                                        'content': [
+                                            {
+                                                'component': 'VRow',
+                                                'content': [
+                                                    {
+                                                        'component': 'VCol',
+                                                        'props': {'cols': 12, 'md': 4},
+                                                        'content': [
+                                                            {
+                                                                'component': 'VSelect',
+                                                                'props': {
+                                                                    'model': 'log_mode',
+                                                                    'label': '日志模式',
+                                                                    'items': [
+                                                                        {'title': '详细（逐次请求）', 'value': LOG_VERBOSE},
+                                                                        {'title': '结构化（每次投递一行）', 'value': LOG_STRUCTURED}
+                                                                    ]
+                                                                }
+                                                            }
+                                                        ]
+                                                    },
+                                                    {
+                                                        'component': 'VCol',
+                                                        'props': {'cols': 12, 'md': 4},
+                                                        'content': [
+                                                            {
+                                                                'component': 'VTextField',
+                                                                'props': {
+                                                                    'model': 'log_sample_rate',
+                                                                    'label': '成功日志采样比例（%）',
+                                                                    'type': 'number',
+                                                                    'hint': '结构化模式下成功投递按比例输出，失败总是输出'
+                                                                }
+                                                            }
+                                                        ]
+                                                    },
+                                                    {
+                                                        'component': 'VCol',
+                                                        'props': {'cols': 12, 'md': 4},
+                                                        'content': [
+                                                            {
+                                                                'component': 'VTextField',
+                                                                'props': {
+                                                                    'model': 'log_body_limit',
+                                                                    'label': '日志内容字数',
+                                                                    'type': 'number',
+                                                                    'hint': '结构化日志中标题和内容的截断长度，0 表示只记录长度和摘要'
+                                                                }
+                                                            }
+                                                        ]
+                                                    }
+                                                ]
+                                            },
+                                            {
+                                                'component': 'VRow',
+                                                'content': [
+                                                    {
+                                                        'component': 'VCol',
+                                                        'props': {'cols': 12, 'md': 6},
+                                                        'content': [
+                                                            {
+                                                                'component': 'VSwitch',
+                                                                'props': {
+                                                                    'model': 'trace',
+                                                                    'label': '慢请求跟踪',
+                                                                    'hint': '记录每次请求在DNS、连接、TLS、等待响应等阶段的耗时，通过 /traces 接口查询'
+                                                                }
+                                                            }
+                                                        ]
+                                                    },
+                                                    {
+                                                        'component': 'VCol',
+                                                        'props': {'cols': 12, 'md': 6},
+                                                        'content': [
+                                                            {
+                                                                'component': 'VTextField',
+                                                                'props': {
+                                                                    'model': 'trace_size',
+                                                                    'label': '保留最慢请求数',
+                                                                    'type': 'number'
+                                                                }
+                                                            }
+                                                        ]
+                                                    }
+                                                ]
+                                            }
+                                        ]
+                                    }
+                                ]
+                            }
+                        ]
                     }
                 ]
             }
@@ -276,17 +1661,110 @@ class WxPusherMultUserMsg(_PluginBase):
             'appToken': '',
             'uids': '',
             'topicIds': '',
+            'groups': '',
             'contentType': self.default_content_type,
             'msgtypes': [],
-            'onlyonce': False
+            'high_msgtypes': ['Download', 'Manual'],
+            'bulk_msgtypes': ['SiteMessage'],
+            'onlyonce': False,
+            'transport': TRANSPORT_BLOCKING,
+            'keepalive': True,
+            'pool_size': 10,
+            'connect_timeout': 5,
+            'read_timeout': 20,
+            'async_send': True,
+            'queue_size': 1000,
+            'queue_workers': 2,
+            'overflow': OVERFLOW_DROP_OLDEST,
+            'block_timeout': 5,
+            'coalesce': False,
+            'coalesce_window': 10,
+            'coalesce_max_items': 20,
+            'coalesce_max_delay': 60,
+            'dedup': False,
+            'dedup_window': 300,
+            'dedup_size': 10000,
+            'rate_limit': False,
+            'rate': 600,
+            'burst': 20,
+            'recipient_rate': 30,
+            'recipient_burst': 5,
+            'outbox': False,
+            'retry_max': 8,
+            'retry_delay': 30,
+            'history': True,
+            'history_size': 10000,
+            'history_disk': False,
+            'history_days': 7,
+            'quiet_hours': '',
+            'quiet_summary': True,
+            'quiet_batch_size': 20,
+            'quiet_batch_interval': 1,
+            'breaker': True,
+            'breaker_threshold': 5,
+            'breaker_reset': 60,
+            'uid_chunk_size': MAX_UIDS,
+            'topic_chunk_size': MAX_TOPIC_IDS,
+            'chunk_workers': 4,
+            'trace': False,
+            'trace_size': 20,
+            'log_mode': LOG_VERBOSE,
+            'log_sample_rate': 10,
+            'log_body_limit': 50
         }
 
-    @staticmethod
-    def get_page() -> List[dict]:
+    def get_page(self) -> List[dict]:
         """
-        获取插件页面定义。
+        获取插件页面定义，展示接口熔断状态。
         """
-        pass
+        state_text = {"closed": "正常", "open": "熔断中", "half_open": "探测中"}
+        states = self._breaker.states() if self._breaker else {}
+        if not states:
+            return [{'component': 'div', 'text': '暂无数据', 'props': {'class': 'text-center'}}]
+        headers = ['接口', '状态', '连续失败', '拒绝请求', '熔断次数', '下次探测（秒）']
+        rows = [
+            [host, state_text.get(state["state"], state["state"]), state["failures"],
+             state["rejected"], state["trips"], state["retry_in"]]
+            for host, state in states.items()
+        ]
+        return [
+            {
+                'component': 'VRow',
+                'content': [
+                    {
+                        'component': 'VCol',
+                        'props': {'cols': 12},
+                        'content': [
+                            {
+                                'component': 'VTable',
+                                'props': {'hover': True},
+                                'content': [
+                                    {
+                                        'component': 'thead',
+                                        'content': [
+                                            {'component': 'th', 'props': {'class': 'text-start ps-4'}, 'text': header}
+                                            for header in headers
+                                        ]
+                                    },
+                                    {
+                                        'component': 'tbody',
+                                        'content': [
+                                            {
+                                                'component': 'tr',
+                                                'content': [
+                                                    {'component': 'td', 'props': {'class': 'ps-4'}, 'text': value}
+                                                    for value in row
+                                                ]
+                                            } for row in rows
+                                        ]
+                                    }
+                                ]
+                            }
+                        ]
+                    }
+                ]
+            }
+        ]
 
     @eventmanager.register(EventType.NoticeMessage)
     def send(self, event: Event) -> None:
@@ -307,86 +1785,397 @@ class WxPusherMultUserMsg(_PluginBase):
         summary: str = msg_body.get("summary", "")
         content_type: int = msg_body.get("contentType", self._contentType)
         username: Optional[str] = msg_body.get("username")  # 获取用户名
-        uids: Optional[str] = msg_body.get("uids", self._uids)
-        topic_ids: Optional[str] = msg_body.get("topicIds", self._topicIds)
+        routes = self._routes
+        # 用户名可以是组名或列表，展开为多个用户后合并为一次请求
+        users: Optional[Tuple[str, ...]] = None
+        if username and (not isinstance(username, str) or username in routes.groups):
+            users = routes.resolve(username)
         if not title and not text:
             logger.warn("标题和内容不能同时为空")
             return
         # 立即运行一次时不做类型判断
         if not msg_body.get("force_send"):
-            if msg_type and (not self._msgtypes or msg_type.name not in self._msgtypes):
+            if not routes.accepts(msg_type):
                 logger.info(f"消息类型 {msg_type.value} 未开启消息发送")
                 return
 
         # 如果是立即运行一次（force_send为True），则发送给所有用户
         if msg_body.get("force_send"):
             # 发送给所有配置的UID（包括用户名映射和纯UID）
-            target_uids = list(self._user_uids.values())  # 所有用户名对应的UID
-            if hasattr(self, '_pure_uids'):
-                target_uids.extend(self._pure_uids)  # 添加纯UID
-            # 如果没有配置映射和纯UID，则尝试从配置的uids中提取（兼容旧格式）
-            if not target_uids and self._uids:
-                for item in self._uids.split(","):
-                    item = item.strip()
-                    if ':' not in item and item:
-                        target_uids.append(item)
+            target_uids = list(routes.all_uids)
+        # 指定了多个用户，合并为一次请求
+        elif users is not None:
+            missing = [user for user in users if user not in routes.user_uids]
+            if missing:
+                logger.info(f"用户 {','.join(missing)} 不在WxPusher配置中，跳过发送")
+            users = tuple(user for user in users if user in routes.user_uids)
+            if not users:
+                return
+            username = ",".join(users)
+            target_uids = list(dict.fromkeys(routes.user_uids[user] for user in users))
         # 如果指定了用户名，查找对应的UID
-        elif username and username in self._user_uids:
+        elif username and username in routes.user_uids:
             # 发送给指定用户
-            target_uids = [self._user_uids[username]]
+            target_uids = [routes.user_uids[username]]
         elif username:
             # 用户名指定但不在映射中，不发送
             logger.info(f"用户 {username} 不在WxPusher配置中，跳过发送")
             return
         else:
             # 没有指定用户名，使用配置的纯UID列表和topicIds
-            target_uids = getattr(self, '_pure_uids', []) if hasattr(self, '_pure_uids') else []
-            # 如果没有纯UID，则尝试从配置的uids中提取（兼容旧格式）
-            if not target_uids and uids:
-                for item in uids.split(","):
-                    item = item.strip()
-                    if ':' not in item and item:
-                        target_uids.append(item)
+            target_uids = list(routes.pure_uids)
+            # 如果没有配置纯UID，则使用消息中指定的纯UID
+            if not target_uids and msg_body.get("uids"):
+                target_uids = list(parse_uids(msg_body.get("uids")).anonymous)
 
-        try:
-            payload = {
-                "appToken": self._appToken,
-                "content": text or title,
-                "summary": summary or title,
-                "contentType": content_type,
-            }
+        # 只有在没有指定用户名的情况下才使用topicIds
+        topics: List[str] = []
+        if not username:
+            topics = list(split_ids(msg_body["topicIds"]) if "topicIds" in msg_body else routes.topic_ids)
+
+        # 忽略发送给相同目标的重复内容
+        if self._dedup_cache and not msg_body.get("force_send"):
+            key = self._dedup_key(target_uids, topics, summary or title, text or title)
+            if self._dedup_cache.seen(key):
+                logger.info(f"WxPusher重复消息已忽略：{title}")
+                return
+
+        # 处于免打扰时段的接收方延后到时段结束后发送
+        if self._scheduler and self._quiet and not msg_body.get("force_send"):
+            username, target_uids, topics = self._defer_quiet(title, text, summary, content_type, msg_type,
+                                                              username, target_uids, topics)
+            if not target_uids and not topics:
+                return
+
+        # 合并发送目标相同的突发消息
+        if self._coalescer and not msg_body.get("force_send"):
+            key = (username, msg_type, content_type, tuple(target_uids), tuple(topics))
+            if self._coalescer.add(key, title, text, summary):
+                return
+        self._dispatch(title, text, summary, content_type, username, target_uids, topics, msg_type)
+
+    def _dispatch(self, title: Optional[str], text: Optional[str], summary: str, content_type: int,
+                  username: Optional[str], target_uids: List[str], topics: List[str],
+                  msg_type: Optional[NotificationType]) -> None:
+        """
+        组装请求数据，异步发送时放入队列，否则直接发送。
+        """
+        payload = {
+            **self._routes.base_payload,
+            "content": text or title,
+            "summary": summary or title,
+            "contentType": content_type,
+        }
+        if topics:
+            payload["topicIds"] = list(topics)
+        # 使用目标uids
+        if target_uids:
+            payload["uids"] = list(target_uids)
+
+        if self._queue:
+            self._queue.put(payload, username, priority=self._routes.priority(msg_type))
+            return
+        self._deliver(payload, username)
+
+    def _defer_quiet(self, title: Optional[str], text: Optional[str], summary: str, content_type: int,
+                     msg_type: Optional[NotificationType], username: Optional[str], target_uids: List[str],
+                     topics: List[str]) -> Tuple[Optional[str], List[str], List[str]]:
+        """
+        将处于免打扰时段的接收方延后，返回需要立即发送的用户名、UID和主题。
+        指定用户时按各用户的时段判断，未指定用户时按默认时段整体延后。
+        """
+        now = time.time()
+        if not self._quiet.active(now):
+            return username, target_uids, topics
+        item = {"title": title, "text": text, "summary": summary, "contentType": content_type,
+                "type": msg_type.name if msg_type else None}
+        if not username:
+            release_at = self._quiet.until(None, now)
+            # 目标相同的广播延后后合并释放
+            recipient = DEFAULT_USER + content_key(",".join(target_uids), ",".join(topics)).hex()
+            if release_at and self._scheduler.add(release_at, recipient,
+                                                  {**item, "uids": target_uids, "topicIds": topics}):
+                logger.info(f"WxPusher消息处于免打扰时段，延后发送：{title}")
+                return username, [], []
+            return username, target_uids, topics
+        routes = self._routes
+        users = username.split(",")
+        active = []
+        for user in users:
+            release_at = self._quiet.until(user, now)
+            # 延后的消息数达到上限时直接发送
+            if not release_at or not self._scheduler.add(release_at, user, {**item, "uids": [routes.user_uids[user]]}):
+                active.append(user)
+        if len(active) == len(users):
+            return username, target_uids, topics
+        logger.info(f"{len(users) - len(active)} 个用户处于免打扰时段，WxPusher消息延后发送：{title}")
+        return ",".join(active), list(dict.fromkeys(routes.user_uids[user] for user in active)), topics
+
+    def _release_deferred(self, recipient: str, items: List[dict]) -> None:
+        """
+        免打扰结束后发送延后的消息，开启汇总时合并为一条摘要。
+        """
+        username = None if recipient.startswith(DEFAULT_USER) else recipient
+        first = items[0]
+        target_uids, topics = first.get("uids") or [], first.get("topicIds") or []
+        content_type = first.get("contentType", self._contentType)
+        if self._quiet_summary and len(items) > 1:
+            logger.info(f"免打扰期间的 {len(items)} 条WxPusher消息合并为摘要发送")
+            title, text = build_digest([(item.get("title"), item.get("text")) for item in items])
+            self._dispatch(title, text, title, content_type, username, target_uids, topics, None)
+            return
+        for item in items:
+            msg_type = NotificationType[item["type"]] if item.get("type") in NotificationType.__members__ else None
+            self._dispatch(item.get("title"), item.get("text"), item.get("summary") or "",
+                           item.get("contentType", content_type), username, target_uids, topics, msg_type)
+
+    def _flush_digest(self, key: tuple, items: List[tuple]) -> None:
+        """
+        发送合并后的摘要消息。
+        """
+        username, msg_type, content_type, target_uids, topics = key
+        if len(items) > 1:
+            logger.info(f"合并 {len(items)} 条WxPusher消息为摘要发送")
+            title, text = build_digest([(title, text) for title, text, _ in items])
+            summary = title
+        else:
+            title, text, summary = items[0]
+        self._dispatch(title, text, summary, content_type, username, list(target_uids), list(topics), msg_type)
 
-            # 只有在没有指定用户名的情况下才使用topicIds
-            if not username and topic_ids:
-                payload["topicIds"] = [i.strip() for i in topic_ids.split(",") if i.strip()]
+    def _deliver(self, payload: dict, username: Optional[str] = None) -> Dict[str, Any]:
+        """
+        发送消息，失败的分片写入发件箱等待重试。
+        :return: 投递报告
+        """
+        start = time.monotonic()
+        report = self._broadcast(payload, username)
+        self._log_delivery(payload, username, report, time.monotonic() - start)
+        if self._outbox:
+            for chunk, reason in report["failed"]:
+                self._outbox.add({"payload": chunk, "username": username},
+                                 recipient=username or ",".join(chunk.get("uids") or []),
+                                 title=chunk.get("summary"), error=reason)
+        if not self._outbox and report["failed_chunks"] == report["chunks"]:
+            self._forget_duplicate(payload)
+        return report
 
-            # 使用目标uids
-            if target_uids:
-                payload["uids"] = target_uids
+    @staticmethod
+    def _dedup_key(uids: List[str], topics: List[str], summary: Optional[str], content: Optional[str]) -> bytes:
+        """
+        去重缓存的键，发送目标相同的相同内容视为重复。
+        """
+        return content_key(",".join(uids), ",".join(topics), summary, content)
 
-            res = RequestUtils(content_type="application/json").post_res(self.api_url, json=payload)
+    def _forget_duplicate(self, payload: dict) -> None:
+        """
+        未开启发件箱时发送失败的消息不会重试，移除去重记录，来源重新发送时不被当作重复而丢弃。
+        """
+        if self._dedup_cache:
+            self._dedup_cache.forget(self._dedup_key(payload.get("uids") or [], payload.get("topicIds") or [],
+                                                     payload.get("summary"), payload.get("content")))
+
+    def _redeliver(self, item: dict) -> bool:
+        """
+        发件箱重试。停止插件时队列中未发送的消息可能超过单次请求上限，拆分发送，失败的分片单独写回发件箱。
+        """
+        payload, username = item["payload"], item.get("username")
+        if self._metrics:
+            self._metrics.retries.inc(urlparse(self.api_url).netloc, "outbox")
+        if len(split_payload(payload, self._uid_chunk_size, self._topic_chunk_size)) == 1:
+            start = time.monotonic()
+            success, reason = self._send(payload, username)
+            self._log_delivery(payload, username, merge_report([payload], [(success, reason)]),
+                               time.monotonic() - start, kind="outbox")
+            return success
+        self._deliver(payload, username)
+        return True
+
+    def _broadcast(self, payload: dict, username: Optional[str] = None) -> Dict[str, Any]:
+        """
+        按单次请求上限拆分UID和主题，启用线程池时并行发送各分片，合并结果。
+        :return: 投递报告，failed 为失败的分片及原因
+        """
+        chunks = split_payload(payload, self._uid_chunk_size, self._topic_chunk_size)
+        # 消息内容只序列化一次，各分片只拼接UID和主题
+        body = JsonBody(payload, exclude=RECIPIENT_FIELDS)
+        if len(chunks) == 1 or not self._executor:
+            results = [self._send_chunk(chunk, username, body) for chunk in chunks]
+        else:
+            results = list(self._executor.map(lambda chunk: self._send_chunk(chunk, username, body), chunks))
+        report = merge_report(chunks, results)
+        if report["chunks"] > 1:
+            self._log.detail("info", "WxPusher消息分 %s 次发送，失败 %s 次，UID %s/%s，主题 %s/%s",
+                             report["chunks"], report["failed_chunks"],
+                             report["uids"] - report["failed_uids"], report["uids"],
+                             report["topics"] - report["failed_topics"], report["topics"])
+        return report
+
+    def _log_delivery(self, payload: dict, username: Optional[str], report: Dict[str, Any],
+                      elapsed: float, **extra: Any) -> None:
+        """
+        结构化日志模式下按投递报告输出一行，失败的分片记为接收方。
+        """
+        failures = [(f"UID{len(chunk.get('uids') or ())}/主题{len(chunk.get('topicIds') or ())}", reason)
+                    for chunk, reason in report["failed"]]
+        self._log.delivery(payload.get("summary"), payload.get("content"), username or "",
+                           total=report["uids"] + report["topics"], failures=failures,
+                           elapsed=elapsed, failed=report["failed_uids"] + report["failed_topics"],
+                           chunks=report["chunks"], **extra)
+
+    def _send_chunk(self, chunk: dict, username: Optional[str] = None,
+                    body: Optional[JsonBody] = None) -> Tuple[bool, str]:
+        """
+        发送单个分片，失败时单独重试，不影响其它分片。
+        """
+        success, reason = self._send(chunk, username, body)
+        for _ in range(self.chunk_retries):
+            if success:
+                break
+            time.sleep(self.chunk_retry_delay)
+            if self._metrics:
+                self._metrics.retries.inc(urlparse(self.api_url).netloc, "chunk")
+            success, reason = self._send(chunk, username, body)
+        return success, reason
+
+    def _send(self, payload: dict, username: Optional[str] = None,
+              body: Optional[JsonBody] = None) -> Tuple[bool, str]:
+        """
+        调用WxPusher接口发送消息，并记录发送结果。
+        :param body: 已序列化的公共请求体，为空时序列化整个 payload
+        :return: 是否成功及原因
+        """
+        with self._trace(username or ",".join(payload.get("uids") or payload.get("topicIds") or [])[:60]):
+            success, reason, results = self._post(payload, username, body)
+        if self._metrics:
+            self._metrics.sends.inc(urlparse(self.api_url).netloc, username or "", "success" if success else "failure")
+        if self._history:
+            self._record_history(payload, success, reason, results)
+        return success, reason
+
+    def _record_history(self, payload: dict, success: bool, reason: str, results: Optional[list]) -> None:
+        """
+        按接口返回的逐个UID和主题结果记录投递历史，未获取到结果时分片内的接收方都记为失败。
+        """
+        digest = content_key(payload.get("summary"), payload.get("content")).hex()
+        title = payload.get("summary")
+        uid_users = self._routes.uid_users
+        if not results:
+            results = [{"uid": uid} for uid in payload.get("uids") or ()] \
+                + [{"topicId": topic} for topic in payload.get("topicIds") or ()]
+        for item in results:
+            if not isinstance(item, dict):
+                continue
+            uid, topic = item.get("uid"), item.get("topicId")
+            code = item.get("code")
+            ok = success and code in (None, 1000)
+            self._history.add(uid_users.get(uid) if uid else None, digest, ok,
+                              target=uid or (f"topic:{topic}" if topic else None), title=title, code=code,
+                              message_id=item.get("messageId") or item.get("sendRecordId"),
+                              error=None if ok else item.get("status") or reason)
+
+    def _post(self, payload: dict, username: Optional[str] = None,
+              body: Optional[JsonBody] = None) -> Tuple[bool, str, Optional[list]]:
+        """
+        调用WxPusher接口，依次经过熔断检查和限流。
+        :return: 是否成功、原因及接口返回的逐个UID和主题结果
+        """
+        host = urlparse(self.api_url).netloc
+        try:
+            if self._breaker:
+                self._breaker.check(host)
+            if self._limiter:
+                with phase("throttle"):
+                    self._limiter.acquire(self.api_url, payload.get("uids") or ())
+            if body is None:
+                body = JsonBody(payload, exclude=RECIPIENT_FIELDS)
+            data = body.encode(**{field: payload[field] for field in RECIPIENT_FIELDS if field in payload})
+            start = time.monotonic()
+            res = self._pool.post(self.api_url, content_type="application/json", data=data)
+            if self._metrics:
+                self._metrics.latency.observe(time.monotonic() - start, host)
+                if res is None:
+                    self._metrics.errors.inc(host, "no_response")
+                elif res.status_code != 200:
+                    self._metrics.errors.inc(host, f"http_{res.status_code}")
+            if self._breaker:
+                # 未获取到响应或服务端错误视为不可用，业务错误不计入
+                self._breaker.record(host, res is not None and res.status_code < 500)
             if res and res.status_code == 200:
-                ret_json = res.json()
+                ret_json = decode_json(res)
                 code = ret_json.get('code')
                 msg = ret_json.get('msg')
+                # 业务错误（如UID无效）不代表服务端过载，只在成功时恢复速率
+                if self._limiter and code == 1000:
+                    self._limiter.feedback(self.api_url, True)
+                if self._metrics and code != 1000:
+                    self._metrics.errors.inc(host, code)
                 if code == 1000:
                     if username:
-                        logger.info(f"WxPusher消息发送成功给用户 {username}")
+                        self._log.detail("info", "WxPusher消息发送成功给用户 %s", username)
                     else:
-                        logger.info("WxPusher消息发送成功")
-                else:
-                    logger.warn(f"WxPusher消息发送失败，错误码：{code}，原因：{msg}")
+                        self._log.detail("info", "WxPusher消息发送成功")
+                    return True, msg, ret_json.get('data')
+                self._log.detail("warn", "WxPusher消息发送失败，错误码：%s，原因：%s", code, msg)
+                return False, f"错误码：{code}，原因：{msg}", None
             elif res is not None:
-                logger.warn(f"WxPusher消息发送失败，HTTP错误码：{res.status_code}，原因：{res.reason}")
-            else:
-                logger.warn("WxPusher消息发送失败，未获取到返回信息")
+                if self._limiter and overloaded(res.status_code):
+                    self._limiter.feedback(self.api_url, False)
+                self._log.detail("warn", "WxPusher消息发送失败，HTTP错误码：%s，原因：%s",
+                                 res.status_code, res.reason)
+                return False, f"HTTP错误码：{res.status_code}", None
+            self._log.detail("warn", "WxPusher消息发送失败，未获取到返回信息")
+            return False, "未获取到返回信息", None
+        except CircuitOpenError as e:
+            self._log.detail("warn", "WxPusher消息发送失败：%s", e)
+            return False, str(e), None
         except Exception as e:
             logger.error(f"WxPusher消息发送异常，{str(e)}")
+            return False, str(e), None
 
-    @staticmethod
-    def stop_service() -> None:
+    def _trace(self, label: str):
+        """
+        开启慢请求跟踪时记录本次请求各阶段耗时。
+        """
+        return self._tracer.trace(label) if self._tracer else nullcontext()
+
+    def _stop_queue(self, queue: DispatchQueue) -> None:
+        """
+        停止发送队列，超时未发送的消息保存到发件箱，下次启动后发送。
+        """
+        remaining = queue.stop(timeout=self._read_timeout)
+        if self._outbox:
+            for (payload, username), _ in remaining:
+                self._outbox.add({"payload": payload, "username": username},
+                                 recipient=username, title=payload.get("summary"), attempts=0)
+
+    def stop_service(self) -> None:
         """
-        停止插件服务（如需实现）。
+        停止插件服务，停止延后释放并发送完合并中和队列中的消息后关闭连接池。
         """
-        # 如需实现停止服务逻辑，补充此方法
-        pass
\ No newline at end of file
+        if self._scheduler:
+            self._scheduler.stop()
+            self._scheduler = None
+        if self._coalescer:
+            self._coalescer.stop()
+            self._coalescer = None
+        self._dedup_cache = None
+        if self._queue:
+            queue, self._queue = self._queue, None
+            self._stop_queue(queue)
+        if self._outbox:
+            self._outbox.stop()
+            self._outbox = None
+        if self._history:
+            self._history.close()
+            self._history = None
+        self._limiter = None
+        self._breaker = None
+        if self._executor:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+        if self._pool:
+            self._pool.close()
+            self._pool = None
+        # 下次加载时重建全部组件
+        if self._reloader:
+            self._reloader.reset()
\ No newline at end of file
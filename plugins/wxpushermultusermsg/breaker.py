@@ -0,0 +1,134 @@
+import threading
+import time
+from typing import Any, Dict, Hashable
+
+# 熔断器状态
+STATE_CLOSED = "closed"
+STATE_OPEN = "open"
+STATE_HALF_OPEN = "half_open"
+
+
+class CircuitOpenError(Exception):
+    """
+    熔断器打开，请求被直接拒绝
+    """
+    pass
+
+
+class _Circuit:
+    """
+    单个服务端的熔断状态
+    """
+    __slots__ = ("state", "failures", "opened_at", "probes", "probe_at", "rejected", "trips")
+
+    def __init__(self):
+        self.state = STATE_CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self.probes = 0
+        self.probe_at = 0.0
+        self.rejected = 0
+        self.trips = 0
+
+
+class CircuitBreaker:
+    """
+    按服务端主机熔断：连续失败达到阈值后打开，直接拒绝请求；
+    冷却时间后进入半开状态放行少量探测请求，成功则关闭，失败则重新打开；
+    探测结果超过冷却时间仍未返回时按失败处理，避免丢失一次结果后该服务端一直被拒绝。
+    """
+
+    def __init__(self, threshold: int = 5, reset_timeout: float = 60, half_open_max: int = 1):
+        self._threshold = max(threshold, 1)
+        self._reset_timeout = reset_timeout
+        self._half_open_max = max(half_open_max, 1)
+        self._circuits: Dict[Hashable, _Circuit] = {}
+        self._lock = threading.Lock()
+
+    def allow(self, key: Hashable) -> bool:
+        """
+        是否允许请求
+        """
+        with self._lock:
+            circuit = self._circuits.get(key)
+            if not circuit:
+                circuit = self._circuits[key] = _Circuit()
+            now = time.monotonic()
+            if circuit.state == STATE_HALF_OPEN and circuit.probes >= self._half_open_max \
+                    and now - circuit.probe_at >= self._reset_timeout:
+                # 探测结果丢失，从探测时起重新计算冷却时间
+                circuit.state = STATE_OPEN
+                circuit.opened_at = circuit.probe_at
+                circuit.trips += 1
+            if circuit.state == STATE_OPEN and now - circuit.opened_at >= self._reset_timeout:
+                circuit.state = STATE_HALF_OPEN
+                circuit.probes = 0
+            if circuit.state == STATE_CLOSED:
+                return True
+            if circuit.state == STATE_HALF_OPEN and circuit.probes < self._half_open_max:
+                circuit.probes += 1
+                circuit.probe_at = now
+                return True
+            circuit.rejected += 1
+            return False
+
+    def is_open(self, key: Hashable) -> bool:
+        """
+        是否处于熔断中且未到探测时间，不改变状态
+        """
+        with self._lock:
+            circuit = self._circuits.get(key)
+            return bool(circuit and circuit.state == STATE_OPEN
+                        and time.monotonic() - circuit.opened_at < self._reset_timeout)
+
+    def check(self, key: Hashable):
+        """
+        不允许请求时抛出 CircuitOpenError
+        """
+        if not self.allow(key):
+            raise CircuitOpenError(f"{key} 熔断中")
+
+    def record(self, key: Hashable, ok: bool):
+        """
+        记录请求结果
+        """
+        with self._lock:
+            circuit = self._circuits.get(key)
+            if not circuit:
+                return
+            if ok:
+                circuit.state = STATE_CLOSED
+                circuit.failures = 0
+                circuit.probes = 0
+                return
+            circuit.failures += 1
+            if circuit.state == STATE_HALF_OPEN or circuit.failures >= self._threshold:
+                if circuit.state != STATE_OPEN:
+                    circuit.trips += 1
+                circuit.state = STATE_OPEN
+                circuit.opened_at = time.monotonic()
+
+    def configure(self, threshold: int, reset_timeout: float):
+        """
+        调整失败阈值和冷却时间，各服务端的当前状态保留
+        """
+        with self._lock:
+            self._threshold = max(threshold, 1)
+            self._reset_timeout = reset_timeout
+
+    def states(self) -> Dict[str, Dict[str, Any]]:
+        """
+        各服务端的熔断状态
+        """
+        now = time.monotonic()
+        with self._lock:
+            return {
+                str(key): {
+                    "state": circuit.state,
+                    "failures": circuit.failures,
+                    "rejected": circuit.rejected,
+                    "trips": circuit.trips,
+                    "retry_in": max(round(self._reset_timeout - (now - circuit.opened_at)), 0)
+                    if circuit.state == STATE_OPEN else 0
+                } for key, circuit in self._circuits.items()
+            }
@@ -0,0 +1,100 @@
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Hashable, Optional
+
+
+def content_key(*parts: Optional[str]) -> bytes:
+    """
+    计算消息内容摘要，作为去重缓存的键，避免在内存中保存完整消息
+    """
+    digest = hashlib.blake2b(digest_size=16)
+    for part in parts:
+        digest.update((part or "").encode("utf-8"))
+        digest.update(b"\0")
+    return digest.digest()
+
+
+class TTLCache:
+    """
+    带过期时间的 LRU 缓存，超出容量时淘汰最久未使用的键
+    """
+
+    def __init__(self, maxsize: int = 10000, ttl: float = 300):
+        self._maxsize = max(maxsize, 1)
+        self._ttl = ttl
+        # 键 -> 过期时间
+        self._data: "OrderedDict[Hashable, float]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+
+    def seen(self, key: Hashable) -> bool:
+        """
+        检查键是否在有效期内出现过，未出现时记录下来
+        :return: True 表示重复
+        """
+        now = time.monotonic()
+        with self._lock:
+            expires = self._data.get(key)
+            if expires is not None and expires > now:
+                self._data.move_to_end(key)
+                self._hits += 1
+                return True
+            self._misses += 1
+            self._data[key] = now + self._ttl
+            self._data.move_to_end(key)
+            self._expire(now)
+            return False
+
+    def forget(self, key: Hashable):
+        """
+        移除记录的键，消息未能送达时调用，之后同样的消息不再被当作重复
+        """
+        with self._lock:
+            self._data.pop(key, None)
+
+    def _expire(self, now: float):
+        """
+        淘汰过期及超出容量的键，调用方需持有锁
+        """
+        while self._data:
+            key, expires = next(iter(self._data.items()))
+            if expires > now and len(self._data) <= self._maxsize:
+                break
+            self._data.popitem(last=False)
+            self._evictions += 1
+
+    def configure(self, maxsize: int, ttl: float):
+        """
+        调整容量和有效期，已记录的键保留，超出新容量的最久未使用的键被淘汰
+        """
+        with self._lock:
+            self._maxsize = max(maxsize, 1)
+            self._ttl = ttl
+            self._expire(time.monotonic())
+
+    def clear(self):
+        """
+        清空缓存
+        """
+        with self._lock:
+            self._data.clear()
+
+    def stats(self) -> Dict[str, float]:
+        """
+        命中统计
+        """
+        with self._lock:
+            total = self._hits + self._misses
+            return {
+                "size": len(self._data),
+                "maxsize": self._maxsize,
+                "ttl": self._ttl,
+                "hits": self._hits,
+                "misses": self._misses,
+                "evictions": self._evictions,
+                "hit_ratio": round(self._hits / total, 4) if total else 0
+            }
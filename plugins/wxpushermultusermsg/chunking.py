@@ -0,0 +1,54 @@
+from itertools import zip_longest
+from typing import Any, Dict, List, Sequence, Tuple
+
+# 单次请求的UID和主题数量上限
+MAX_UIDS = 1000
+MAX_TOPIC_IDS = 5
+# 按接收方拆分的字段
+RECIPIENT_FIELDS = ("uids", "topicIds")
+
+
+def _slices(items: Sequence[str], size: int) -> List[List[str]]:
+    """
+    按固定大小切分列表
+    """
+    return [list(items[i:i + size]) for i in range(0, len(items), size)]
+
+
+def split_payload(payload: dict, max_uids: int = MAX_UIDS, max_topics: int = MAX_TOPIC_IDS) -> List[dict]:
+    """
+    按单次请求的UID和主题数量上限拆分请求体，未超过上限时原样返回。
+    第 N 个分片携带第 N 组UID和第 N 组主题，请求数取两者分组数的较大值。
+    """
+    uids = payload.get("uids") or []
+    topics = payload.get("topicIds") or []
+    max_uids, max_topics = max(max_uids, 1), max(max_topics, 1)
+    if len(uids) <= max_uids and len(topics) <= max_topics:
+        return [payload]
+    base = {k: v for k, v in payload.items() if k not in RECIPIENT_FIELDS}
+    chunks = []
+    for uid_chunk, topic_chunk in zip_longest(_slices(uids, max_uids), _slices(topics, max_topics)):
+        chunk = dict(base)
+        if uid_chunk:
+            chunk["uids"] = uid_chunk
+        if topic_chunk:
+            chunk["topicIds"] = topic_chunk
+        chunks.append(chunk)
+    return chunks
+
+
+def merge_report(chunks: List[dict], results: List[Tuple[bool, str]]) -> Dict[str, Any]:
+    """
+    合并各分片的发送结果为一份投递报告
+    """
+    failed = [(chunk, reason) for chunk, (ok, reason) in zip(chunks, results) if not ok]
+    return {
+        "chunks": len(chunks),
+        "failed_chunks": len(failed),
+        "uids": sum(len(chunk.get("uids") or ()) for chunk in chunks),
+        "failed_uids": sum(len(chunk.get("uids") or ()) for chunk, _ in failed),
+        "topics": sum(len(chunk.get("topicIds") or ()) for chunk in chunks),
+        "failed_topics": sum(len(chunk.get("topicIds") or ()) for chunk, _ in failed),
+        "errors": sorted({reason for _, reason in failed if reason}),
+        "failed": failed
+    }
@@ -0,0 +1,215 @@
+import threading
+import time
+from collections import deque
+from typing import Any, Callable, Deque, Dict, List, Tuple
+
+from app.log import logger
+
+# 队列满时的处理策略
+OVERFLOW_DROP_OLDEST = "drop_oldest"
+OVERFLOW_DROP_NEWEST = "drop_newest"
+OVERFLOW_BLOCK = "block"
+
+# 优先级通道
+PRIORITY_HIGH = 0
+PRIORITY_NORMAL = 1
+PRIORITY_BULK = 2
+# 各通道的调度权重，通道同时有消息时按权重轮流取出，低优先级通道不会被饿死
+LANE_WEIGHTS = {PRIORITY_HIGH: 8, PRIORITY_NORMAL: 3, PRIORITY_BULK: 1}
+
+
+class DispatchQueue:
+    """
+    有界消息分发队列，由后台线程执行发送，事件处理函数入队后立即返回。
+    消息按优先级进入不同通道，取出时使用平滑加权轮询：高优先级通道优先，低优先级通道按权重分得一定份额。
+    """
+
+    def __init__(self, handler: Callable[..., Any], name: str = "dispatch",
+                 workers: int = 2, maxsize: int = 1000,
+                 overflow: str = OVERFLOW_DROP_OLDEST, block_timeout: float = 5,
+                 weights: Dict[int, int] = None):
+        self._handler = handler
+        self._name = name
+        self._workers = max(workers, 1)
+        self._maxsize = max(maxsize, 1)
+        self._overflow = overflow
+        self._block_timeout = block_timeout
+        self._weights = weights or LANE_WEIGHTS
+        # 各通道元素：(入队时间, 位置参数, 关键字参数)
+        self._lanes: Dict[int, Deque[Tuple[float, tuple, dict]]] = {lane: deque() for lane in self._weights}
+        self._credits: Dict[int, int] = {lane: 0 for lane in self._weights}
+        self._size = 0
+        self._cond = threading.Condition()
+        self._threads: List[threading.Thread] = []
+        self._closing = False
+        # 减少线程数时等待退出的线程数
+        self._retiring = 0
+        self._busy = 0
+        # 统计
+        self._enqueued = 0
+        self._processed = 0
+        self._failed = 0
+        self._dropped = 0
+        self._lag_total = 0.0
+        self._lag_max = 0.0
+        self._lag_last = 0.0
+
+    def start(self):
+        """
+        启动后台线程
+        """
+        for i in range(self._workers):
+            thread = threading.Thread(target=self._run, name=f"{self._name}-{i}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def put(self, *args, priority: int = PRIORITY_NORMAL, **kwargs) -> bool:
+        """
+        消息入队，按溢出策略处理队列已满的情况
+        :param priority: 优先级通道
+        :return: 是否入队成功
+        """
+        if priority not in self._lanes:
+            priority = PRIORITY_NORMAL if PRIORITY_NORMAL in self._lanes else max(self._lanes)
+        with self._cond:
+            if self._closing:
+                return False
+            if self._size >= self._maxsize:
+                if self._overflow == OVERFLOW_DROP_NEWEST:
+                    self._dropped += 1
+                    logger.warn(f"{self._name} 队列已满，丢弃最新消息")
+                    return False
+                elif self._overflow == OVERFLOW_BLOCK:
+                    if not self._cond.wait_for(lambda: self._size < self._maxsize or self._closing,
+                                               timeout=self._block_timeout) or self._closing:
+                        self._dropped += 1
+                        logger.warn(f"{self._name} 队列已满，等待超时丢弃消息")
+                        return False
+                else:
+                    # 从优先级最低的非空通道丢弃最早的消息
+                    lane = max(lane for lane, items in self._lanes.items() if items)
+                    self._lanes[lane].popleft()
+                    self._size -= 1
+                    self._dropped += 1
+                    logger.warn(f"{self._name} 队列已满，丢弃最早的消息")
+            self._lanes[priority].append((time.monotonic(), args, kwargs))
+            self._size += 1
+            self._enqueued += 1
+            self._cond.notify_all()
+            return True
+
+    def _next(self) -> Tuple[float, tuple, dict]:
+        """
+        平滑加权轮询选出下一个通道并取出消息，调用方需持有锁且队列非空
+        """
+        ready = [lane for lane, items in self._lanes.items() if items]
+        total = 0
+        for lane in ready:
+            self._credits[lane] += self._weights[lane]
+            total += self._weights[lane]
+        # 权重相同时优先级高（数值小）的通道优先
+        lane = max(ready, key=lambda x: (self._credits[x], -x))
+        self._credits[lane] -= total
+        self._size -= 1
+        item = self._lanes[lane].popleft()
+        if not self._lanes[lane]:
+            self._credits[lane] = 0
+        return item
+
+    def _run(self):
+        """
+        后台线程：持续取出消息并发送，关闭时处理完剩余消息后退出
+        """
+        while True:
+            with self._cond:
+                self._cond.wait_for(lambda: self._size or self._closing or self._retiring)
+                if self._retiring and not self._closing:
+                    self._retiring -= 1
+                    return
+                if not self._size:
+                    return
+                enqueued_at, args, kwargs = self._next()
+                self._busy += 1
+                lag = time.monotonic() - enqueued_at
+                self._lag_last = lag
+                self._lag_total += lag
+                self._lag_max = max(self._lag_max, lag)
+                self._cond.notify_all()
+            try:
+                self._handler(*args, **kwargs)
+            except Exception as err:
+                with self._cond:
+                    self._failed += 1
+                logger.error(f"{self._name} 消息发送异常：{str(err)}")
+            finally:
+                with self._cond:
+                    self._busy -= 1
+                    self._processed += 1
+
+    def configure(self, workers: int, maxsize: int, overflow: str, block_timeout: float):
+        """
+        运行中调整线程数、容量和溢出策略，队列中的消息保留；容量调小时已入队的消息不丢弃
+        """
+        workers = max(workers, 1)
+        with self._cond:
+            self._maxsize = max(maxsize, 1)
+            self._overflow = overflow
+            self._block_timeout = block_timeout
+            self._threads = [thread for thread in self._threads if thread.is_alive()]
+            running = len(self._threads) - self._retiring
+            self._workers = workers
+            if workers < running:
+                self._retiring += running - workers
+            else:
+                # 先抵消尚未退出的线程，不足再新建
+                revived = min(self._retiring, workers - running)
+                self._retiring -= revived
+                running += revived
+            self._cond.notify_all()
+        for _ in range(max(workers - running, 0)):
+            thread = threading.Thread(target=self._run, name=f"{self._name}-{len(self._threads)}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def stop(self, timeout: float = 10) -> List[Tuple[tuple, dict]]:
+        """
+        停止接收新消息，在超时时间内发送完队列中的消息
+        :return: 超时未发送的消息参数，由调用方决定是否保存
+        """
+        with self._cond:
+            self._closing = True
+            self._cond.notify_all()
+        deadline = time.monotonic() + timeout
+        for thread in self._threads:
+            thread.join(max(deadline - time.monotonic(), 0))
+        remaining = []
+        with self._cond:
+            if self._size:
+                logger.warn(f"{self._name} 停止时仍有 {self._size} 条消息未发送")
+                self._dropped += self._size
+                for lane in sorted(self._lanes):
+                    remaining.extend((args, kwargs) for _, args, kwargs in self._lanes[lane])
+                    self._lanes[lane].clear()
+                self._size = 0
+        self._threads = []
+        return remaining
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        队列深度、处理量及排队延迟统计
+        """
+        with self._cond:
+            started = self._processed + self._busy
+            return {
+                "depth": self._size,
+                "lanes": {lane: len(items) for lane, items in self._lanes.items()},
+                "maxsize": self._maxsize,
+                "busy": self._busy,
+                "enqueued": self._enqueued,
+                "processed": self._processed,
+                "failed": self._failed,
+                "dropped": self._dropped,
+                "lag_last": round(self._lag_last, 4),
+                "lag_max": round(self._lag_max, 4),
+                "lag_avg": round(self._lag_total / started, 4) if started else 0
+            }
@@ -0,0 +1,119 @@
+import sys
+from collections.abc import Mapping
+from types import MappingProxyType
+from typing import Dict, Iterable, Iterator, Optional, Sequence, Tuple, Union
+
+
+class RecipientRegistry(Mapping):
+    """
+    只读的接收方注册表：名称 -> 推送目标（设备密钥或UID）。
+    同名配置以最后一条为准，目标去重；名称和目标字符串驻留，相同目标只保存一份。
+    """
+    __slots__ = ("_index", "_anonymous", "_targets", "_duplicates")
+
+    def __init__(self, entries: Iterable[Tuple[Optional[str], str]] = ()):
+        """
+        :param entries: (名称, 目标) 列表，名称为空表示未指定用户名的目标
+        """
+        index: Dict[str, str] = {}
+        anonymous: Dict[str, None] = {}
+        duplicates = 0
+        for name, target in entries:
+            target = (target or "").strip()
+            if not target:
+                continue
+            target = sys.intern(target)
+            name = (name or "").strip()
+            if not name:
+                if target in anonymous:
+                    duplicates += 1
+                anonymous[target] = None
+                continue
+            if name in index:
+                duplicates += 1
+            index[sys.intern(name)] = target
+        self._index = index
+        self._anonymous: Tuple[str, ...] = tuple(anonymous)
+        self._targets: Tuple[str, ...] = tuple(dict.fromkeys((*index.values(), *anonymous)))
+        self._duplicates = duplicates
+
+    def __getitem__(self, name: str) -> str:
+        return self._index[name]
+
+    def __contains__(self, name: object) -> bool:
+        return name in self._index
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._index)
+
+    def __len__(self) -> int:
+        return len(self._index)
+
+    @property
+    def anonymous(self) -> Tuple[str, ...]:
+        """
+        未指定用户名的目标
+        """
+        return self._anonymous
+
+    @property
+    def targets(self) -> Tuple[str, ...]:
+        """
+        去重后的全部目标
+        """
+        return self._targets
+
+    @property
+    def duplicates(self) -> int:
+        """
+        构建时忽略的重复配置数
+        """
+        return self._duplicates
+
+    def diff(self, other: "RecipientRegistry") -> Dict[str, Tuple[str, ...]]:
+        """
+        与新配置比较，返回新增、移除和目标变化的名称，未指定名称的目标按目标本身比较
+        """
+        added = tuple(name for name in other._index if name not in self._index)
+        removed = tuple(name for name in self._index if name not in other._index)
+        changed = tuple(name for name, target in other._index.items()
+                        if name in self._index and self._index[name] != target)
+        anonymous = set(self._anonymous)
+        new_anonymous = set(other._anonymous)
+        return {
+            "added": added + tuple(target for target in other._anonymous if target not in anonymous),
+            "removed": removed + tuple(target for target in self._anonymous if target not in new_anonymous),
+            "changed": changed
+        }
+
+
+def parse_groups(value: Optional[str]) -> Mapping:
+    """
+    解析用户组配置，每行一个 组名:用户1,用户2
+    :return: 组名 -> 去重后的用户名列表
+    """
+    groups: Dict[str, Tuple[str, ...]] = {}
+    for line in (value or "").splitlines():
+        if ':' not in line:
+            continue
+        name, members = line.split(':', 1)
+        name = name.strip()
+        users = tuple(dict.fromkeys(sys.intern(u.strip()) for u in members.split(',') if u.strip()))
+        if name and users:
+            groups[sys.intern(name)] = users
+    return MappingProxyType(groups)
+
+
+def resolve_names(groups: Mapping, names: Union[str, Sequence[str], None]) -> Tuple[str, ...]:
+    """
+    将用户名或组名（单个或列表）展开为去重后的用户名，保持原有顺序
+    """
+    if not names:
+        return ()
+    if isinstance(names, str):
+        names = (names,)
+    users: Dict[str, None] = {}
+    for name in names:
+        for user in groups.get(name, (name,)):
+            users[user] = None
+    return tuple(users)
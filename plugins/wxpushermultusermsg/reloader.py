@@ -0,0 +1,48 @@
+import threading
+from typing import Any, Dict, List, Tuple
+
+# 尚未创建过的组件
+_UNSET = object()
+
+
+class Reloader:
+    """
+    配置热重载：记录各组件创建时使用的配置，重新加载时只重建或调整配置发生变化的组件，
+    连接池、发送队列和缓存等未受影响的组件原样保留。
+    """
+
+    def __init__(self):
+        self._settings: Dict[str, Tuple[Any, ...]] = {}
+        self._changed: List[str] = []
+        # 保存配置和 API 可能同时触发重新加载，逐个执行
+        self.lock = threading.RLock()
+
+    def begin(self):
+        """
+        开始一次重新加载，清空上次的变化记录
+        """
+        self._changed = []
+
+    def changed(self, component: str, *settings: Any) -> bool:
+        """
+        组件配置是否与上次不同，首次加载视为变化，同时记录本次配置
+        """
+        previous = self._settings.get(component, _UNSET)
+        self._settings[component] = settings
+        if previous == settings:
+            return False
+        self._changed.append(component)
+        return True
+
+    def summary(self) -> List[str]:
+        """
+        本次重新加载中配置变化的组件
+        """
+        return list(self._changed)
+
+    def reset(self):
+        """
+        组件全部停止后清空记录，下次加载时全部重建
+        """
+        self._settings.clear()
+        self._changed = []
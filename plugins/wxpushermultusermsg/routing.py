@@ -0,0 +1,109 @@
+from dataclasses import dataclass, field
+from types import MappingProxyType
+from typing import FrozenSet, List, Mapping, Optional, Sequence, Tuple, Union
+
+from app.schemas.types import NotificationType
+
+from .dispatch import PRIORITY_HIGH, PRIORITY_NORMAL, PRIORITY_BULK
+from .registry import RecipientRegistry, parse_groups, resolve_names
+
+
+def split_ids(value: Optional[str]) -> Tuple[str, ...]:
+    """
+    解析逗号分隔的ID列表，忽略空项
+    """
+    return tuple(i.strip() for i in (value or "").split(",") if i.strip())
+
+
+def parse_uids(value: Optional[str]) -> RecipientRegistry:
+    """
+    解析UID配置，支持 username:uid 和纯UID 两种格式，纯UID没有用户名
+    """
+    return RecipientRegistry(item.split(':', 1) if ':' in item else (None, item) for item in split_ids(value))
+
+
+@dataclass(frozen=True)
+class RoutingTable:
+    """
+    发送路由表，在 init_plugin 中一次性解析配置生成，之后只读，发送时只做查找
+    """
+    # 用户名 -> UID，同时保存未指定用户名的纯UID
+    user_uids: RecipientRegistry = field(default_factory=RecipientRegistry)
+    # UID -> 用户名，用于按UID记录投递历史
+    uid_users: Mapping[str, str] = field(default_factory=lambda: MappingProxyType({}))
+    topic_ids: Tuple[str, ...] = ()
+    # 组名 -> 用户名列表
+    groups: Mapping[str, Tuple[str, ...]] = field(default_factory=lambda: MappingProxyType({}))
+    # 开启发送的消息类型
+    msgtypes: FrozenSet[str] = frozenset()
+    high_msgtypes: FrozenSet[str] = frozenset()
+    bulk_msgtypes: FrozenSet[str] = frozenset()
+    # 请求体公共部分
+    base_payload: Mapping[str, object] = field(default_factory=lambda: MappingProxyType({}))
+    # 生成路由表的原始配置，重新加载时未变化的部分直接复用
+    sources: Mapping[str, Optional[str]] = field(default_factory=lambda: MappingProxyType({}), compare=False)
+
+    @classmethod
+    def build(cls, app_token: Optional[str], content_type: int, uids: Optional[str], topic_ids: Optional[str],
+              msgtypes: List[str] = None, high_msgtypes: List[str] = None,
+              bulk_msgtypes: List[str] = None, groups: Optional[str] = None,
+              previous: Optional["RoutingTable"] = None) -> "RoutingTable":
+        """
+        解析配置生成路由表
+        :param previous: 上一次的路由表，原始配置未变化的部分不重新解析
+        """
+        sources = {"uids": uids, "topic_ids": topic_ids, "groups": groups}
+        reused = {key for key, value in sources.items()
+                  if previous and key in previous.sources and previous.sources[key] == value}
+        if "uids" in reused:
+            user_uids, uid_users = previous.user_uids, previous.uid_users
+        else:
+            user_uids = parse_uids(uids)
+            uid_users = MappingProxyType({uid: name for name, uid in user_uids.items()})
+        return cls(user_uids=user_uids,
+                   uid_users=uid_users,
+                   topic_ids=previous.topic_ids if "topic_ids" in reused else split_ids(topic_ids),
+                   groups=previous.groups if "groups" in reused else parse_groups(groups),
+                   msgtypes=frozenset(msgtypes or ()),
+                   high_msgtypes=frozenset(high_msgtypes or ()),
+                   bulk_msgtypes=frozenset(bulk_msgtypes or ()),
+                   base_payload=MappingProxyType({"appToken": app_token, "contentType": content_type}),
+                   sources=MappingProxyType(sources))
+
+    @property
+    def pure_uids(self) -> Tuple[str, ...]:
+        """
+        未指定用户名的纯UID
+        """
+        return self.user_uids.anonymous
+
+    @property
+    def all_uids(self) -> Tuple[str, ...]:
+        """
+        去重后的所有UID（用户名映射 + 纯UID），用于测试消息
+        """
+        return self.user_uids.targets
+
+    def resolve(self, names: Union[str, Sequence[str], None]) -> Tuple[str, ...]:
+        """
+        展开用户名和组名，返回去重后的用户名
+        """
+        return resolve_names(self.groups, names)
+
+    def accepts(self, msg_type: Optional[NotificationType]) -> bool:
+        """
+        消息类型是否开启发送，未选择任何类型时不发送
+        """
+        return not msg_type or msg_type.name in self.msgtypes
+
+    def priority(self, msg_type: Optional[NotificationType]) -> int:
+        """
+        消息类型对应的发送队列优先级通道
+        """
+        if not msg_type:
+            return PRIORITY_NORMAL
+        if msg_type.name in self.high_msgtypes:
+            return PRIORITY_HIGH
+        if msg_type.name in self.bulk_msgtypes:
+            return PRIORITY_BULK
+        return PRIORITY_NORMAL
@@ -0,0 +1,91 @@
+import threading
+from typing import Any, Dict, Optional
+from urllib.parse import urlparse
+
+from requests import Response, Session
+from requests.adapters import HTTPAdapter
+
+from app.utils.http import RequestUtils
+
+from .tracing import TracingAdapter
+
+
+class SessionPool:
+    """
+    按主机复用的 HTTP 长连接池，避免每条消息都重新建立 TCP 连接和 TLS 握手
+    """
+
+    def __init__(self, pool_size: int = 10, keepalive: bool = True,
+                 connect_timeout: float = 5, read_timeout: float = 20, trace: bool = False):
+        """
+        :param trace: 使用可跟踪连接，记录 DNS、连接、TLS 和等待响应的耗时
+        """
+        self._pool_size = pool_size
+        self._adapter_cls = TracingAdapter if trace else HTTPAdapter
+        self._keepalive = keepalive
+        self._timeout = (connect_timeout, read_timeout)
+        self._sessions: Dict[str, Session] = {}
+        self._lock = threading.Lock()
+
+    def session(self, url: str) -> Session:
+        """
+        获取目标主机的会话，不存在时创建
+        """
+        host = urlparse(url).netloc
+        with self._lock:
+            session = self._sessions.get(host)
+            if not session:
+                session = Session()
+                adapter = self._adapter_cls(pool_connections=1, pool_maxsize=self._pool_size)
+                session.mount("http://", adapter)
+                session.mount("https://", adapter)
+                if not self._keepalive:
+                    session.headers["Connection"] = "close"
+                self._sessions[host] = session
+            return session
+
+    def post(self, url: str, content_type: str = None, **kwargs) -> Optional[Response]:
+        """
+        使用连接池发送 POST 请求
+        """
+        return RequestUtils(session=self.session(url),
+                            timeout=self._timeout,
+                            content_type=content_type).post_res(url, **kwargs)
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        连接池统计：空闲连接数、新建连接数、请求数及连接复用率
+        """
+        hosts = {}
+        with self._lock:
+            sessions = list(self._sessions.items())
+        for host, session in sessions:
+            opened = connections = requests = 0
+            for adapter in set(session.adapters.values()):
+                manager = getattr(adapter, "poolmanager", None)
+                if not manager:
+                    continue
+                for key in manager.pools.keys():
+                    pool = manager.pools.get(key)
+                    if not pool:
+                        continue
+                    opened += sum(1 for conn in list(pool.pool.queue) if conn is not None) if pool.pool else 0
+                    connections += pool.num_connections
+                    requests += pool.num_requests
+            hosts[host] = {
+                "open": opened,
+                "connections": connections,
+                "requests": requests,
+                "reuse_ratio": round(1 - connections / requests, 4) if requests else 0
+            }
+        return hosts
+
+    def close(self):
+        """
+        关闭所有会话
+        """
+        with self._lock:
+            sessions = list(self._sessions.values())
+            self._sessions.clear()
+        for session in sessions:
+            session.close()
@@ -0,0 +1,237 @@
+import heapq
+import itertools
+import socket
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional
+
+from requests import Response
+from requests.adapters import HTTPAdapter
+from urllib3.connection import HTTPConnection, HTTPSConnection
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+
+# 记录的阶段，other 为总耗时减去各阶段之和（发送请求体、读取响应体等）
+PHASES = ("throttle", "dns", "connect", "tls", "wait", "json")
+
+_local = threading.local()
+
+
+class Trace:
+    """
+    一次发送的各阶段耗时（秒）
+    """
+    __slots__ = ("label", "started", "phases", "total", "error")
+
+    def __init__(self, label: str):
+        self.label = label
+        self.started = time.time()
+        self.phases: Dict[str, float] = {}
+        self.total = 0.0
+        self.error: Optional[str] = None
+
+    def add(self, name: str, seconds: float):
+        """
+        累加阶段耗时，重试或多次连接时合并计算
+        """
+        self.phases[name] = self.phases.get(name, 0.0) + seconds
+
+    def to_dict(self) -> Dict[str, Any]:
+        """
+        转换为接口输出，耗时单位为毫秒
+        """
+        phases = {name: round(self.phases.get(name, 0.0) * 1000, 1) for name in PHASES}
+        phases["other"] = round(max(self.total - sum(self.phases.values()), 0.0) * 1000, 1)
+        return {
+            "label": self.label,
+            "started": time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(self.started)),
+            "total_ms": round(self.total * 1000, 1),
+            "reused": "connect" not in self.phases,
+            "phases_ms": phases,
+            "error": self.error
+        }
+
+
+def current() -> Optional[Trace]:
+    """
+    当前线程正在记录的跟踪
+    """
+    return getattr(_local, "trace", None)
+
+
+@contextmanager
+def phase(name: str) -> Iterator[None]:
+    """
+    记录一个阶段的耗时，当前线程没有跟踪时不做任何事
+    """
+    trace = current()
+    if trace is None:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        trace.add(name, time.perf_counter() - start)
+
+
+def decode_json(res: Response) -> Any:
+    """
+    解析响应 JSON 并记录耗时
+    """
+    with phase("json"):
+        return res.json()
+
+
+class Tracer:
+    """
+    保存最慢的 N 次发送跟踪，按总耗时淘汰，内存占用固定
+    """
+
+    def __init__(self, size: int = 20):
+        self._size = max(size, 1)
+        self._heap: List[tuple] = []
+        self._seq = itertools.count()
+        self._lock = threading.Lock()
+        self._count = 0
+
+    @contextmanager
+    def trace(self, label: str) -> Iterator[Trace]:
+        """
+        跟踪一次发送，嵌套调用时沿用外层的跟踪
+        """
+        outer = current()
+        if outer is not None:
+            yield outer
+            return
+        trace = _local.trace = Trace(label)
+        start = time.perf_counter()
+        try:
+            yield trace
+        except Exception as err:
+            trace.error = str(err)
+            raise
+        finally:
+            _local.trace = None
+            trace.total = time.perf_counter() - start
+            self._record(trace)
+
+    def _record(self, trace: Trace):
+        """
+        比已保存的最快一次更慢时保留
+        """
+        item = (trace.total, next(self._seq), trace)
+        with self._lock:
+            self._count += 1
+            if len(self._heap) < self._size:
+                heapq.heappush(self._heap, item)
+            elif trace.total > self._heap[0][0]:
+                heapq.heapreplace(self._heap, item)
+
+    def slowest(self) -> List[Dict[str, Any]]:
+        """
+        最慢的 N 次发送，按耗时从高到低
+        """
+        with self._lock:
+            traces = [trace for _, _, trace in sorted(self._heap, reverse=True)]
+            count = self._count
+        return [{**trace.to_dict(), "rank": i + 1, "traced": count} for i, trace in enumerate(traces)]
+
+    def clear(self):
+        """
+        清空已保存的跟踪
+        """
+        with self._lock:
+            self._heap.clear()
+            self._count = 0
+
+
+class _TracedConnection:
+    """
+    记录 DNS 解析、TCP 连接和等待响应的耗时，没有跟踪时与原连接一致
+    """
+
+    def _new_conn(self):
+        """
+        先计时解析域名，再连接已解析的地址
+        """
+        trace = current()
+        if trace is None:
+            return super()._new_conn()
+        host = self._dns_host
+        start = time.perf_counter()
+        try:
+            addresses = [info[4][0] for info in socket.getaddrinfo(host, self.port, 0, socket.SOCK_STREAM)]
+        except OSError:
+            # 解析失败时交给 urllib3 抛出原有的异常
+            addresses = []
+        finally:
+            trace.add("dns", time.perf_counter() - start)
+        start = time.perf_counter()
+        try:
+            # 使用已解析的地址连接，避免重复解析
+            for index, address in enumerate(addresses):
+                self._dns_host = address
+                try:
+                    return super()._new_conn()
+                except Exception:
+                    if index == len(addresses) - 1:
+                        raise
+            return super()._new_conn()
+        finally:
+            self._dns_host = host
+            trace.add("connect", time.perf_counter() - start)
+
+    def getresponse(self, *args, **kwargs):
+        """
+        从发送完请求到收到响应头的耗时
+        """
+        with phase("wait"):
+            return super().getresponse(*args, **kwargs)
+
+
+class TracedHTTPConnection(_TracedConnection, HTTPConnection):
+    pass
+
+
+class TracedHTTPSConnection(_TracedConnection, HTTPSConnection):
+    """
+    额外记录 TLS 握手耗时
+    """
+
+    def connect(self):
+        """
+        连接总耗时减去 DNS 和 TCP 连接即为 TLS 握手耗时
+        """
+        trace = current()
+        if trace is None:
+            return super().connect()
+        before = trace.phases.get("dns", 0.0) + trace.phases.get("connect", 0.0)
+        start = time.perf_counter()
+        try:
+            return super().connect()
+        finally:
+            elapsed = time.perf_counter() - start
+            tcp = trace.phases.get("dns", 0.0) + trace.phases.get("connect", 0.0) - before
+            trace.add("tls", max(elapsed - tcp, 0.0))
+
+
+class TracedHTTPConnectionPool(HTTPConnectionPool):
+    ConnectionCls = TracedHTTPConnection
+
+
+class TracedHTTPSConnectionPool(HTTPSConnectionPool):
+    ConnectionCls = TracedHTTPSConnection
+
+
+class TracingAdapter(HTTPAdapter):
+    """
+    使用可跟踪连接的适配器，只在当前线程开启跟踪时记录耗时
+    """
+
+    def init_poolmanager(self, *args, **kwargs):
+        super().init_poolmanager(*args, **kwargs)
+        self.poolmanager.pool_classes_by_scheme = {
+            "http": TracedHTTPConnectionPool,
+            "https": TracedHTTPSConnectionPool
+        }
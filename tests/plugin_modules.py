@@ -0,0 +1,147 @@
+"""
+测试辅助：插件目录中的辅助模块只依赖标准库和 MoviePilot 的少量接口，
+这里把插件目录注册为不执行 __init__.py 的包，直接导入其中的模块。
+未安装 MoviePilot 时注册插件用到的最少接口，插件本身也可以导入，发送流程在 CI 中完整执行。
+"""
+import importlib
+import logging
+import sys
+import tempfile
+import types
+from enum import Enum
+from pathlib import Path
+
+import pytest
+
+ROOT = Path(__file__).resolve().parent.parent
+PLUGINS = ROOT / "plugins"
+BARK = "barkmultiusermsg"
+WXPUSHER = "wxpushermultusermsg"
+
+
+class _Logger:
+    """
+    与 app.log.logger 相同的调用方式，warn 映射到 warning
+    """
+
+    def __init__(self):
+        self._logger = logging.getLogger("plugins")
+
+    def __getattr__(self, name):
+        return getattr(self._logger, "warning" if name == "warn" else name)
+
+
+class _RequestUtils:
+    """
+    占位的 RequestUtils，需要发送请求的测试自行替换
+    """
+
+    def __init__(self, **kwargs):
+        self.kwargs = kwargs
+
+    def get_res(self, url, **kwargs):
+        raise ConnectionError(f"测试中不访问网络：{url}")
+
+    def post_res(self, url, **kwargs):
+        raise ConnectionError(f"测试中不访问网络：{url}")
+
+
+class _PluginBase:
+    """
+    与 app.plugins._PluginBase 相同的调用方式，只包含插件用到的方法
+    """
+
+    def get_data_path(self) -> Path:
+        if not getattr(self, "_data_path", None):
+            self._data_path = Path(tempfile.mkdtemp(prefix="plugin-"))
+        return self._data_path
+
+    def update_config(self, config: dict):
+        self.saved_config = config
+
+
+class _Event:
+    """
+    与 app.core.event.Event 相同的构造方式
+    """
+
+    def __init__(self, event_type=None, event_data: dict = None):
+        self.event_type = event_type
+        self.event_data = event_data or {}
+
+
+class _EventManager:
+    """
+    只记录注册的处理函数，测试直接调用插件的事件处理方法
+    """
+
+    def __init__(self):
+        self.handlers = []
+
+    def register(self, event_type):
+        def decorator(func):
+            self.handlers.append((event_type, func))
+            return func
+        return decorator
+
+
+def _install_host():
+    """
+    未安装 MoviePilot 时注册插件用到的 app.log、app.schemas.types、app.utils.http、app.core.event 和 app.plugins
+    """
+    try:
+        importlib.import_module("app.log")
+        return
+    except ImportError:
+        pass
+    modules = {name: types.ModuleType(name)
+               for name in ("app", "app.log", "app.schemas", "app.schemas.types", "app.utils", "app.utils.http",
+                            "app.core", "app.core.event", "app.plugins")}
+    for name in ("app", "app.schemas", "app.utils", "app.core"):
+        modules[name].__path__ = []
+    modules["app.log"].logger = _Logger()
+    modules["app.schemas.types"].NotificationType = Enum("NotificationType", {
+        "Download": "资源下载",
+        "Organize": "整理入库",
+        "Subscribe": "订阅",
+        "SiteMessage": "站点",
+        "MediaServer": "媒体服务器",
+        "Manual": "手动处理",
+        "Plugin": "插件",
+        "Other": "其它"
+    })
+    modules["app.schemas.types"].EventType = Enum("EventType", {"NoticeMessage": "notice.message"})
+    modules["app.utils.http"].RequestUtils = _RequestUtils
+    modules["app.core.event"].Event = _Event
+    modules["app.core.event"].eventmanager = _EventManager()
+    modules["app.plugins"]._PluginBase = _PluginBase
+    for name, module in modules.items():
+        parent, _, child = name.rpartition(".")
+        if parent:
+            setattr(modules[parent], child, module)
+    sys.modules.update(modules)
+
+
+def load(name: str, plugin: str = BARK) -> types.ModuleType:
+    """
+    导入插件目录中的辅助模块，模块内的相对导入照常生效
+    """
+    _install_host()
+    package = f"_{plugin}"
+    if package not in sys.modules:
+        module = types.ModuleType(package)
+        module.__path__ = [str(PLUGINS / plugin)]
+        sys.modules[package] = module
+    return importlib.import_module(f"{package}.{name}")
+
+
+def load_plugin(plugin: str) -> types.ModuleType:
+    """
+    导入插件本身，未安装 MoviePilot 时使用上面注册的接口，缺少 fastapi 或 requests 时跳过
+    """
+    _install_host()
+    for dependency in ("fastapi", "requests"):
+        pytest.importorskip(dependency)
+    if str(ROOT) not in sys.path:
+        sys.path.insert(0, str(ROOT))
+    return importlib.import_module(f"plugins.{plugin}")
@@ -0,0 +1,94 @@
+import pytest
+
+from plugin_modules import load
+
+breaker = load("breaker")
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(breaker.time, "monotonic", lambda: now[0])
+    return now
+
+
+def _trip(circuit, key="host", count=3):
+    for _ in range(count):
+        assert circuit.allow(key)
+        circuit.record(key, False)
+
+
+def test_opens_after_consecutive_failures(clock):
+    circuit = breaker.CircuitBreaker(threshold=3, reset_timeout=60)
+    _trip(circuit, count=2)
+    assert circuit.states()["host"]["state"] == breaker.STATE_CLOSED
+    _trip(circuit, count=1)
+    assert circuit.is_open("host")
+    assert not circuit.allow("host")
+    with pytest.raises(breaker.CircuitOpenError):
+        circuit.check("host")
+    assert circuit.states()["host"] == {"state": breaker.STATE_OPEN, "failures": 3,
+                                        "rejected": 2, "trips": 1, "retry_in": 60}
+
+
+def test_success_resets_failure_count(clock):
+    circuit = breaker.CircuitBreaker(threshold=2, reset_timeout=60)
+    _trip(circuit, count=1)
+    circuit.record("host", True)
+    _trip(circuit, count=1)
+    assert circuit.states()["host"]["state"] == breaker.STATE_CLOSED
+
+
+def test_half_open_probe_closes_on_success(clock):
+    circuit = breaker.CircuitBreaker(threshold=1, reset_timeout=60)
+    _trip(circuit, count=1)
+    clock[0] += 60
+    assert not circuit.is_open("host")
+    assert circuit.allow("host")
+    # 半开状态只放行一个探测请求
+    assert not circuit.allow("host")
+    circuit.record("host", True)
+    assert circuit.allow("host") and circuit.allow("host")
+
+
+def test_half_open_probe_failure_reopens(clock):
+    circuit = breaker.CircuitBreaker(threshold=5, reset_timeout=60)
+    _trip(circuit, count=5)
+    clock[0] += 60
+    assert circuit.allow("host")
+    circuit.record("host", False)
+    assert circuit.is_open("host")
+    assert circuit.states()["host"]["trips"] == 2
+
+
+def test_lost_probe_result_expires(clock):
+    circuit = breaker.CircuitBreaker(threshold=1, reset_timeout=60)
+    _trip(circuit, count=1)
+    clock[0] += 60
+    assert circuit.allow("host")
+    clock[0] += 59
+    assert not circuit.allow("host")
+    # 探测结果一直没有返回，冷却时间后重新放行探测请求
+    clock[0] += 1
+    assert circuit.allow("host")
+    assert not circuit.allow("host")
+    circuit.record("host", True)
+    assert circuit.states()["host"]["state"] == breaker.STATE_CLOSED
+
+
+def test_hosts_are_independent(clock):
+    circuit = breaker.CircuitBreaker(threshold=1, reset_timeout=60)
+    _trip(circuit, "a", count=1)
+    assert not circuit.allow("a")
+    assert circuit.allow("b")
+    circuit.record("unknown", False)
+    assert "unknown" not in circuit.states()
+
+
+def test_configure_keeps_state(clock):
+    circuit = breaker.CircuitBreaker(threshold=1, reset_timeout=60)
+    _trip(circuit, count=1)
+    circuit.configure(threshold=3, reset_timeout=10)
+    assert circuit.states()["host"]["retry_in"] == 10
+    clock[0] += 10
+    assert circuit.allow("host")
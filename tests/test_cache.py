@@ -0,0 +1,79 @@
+from plugin_modules import load
+
+cache = load("cache")
+
+
+class _Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_content_key_separates_parts():
+    assert cache.content_key("ab", "c") != cache.content_key("a", "bc")
+    assert cache.content_key(None, "x") == cache.content_key("", "x")
+    assert len(cache.content_key("x")) == 16
+
+
+def test_seen_within_ttl(monkeypatch):
+    clock = _Clock()
+    monkeypatch.setattr(cache.time, "monotonic", clock)
+    ttl = cache.TTLCache(maxsize=10, ttl=5)
+    assert not ttl.seen("a")
+    assert ttl.seen("a")
+    clock.now += 5
+    assert not ttl.seen("a")
+    assert ttl.stats()["hits"] == 1
+
+
+def test_lru_eviction(monkeypatch):
+    monkeypatch.setattr(cache.time, "monotonic", _Clock())
+    ttl = cache.TTLCache(maxsize=2, ttl=60)
+    ttl.seen("a")
+    ttl.seen("b")
+    ttl.seen("a")
+    ttl.seen("c")
+    # b 最久未使用，被淘汰
+    assert ttl.seen("a")
+    assert not ttl.seen("b")
+    assert ttl.stats()["evictions"] >= 1
+
+
+def test_expired_keys_are_removed(monkeypatch):
+    clock = _Clock()
+    monkeypatch.setattr(cache.time, "monotonic", clock)
+    ttl = cache.TTLCache(maxsize=100, ttl=1)
+    for key in range(10):
+        ttl.seen(key)
+    clock.now += 2
+    ttl.seen("new")
+    assert ttl.stats()["size"] == 1
+
+
+def test_configure_shrinks_and_keeps_recent_keys(monkeypatch):
+    monkeypatch.setattr(cache.time, "monotonic", _Clock())
+    ttl = cache.TTLCache(maxsize=10, ttl=60)
+    for key in range(5):
+        ttl.seen(key)
+    ttl.configure(maxsize=2, ttl=60)
+    assert ttl.stats()["size"] == 2
+    assert ttl.seen(4)
+    assert not ttl.seen(0)
+
+
+def test_clear():
+    ttl = cache.TTLCache()
+    ttl.seen("a")
+    ttl.clear()
+    assert not ttl.seen("a")
+
+
+def test_forget_allows_key_again():
+    ttl = cache.TTLCache()
+    ttl.seen("a")
+    ttl.forget("a")
+    ttl.forget("missing")
+    assert not ttl.seen("a")
+    assert ttl.seen("a")
@@ -0,0 +1,34 @@
+from plugin_modules import WXPUSHER, load
+
+chunking = load("chunking", plugin=WXPUSHER)
+
+
+def test_small_payload_is_unchanged():
+    payload = {"content": "x", "uids": ["u1"], "topicIds": [1]}
+    assert chunking.split_payload(payload) == [payload]
+
+
+def test_split_by_uid_and_topic_limits():
+    payload = {"content": "x", "uids": [f"u{i}" for i in range(5)], "topicIds": [1, 2, 3]}
+    chunks = chunking.split_payload(payload, max_uids=2, max_topics=2)
+    assert chunks == [
+        {"content": "x", "uids": ["u0", "u1"], "topicIds": [1, 2]},
+        {"content": "x", "uids": ["u2", "u3"], "topicIds": [3]},
+        {"content": "x", "uids": ["u4"]}
+    ]
+    assert payload["uids"] == [f"u{i}" for i in range(5)]
+
+
+def test_invalid_limits_are_clamped():
+    chunks = chunking.split_payload({"uids": ["a", "b"]}, max_uids=0)
+    assert chunks == [{"uids": ["a"]}, {"uids": ["b"]}]
+
+
+def test_merge_report():
+    chunks = [{"uids": ["a", "b"], "topicIds": [1]}, {"uids": ["c"]}, {"topicIds": [2]}]
+    report = chunking.merge_report(chunks, [(True, ""), (False, "限流"), (False, "限流")])
+    assert {key: value for key, value in report.items() if key != "failed"} == {
+        "chunks": 3, "failed_chunks": 2, "uids": 3, "failed_uids": 1,
+        "topics": 2, "failed_topics": 1, "errors": ["限流"]
+    }
+    assert [chunk for chunk, _ in report["failed"]] == chunks[1:]
@@ -0,0 +1,96 @@
+import threading
+import time
+
+from plugin_modules import load
+
+coalesce = load("coalesce")
+
+
+class _Flushes:
+    def __init__(self):
+        self.items = []
+        self.event = threading.Event()
+
+    def __call__(self, key, items):
+        self.items.append((key, items))
+        self.event.set()
+
+    def wait(self, count, timeout=2.0):
+        deadline = time.monotonic() + timeout
+        while len(self.items) < count and time.monotonic() < deadline:
+            time.sleep(0.005)
+        return self.items
+
+
+def test_single_message_digest_is_unchanged():
+    assert coalesce.build_digest([("title", "text")]) == ("title", "text")
+
+
+def test_digest_lists_messages_and_truncates():
+    items = [(f"title {i}", "text") for i in range(12)] + [(None, "x" * 100)]
+    title, text = coalesce.build_digest(items, max_lines=3, line_width=10)
+    assert title == "title 0 等13条消息"
+    assert text.splitlines() == ["• title 0", "• title 1", "• title 2", "…还有 10 条"]
+    _, text = coalesce.build_digest([("a", None), (None, "x" * 100)], line_width=10)
+    assert text.splitlines()[1] == "• xxxxxxxxxx…"
+
+
+def test_burst_for_same_key_is_flushed_once():
+    flushes = _Flushes()
+    coalescer = coalesce.Coalescer(flushes, window=0.05, max_delay=1)
+    coalescer.start()
+    for i in range(3):
+        assert coalescer.add(("admin", None), f"t{i}", "x")
+    coalescer.add(("other", None), "o", "x")
+    items = flushes.wait(2)
+    coalescer.stop()
+    assert sorted(items) == [(("admin", None), [("t0", "x"), ("t1", "x"), ("t2", "x")]),
+                             (("other", None), [("o", "x")])]
+
+
+def test_max_items_flushes_immediately():
+    flushes = _Flushes()
+    coalescer = coalesce.Coalescer(flushes, window=10, max_items=2, max_delay=10)
+    coalescer.start()
+    coalescer.add("key", "a")
+    coalescer.add("key", "b")
+    assert flushes.event.wait(1)
+    assert flushes.items == [("key", [("a",), ("b",)])]
+    coalescer.stop()
+
+
+def test_max_delay_caps_sliding_window():
+    flushes = _Flushes()
+    coalescer = coalesce.Coalescer(flushes, window=0.1, max_items=100, max_delay=0.2)
+    coalescer.start()
+    start = time.monotonic()
+    # 持续到达的消息不断推迟发送时间，但不超过首条消息后的最大延迟
+    while not flushes.event.is_set() and time.monotonic() - start < 1:
+        coalescer.add("key", "x")
+        time.sleep(0.02)
+    elapsed = time.monotonic() - start
+    coalescer.stop()
+    assert flushes.event.is_set()
+    assert elapsed < 0.5
+
+
+def test_stop_flushes_pending_and_rejects_new_messages():
+    flushes = _Flushes()
+    coalescer = coalesce.Coalescer(flushes, window=60, max_delay=60)
+    coalescer.start()
+    coalescer.add("key", "a")
+    coalescer.stop()
+    assert flushes.items == [("key", [("a",)])]
+    assert not coalescer.add("key", "b")
+
+
+def test_configure_applies_new_max_items_to_waiting_messages():
+    flushes = _Flushes()
+    coalescer = coalesce.Coalescer(flushes, window=60, max_items=10, max_delay=60)
+    coalescer.start()
+    coalescer.add("key", "a")
+    coalescer.add("key", "b")
+    coalescer.configure(window=60, max_items=2, max_delay=60)
+    assert flushes.event.wait(1)
+    coalescer.stop()
+    assert coalescer.stats()["flushed"] == 1
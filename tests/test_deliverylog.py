@@ -0,0 +1,45 @@
+import logging
+
+from plugin_modules import load
+
+deliverylog = load("deliverylog")
+
+
+def test_preview():
+    assert deliverylog.preview(None, 10) == ""
+    assert deliverylog.preview("短消息", 10) == "短消息"
+    assert deliverylog.preview("一二三四五", 2) == "一二…(+3)"
+
+
+def test_zero_limit_hides_content():
+    hidden = deliverylog.preview("密码是 123456", 0)
+    assert "123456" not in hidden
+    assert hidden.startswith("<10字 ")
+    assert hidden == deliverylog.preview("密码是 123456", 0)
+
+
+def test_structured_line_hides_body(caplog):
+    log = deliverylog.DeliveryLog("bark", mode=deliverylog.LOG_STRUCTURED, sample_rate=100, body_limit=0)
+    with caplog.at_level(logging.INFO):
+        log.delivery("标题", "秘密内容", "admin", 2, [("bob", "timeout")], 0.1234)
+    line = caplog.records[-1].getMessage()
+    assert "秘密内容" not in line and "标题" not in line
+    assert "provider=bark event=delivery to=admin total=2 ok=1 failed=1 ms=123 errors=bob:timeout" in line
+
+
+def test_zero_sample_rate_logs_only_failures(caplog):
+    log = deliverylog.DeliveryLog("bark", mode=deliverylog.LOG_STRUCTURED, sample_rate=0)
+    with caplog.at_level(logging.INFO):
+        for _ in range(20):
+            log.delivery("t", "x", "admin", 1, [], 0.01)
+        assert not caplog.records
+        log.delivery("t", "x", "admin", 1, [("admin", "500")], 0.01)
+    assert len(caplog.records) == 1
+
+
+def test_verbose_mode_keeps_details(caplog):
+    log = deliverylog.DeliveryLog("bark")
+    with caplog.at_level(logging.INFO):
+        log.detail("info", "发送给 %s", "admin")
+        log.delivery("t", "x", "admin", 1, [("admin", "500")], 0.01)
+    assert [record.getMessage() for record in caplog.records] == ["发送给 admin"]
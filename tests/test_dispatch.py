@@ -0,0 +1,169 @@
+import threading
+import time
+
+from plugin_modules import load
+
+dispatch = load("dispatch")
+DispatchQueue = dispatch.DispatchQueue
+
+
+def _wait(predicate, timeout=2.0):
+    deadline = time.monotonic() + timeout
+    while not predicate():
+        if time.monotonic() > deadline:
+            return False
+        time.sleep(0.005)
+    return True
+
+
+def test_messages_are_handled_in_background():
+    handled = []
+    queue = DispatchQueue(lambda *args, **kwargs: handled.append((args, kwargs)), workers=1)
+    queue.start()
+    assert queue.put("title", "text", user="admin")
+    assert _wait(lambda: len(handled) == 1)
+    assert handled == [(("title", "text"), {"user": "admin"})]
+    queue.stop()
+    assert queue.stats()["processed"] == 1
+
+
+def test_handler_errors_are_counted_and_worker_survives():
+    calls = []
+
+    def handler(value):
+        calls.append(value)
+        if value == "bad":
+            raise ValueError(value)
+
+    queue = DispatchQueue(handler, workers=1)
+    queue.start()
+    queue.put("bad")
+    queue.put("good")
+    assert _wait(lambda: len(calls) == 2)
+    queue.stop()
+    assert queue.stats()["failed"] == 1
+
+
+def test_drop_newest_when_full():
+    queue = DispatchQueue(lambda value: None, maxsize=2, overflow=dispatch.OVERFLOW_DROP_NEWEST)
+    assert queue.put(1) and queue.put(2)
+    assert not queue.put(3)
+    assert [args for args, _ in queue.stop(timeout=0)] == [(1,), (2,)]
+
+
+def test_drop_oldest_when_full():
+    queue = DispatchQueue(lambda value: None, maxsize=2, overflow=dispatch.OVERFLOW_DROP_OLDEST)
+    for value in (1, 2, 3):
+        assert queue.put(value)
+    assert [args for args, _ in queue.stop(timeout=0)] == [(2,), (3,)]
+    assert queue.stats()["dropped"] == 3
+
+
+def test_block_times_out_when_full():
+    queue = DispatchQueue(lambda value: None, maxsize=1, overflow=dispatch.OVERFLOW_BLOCK, block_timeout=0.05)
+    assert queue.put(1)
+    start = time.monotonic()
+    assert not queue.put(2)
+    assert time.monotonic() - start >= 0.05
+
+
+def test_block_waits_for_room():
+    release = threading.Event()
+    queue = DispatchQueue(lambda value: release.wait(), workers=1, maxsize=1,
+                          overflow=dispatch.OVERFLOW_BLOCK, block_timeout=2)
+    queue.start()
+    queue.put(1)
+    assert _wait(lambda: queue.stats()["busy"] == 1)
+    queue.put(2)
+    threading.Timer(0.05, release.set).start()
+    assert queue.put(3)
+    queue.stop()
+
+
+def test_stop_returns_unsent_messages_and_rejects_new_ones():
+    release = threading.Event()
+    queue = DispatchQueue(lambda value: release.wait(), workers=1)
+    queue.start()
+    for value in range(3):
+        queue.put(value)
+    assert _wait(lambda: queue.stats()["busy"] == 1)
+    remaining = queue.stop(timeout=0.05)
+    release.set()
+    assert [args for args, _ in remaining] == [(1,), (2,)]
+    assert not queue.put(4)
+
+
+def test_configure_changes_worker_count_and_keeps_messages():
+    release = threading.Event()
+    handled = []
+
+    def handler(value):
+        release.wait()
+        handled.append(value)
+
+    queue = DispatchQueue(handler, workers=1, maxsize=10)
+    queue.start()
+    for value in range(4):
+        queue.put(value)
+    queue.configure(workers=3, maxsize=2, overflow=dispatch.OVERFLOW_DROP_NEWEST, block_timeout=1)
+    assert _wait(lambda: queue.stats()["busy"] == 3)
+    # 容量调小时已入队的消息不丢弃
+    assert queue.stats()["dropped"] == 0
+    queue.configure(workers=1, maxsize=10, overflow=dispatch.OVERFLOW_DROP_NEWEST, block_timeout=1)
+    release.set()
+    assert _wait(lambda: len(handled) == 4)
+    assert _wait(lambda: len([thread for thread in queue._threads if thread.is_alive()]) == 1)
+    queue.stop()
+
+
+def _drain(queue):
+    order = []
+    with queue._cond:
+        while queue._size:
+            order.append(queue._next()[1][0])
+    return order
+
+
+def test_lanes_share_by_weight():
+    queue = DispatchQueue(lambda value: None, maxsize=100)
+    for _ in range(12):
+        queue.put("high", priority=dispatch.PRIORITY_HIGH)
+        queue.put("normal", priority=dispatch.PRIORITY_NORMAL)
+        queue.put("bulk", priority=dispatch.PRIORITY_BULK)
+    first = _drain(queue)[:12]
+    # 权重 8:3:1，每 12 条中高优先级 8 条，低优先级通道也能分到份额
+    assert first.count("high") == 8
+    assert first.count("normal") == 3
+    assert first.count("bulk") == 1
+
+
+def test_smooth_weighted_round_robin_interleaves():
+    queue = DispatchQueue(lambda value: None, maxsize=100)
+    for _ in range(12):
+        queue.put("high", priority=dispatch.PRIORITY_HIGH)
+        queue.put("normal", priority=dispatch.PRIORITY_NORMAL)
+    order = _drain(queue)
+    # 平滑轮询不会连续取完高优先级通道再取普通通道
+    assert order[:11].count("normal") == 3
+    assert "normal" in order[:4]
+
+
+def test_single_lane_is_fifo():
+    queue = DispatchQueue(lambda value: None)
+    for value in range(5):
+        queue.put(value, priority=dispatch.PRIORITY_BULK)
+    assert _drain(queue) == [0, 1, 2, 3, 4]
+
+
+def test_unknown_priority_goes_to_normal_lane():
+    queue = DispatchQueue(lambda value: None)
+    queue.put("x", priority=42)
+    assert queue.stats()["lanes"][dispatch.PRIORITY_NORMAL] == 1
+
+
+def test_drop_oldest_drops_from_lowest_priority_lane():
+    queue = DispatchQueue(lambda value: None, maxsize=2, overflow=dispatch.OVERFLOW_DROP_OLDEST)
+    queue.put("bulk", priority=dispatch.PRIORITY_BULK)
+    queue.put("high", priority=dispatch.PRIORITY_HIGH)
+    queue.put("normal", priority=dispatch.PRIORITY_NORMAL)
+    assert sorted(_drain(queue)) == ["high", "normal"]
@@ -0,0 +1,95 @@
+import pytest
+
+from plugin_modules import load
+
+history = load("history")
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(history.time, "time", lambda: now[0])
+    return now
+
+
+def _fill(store, clock, count, user="admin"):
+    for i in range(count):
+        clock[0] += 1
+        store.add(user, f"d{i}", i % 2 == 0, title=f"t{i}", code=200, message_id=f"m{i}")
+
+
+def test_parse_time():
+    assert history.parse_time(None) is None
+    assert history.parse_time("1700000000") == 1700000000
+    assert history.parse_time("2024-01-02") == history.parse_time("2024-01-02 00:00:00")
+    with pytest.raises(ValueError):
+        history.parse_time("yesterday")
+
+
+def test_query_by_user_digest_time_and_keyword(clock):
+    store = history.DeliveryHistory(size=100)
+    _fill(store, clock, 5)
+    store.add("bob", "d1", False, title="t1", code=400, error="bad key")
+    assert [r["title"] for r in store.query(user="admin", limit=2)] == ["t4", "t3"]
+    assert [r["user"] for r in store.query(digest="d1")] == ["bob", "admin"]
+    assert [r["title"] for r in store.query(since=1002, until=1004)] == ["t3", "t2", "t1"]
+    assert store.query(user="bob")[0]["error"] == "bad key"
+    assert [r["title"] for r in store.query(keyword="t4")] == ["t4"]
+
+
+def test_ring_evicts_oldest_and_indexes(clock):
+    store = history.DeliveryHistory(size=3)
+    _fill(store, clock, 5)
+    assert [r["title"] for r in store.query()] == ["t4", "t3", "t2"]
+    assert store.query(digest="d0") == []
+    assert store.lookup(["m0", "m4"]) == {"m0": None, "m4": store.query(limit=1)[0]}
+    assert store.stats()["memory"] == 3
+
+
+def test_lookup_keeps_code_and_message_id(clock):
+    store = history.DeliveryHistory()
+    store.add("admin", "d", False, target="UID_1", code=1001, message_id=42, error="失败")
+    record = store.lookup([42, "missing"])
+    assert record["missing"] is None
+    assert record["42"]["code"] == 1001
+    assert record["42"]["target"] == "UID_1"
+
+
+def test_evicted_records_spill_to_disk(tmp_path, clock):
+    store = history.DeliveryHistory(size=2, path=tmp_path / "history.db")
+    _fill(store, clock, 5)
+    # 内存中只有最近两条，更早的从磁盘补齐
+    assert [r["title"] for r in store.query(user="admin")] == ["t4", "t3", "t2", "t1", "t0"]
+    assert store.lookup(["m0"])["m0"]["code"] == "200"
+    store.close()
+    reopened = history.DeliveryHistory(size=2, path=tmp_path / "history.db")
+    assert len(reopened.query(user="admin")) == 5
+    reopened.close()
+
+
+def test_disk_records_expire(tmp_path, clock):
+    store = history.DeliveryHistory(size=1, path=tmp_path / "history.db", retention_days=1)
+    _fill(store, clock, 3)
+    store.flush()
+    clock[0] += 86400 + history.PURGE_INTERVAL
+    store.flush()
+    assert store.stats()["disk"] == 0
+    store.close()
+
+
+def test_configure_and_handover(tmp_path, clock):
+    store = history.DeliveryHistory(size=5)
+    _fill(store, clock, 5)
+    store.configure(size=2, retention_days=7)
+    assert [r["title"] for r in store.query()] == ["t4", "t3"]
+    persistent = history.DeliveryHistory(size=10, path=tmp_path / "history.db")
+    store.handover(persistent)
+    assert store.query() == []
+    assert [r["title"] for r in persistent.query()] == ["t4", "t3"]
+    persistent.close()
+
+
+def test_long_titles_are_truncated():
+    store = history.DeliveryHistory()
+    store.add("admin", "d", True, title="x" * 100)
+    assert len(store.query()[0]["title"]) == history.TITLE_LIMIT
@@ -0,0 +1,64 @@
+from plugin_modules import load
+
+metrics = load("metrics")
+
+
+def test_counter_render():
+    registry = metrics.MetricsRegistry("bark")
+    sends = registry.counter("sends_total", "发送数", ("user", "result"))
+    sends.inc("admin", "success")
+    sends.inc("admin", "success", value=2)
+    sends.inc('a"b\n', None)
+    assert registry.render().splitlines() == [
+        "# HELP bark_sends_total 发送数",
+        "# TYPE bark_sends_total counter",
+        'bark_sends_total{user="admin",result="success"} 3',
+        'bark_sends_total{user="a\\"b\\n",result=""} 1'
+    ]
+    assert registry.get("sends_total") is sends
+
+
+def test_histogram_buckets_are_cumulative():
+    registry = metrics.MetricsRegistry("bark")
+    latency = registry.histogram("seconds", "耗时", buckets=(0.1, 1))
+    for value in (0.05, 0.1, 0.5, 3):
+        latency.observe(value)
+    assert latency.render()[2:] == [
+        'bark_seconds_bucket{le="0.1"} 2',
+        'bark_seconds_bucket{le="1"} 3',
+        'bark_seconds_bucket{le="+Inf"} 4',
+        "bark_seconds_sum 3.65",
+        "bark_seconds_count 4"
+    ]
+
+
+def test_gauge_reads_callback():
+    registry = metrics.MetricsRegistry("bark")
+    registry.gauge("queue", "队列长度", lambda: 5)
+    registry.gauge("breaker", "熔断", lambda: {("a",): 1, ("b",): 0.5}, ("host",))
+    lines = registry.render().splitlines()
+    assert "bark_queue 5" in lines
+    assert 'bark_breaker{host="a"} 1' in lines
+    assert 'bark_breaker{host="b"} 0.5' in lines
+
+
+def test_series_overflow_into_other(monkeypatch):
+    monkeypatch.setattr(metrics, "MAX_SERIES", 2)
+    counter = metrics.MetricsRegistry("bark").counter("sends_total", "发送数", ("user",))
+    for user in ("a", "b", "c", "d", "a"):
+        counter.inc(user)
+    assert counter.render()[2:] == ['bark_sends_total{user="a"} 2', 'bark_sends_total{user="b"} 1',
+                                    'bark_sends_total{user="other"} 2']
+
+
+def test_delivery_metrics():
+    registry = metrics.DeliveryMetrics("wxpusher")
+    registry.sends.inc("wxpusher", "admin", "failure")
+    registry.errors.inc("wxpusher", "1001")
+    registry.retries.inc("wxpusher", "outbox")
+    registry.latency.observe(0.2, "wxpusher")
+    text = registry.render()
+    assert 'wxpusher_provider_errors_total{provider="wxpusher",code="1001"} 1' in text
+    assert 'wxpusher_request_duration_seconds_count{provider="wxpusher"} 1' in text
+    assert text.endswith("\n")
+    assert metrics.CONTENT_TYPE.startswith("text/plain; version=0.0.4")
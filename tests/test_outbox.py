@@ -0,0 +1,123 @@
+import threading
+
+import pytest
+
+from plugin_modules import load
+
+outbox = load("outbox")
+
+
+class _Deliveries:
+    def __init__(self, *results):
+        self.results = list(results)
+        self.payloads = []
+
+    def __call__(self, payload):
+        self.payloads.append(payload)
+        result = self.results.pop(0) if self.results else True
+        if isinstance(result, Exception):
+            raise result
+        return result
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(outbox.time, "time", lambda: now[0])
+    monkeypatch.setattr(outbox.random, "uniform", lambda low, high: high)
+    return now
+
+
+def _outbox(tmp_path, deliver, **kwargs):
+    box = outbox.Outbox(tmp_path / "outbox.db", deliver, **kwargs)
+    # 不启动后台线程，由测试直接驱动重试
+    box._thread = threading.Thread(target=lambda: None)
+    box._thread.start()
+    return box
+
+
+def test_backoff_grows_exponentially_with_cap(tmp_path, monkeypatch):
+    box = outbox.Outbox(tmp_path / "outbox.db", lambda payload: True, base_delay=30, max_delay=100)
+    monkeypatch.setattr(outbox.random, "uniform", lambda low, high: high)
+    assert [box.backoff(n) for n in (1, 2, 3, 4)] == [30, 60, 100, 100]
+    monkeypatch.setattr(outbox.random, "uniform", lambda low, high: low)
+    assert box.backoff(1) == 15
+    box.stop()
+
+
+def test_due_message_is_delivered_and_removed(tmp_path, clock):
+    deliver = _Deliveries(True)
+    box = _outbox(tmp_path, deliver)
+    box.add({"text": "hello"}, recipient="admin", title="t", attempts=0)
+    box._retry_due()
+    assert deliver.payloads == [{"text": "hello"}]
+    assert box.stats() == {"pending": 0, "dead": 0}
+    box.stop()
+
+
+def test_failed_message_waits_for_backoff(tmp_path, clock):
+    deliver = _Deliveries(False, True)
+    box = _outbox(tmp_path, deliver, base_delay=30)
+    box.add({"text": "hello"}, error="timeout")
+    box._retry_due()
+    assert deliver.payloads == []
+    clock[0] += 30
+    box._retry_due()
+    assert box.items()[0]["attempts"] == 2
+    clock[0] += 59
+    box._retry_due()
+    assert len(deliver.payloads) == 1
+    clock[0] += 1
+    box._retry_due()
+    assert box.stats() == {"pending": 0, "dead": 0}
+    box.stop()
+
+
+def test_exhausted_message_becomes_dead_letter(tmp_path, clock):
+    deliver = _Deliveries(False, ValueError("boom"))
+    box = _outbox(tmp_path, deliver, max_attempts=3, base_delay=1)
+    box.add({"text": "hello"}, error="first")
+    for _ in range(2):
+        clock[0] += 10
+        box._retry_due()
+    assert box.stats() == {"pending": 0, "dead": 1}
+    dead = box.items(dead=True)[0]
+    assert dead["attempts"] == 3
+    assert dead["last_error"] == "boom"
+    box.stop()
+
+
+def test_messages_survive_restart(tmp_path, clock):
+    box = _outbox(tmp_path, _Deliveries())
+    box.add({"text": "hello"}, attempts=0)
+    box.stop()
+    deliver = _Deliveries(True)
+    box = _outbox(tmp_path, deliver)
+    assert box.stats()["pending"] == 1
+    box._retry_due()
+    assert deliver.payloads == [{"text": "hello"}]
+    box.stop()
+
+
+def test_compact_drops_old_dead_letters(tmp_path, clock, monkeypatch):
+    monkeypatch.setattr(outbox, "DEAD_MAX", 2)
+    box = _outbox(tmp_path, _Deliveries(*[False] * 3), max_attempts=1)
+    for i in range(3):
+        box.add({"n": i}, attempts=0)
+    box._retry_due()
+    assert box.stats()["dead"] == 3
+    box.compact()
+    assert [item["id"] for item in box.items(dead=True)] == [3, 2]
+    clock[0] += outbox.DEAD_RETENTION + 1
+    box.compact()
+    assert box.stats()["dead"] == 0
+    box.stop()
+
+
+def test_background_thread_retries(tmp_path):
+    delivered = threading.Event()
+    box = outbox.Outbox(tmp_path / "outbox.db", lambda payload: delivered.set() or True)
+    box.start()
+    box.add({"text": "hello"}, attempts=0)
+    assert delivered.wait(2)
+    box.stop()
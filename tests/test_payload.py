@@ -0,0 +1,34 @@
+import json
+from urllib.parse import parse_qsl
+
+from plugin_modules import load
+
+payload = load("payload")
+
+
+def test_form_body_matches_requests_encoding():
+    body = payload.FormBody({"title": "标题", "body": "a&b=c", "device_key": "old", "icon": None},
+                            exclude=["device_key"])
+    encoded = body.encode(device_key="key1")
+    assert encoded.startswith(b"device_key=key1&")
+    assert parse_qsl(encoded.decode()) == [("device_key", "key1"), ("title", "标题"), ("body", "a&b=c")]
+
+
+def test_form_body_without_shared_or_recipient_fields():
+    assert payload.FormBody({}).encode(device_key="k") == b"device_key=k"
+    assert payload.FormBody({"a": 1}).encode(device_key=None) == b"a=1"
+    assert payload.FormBody({}).encode() == b""
+
+
+def test_json_body_appends_recipient_fields():
+    body = payload.JsonBody({"content": "中文", "appToken": "AT", "uids": ["old"]}, exclude=["uids"])
+    encoded = body.encode(uids=["u1", "u2"], topicIds=[1])
+    assert json.loads(encoded) == {"content": "中文", "appToken": "AT", "uids": ["u1", "u2"], "topicIds": [1]}
+    assert "中文".encode() in encoded
+    assert json.loads(body.encode()) == {"content": "中文", "appToken": "AT"}
+
+
+def test_json_body_without_shared_fields():
+    body = payload.JsonBody({"uids": ["x"]}, exclude=["uids"])
+    assert body.encode() == b"{}"
+    assert json.loads(body.encode(uids=["u1"])) == {"uids": ["u1"]}
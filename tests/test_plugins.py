@@ -0,0 +1,310 @@
+"""
+插件级测试，未安装 MoviePilot 时使用 plugin_modules 注册的接口。
+"""
+import time
+from concurrent.futures import Future
+from types import SimpleNamespace
+
+import pytest
+
+from plugin_modules import BARK, WXPUSHER, load_plugin
+
+CONFIGS = {
+    BARK: ("BarkMultiUserMsg", {"enabled": True, "server": "http://127.0.0.1:9", "apikey": "admin:key1"}),
+    WXPUSHER: ("WxPusherMultUserMsg", {"enabled": True, "appToken": "AT_x", "uids": "admin:UID_1"})
+}
+
+# 接口返回成功时的响应
+SUCCESS = {
+    BARK: {"code": 200, "message": "success"},
+    WXPUSHER: {"code": 1000, "msg": "处理成功", "data": []}
+}
+
+
+@pytest.fixture(params=sorted(CONFIGS))
+def plugin(request, tmp_path):
+    name, config = CONFIGS[request.param]
+    module = load_plugin(request.param)
+    instance = getattr(module, name)()
+    instance.get_data_path = lambda: tmp_path
+    instance.update_config = lambda *args, **kwargs: None
+    instance.base_config = config
+    instance.module = module
+    instance.success = SUCCESS[request.param]
+    yield instance
+    instance.stop_service()
+
+
+class _Response:
+    """
+    只包含插件用到的属性的响应
+    """
+    reason = "OK"
+    headers = {}
+    elapsed = 0.01
+
+    def __init__(self, body, status_code=200):
+        self._body = body
+        self.status_code = status_code
+
+    def json(self):
+        return self._body
+
+
+def _wait(predicate, timeout=2.0):
+    deadline = time.monotonic() + timeout
+    while not predicate():
+        if time.monotonic() > deadline:
+            return False
+        time.sleep(0.005)
+    return True
+
+
+def test_notice_event_is_sent_through_queue(plugin, monkeypatch):
+    module = plugin.module
+    plugin.init_plugin({**plugin.base_config, "async_send": True})
+    posts = []
+
+    def post(url, content_type=None, data=None):
+        posts.append(data)
+        return _Response(plugin.success)
+
+    monkeypatch.setattr(plugin._pool, "post", post)
+    plugin.send(module.Event(module.EventType.NoticeMessage, {"title": "标题", "text": "内容"}))
+    # 事件处理函数入队后立即返回，由后台线程发送
+    assert _wait(lambda: posts)
+    assert _wait(lambda: plugin._queue.stats()["processed"] == 1)
+    assert len(posts) == 1
+    assert plugin._queue.stats()["failed"] == 0
+
+
+@pytest.mark.parametrize("delivered", [False, True])
+def test_failed_send_does_not_suppress_resend(plugin, monkeypatch, delivered):
+    module = plugin.module
+    plugin.init_plugin({**plugin.base_config, "async_send": False, "dedup": True, "outbox": False})
+    # WxPusher 分片失败时不重试
+    plugin.chunk_retries = 0
+    posts = []
+
+    def post(url, content_type=None, data=None):
+        posts.append(data)
+        return _Response(plugin.success) if delivered else _Response({}, status_code=503)
+
+    monkeypatch.setattr(plugin._pool, "post", post)
+    event = module.Event(module.EventType.NoticeMessage, {"title": "标题", "text": "内容", "username": "admin"})
+    plugin.send(event)
+    sent = len(posts)
+    assert sent
+    plugin.send(event)
+    # 送达后重复消息被忽略；未开启发件箱时发送失败的消息重新发送不被当作重复
+    assert len(posts) == (sent if delivered else sent * 2)
+
+
+def test_log_settings_accept_zero(plugin):
+    plugin.init_plugin({**plugin.base_config, "log_mode": "structured", "log_sample_rate": 0, "log_body_limit": 0})
+    assert plugin._log_sample_rate == 0
+    assert plugin._log_body_limit == 0
+
+
+def test_log_settings_are_clamped(plugin):
+    plugin.init_plugin({**plugin.base_config, "log_sample_rate": 150, "log_body_limit": -5})
+    assert plugin._log_sample_rate == 100
+    assert plugin._log_body_limit == 0
+    plugin.init_plugin({**plugin.base_config, "log_sample_rate": "", "log_body_limit": None})
+    assert plugin._log_sample_rate == 10
+    assert plugin._log_body_limit == 50
+
+
+# 会启动后台线程的组件
+THREADED = ("_queue", "_outbox", "_scheduler", "_executor", "_coalescer", "_servers")
+
+
+@pytest.mark.parametrize("empty", [None, {}])
+def test_empty_config_starts_no_threads(plugin, empty):
+    plugin.init_plugin(empty)
+    assert all(getattr(plugin, name, None) is None for name in THREADED)
+
+
+def test_disabled_plugin_starts_no_threads(plugin):
+    plugin.init_plugin({**plugin.base_config, "enabled": False, "async_send": True, "outbox": True,
+                        "quiet_hours": "22:00-07:00"})
+    assert all(getattr(plugin, name, None) is None for name in THREADED)
+
+
+def test_disabling_stops_started_components(plugin):
+    plugin.init_plugin({**plugin.base_config, "async_send": True})
+    assert plugin._queue is not None
+    plugin.init_plugin({**plugin.base_config, "enabled": False})
+    assert all(getattr(plugin, name, None) is None for name in THREADED)
+
+
+def test_clearing_quiet_hours_stops_scheduler(plugin):
+    plugin.init_plugin({**plugin.base_config, "quiet_hours": "22:00-07:00"})
+    assert plugin._scheduler is not None
+    plugin.init_plugin({**plugin.base_config, "quiet_hours": ""})
+    assert plugin._scheduler is None
+
+
+def test_instances_do_not_share_routes(plugin):
+    other = type(plugin)()
+    other.get_data_path = plugin.get_data_path
+    other.update_config = plugin.update_config
+    assert other._routes is None
+    plugin.init_plugin(plugin.base_config)
+    assert other._routes is None
+    other.init_plugin(plugin.base_config)
+    assert other._routes is not plugin._routes
+    other.stop_service()
+
+
+@pytest.fixture
+def bark(tmp_path):
+    pytest.importorskip("httpx")
+    module = load_plugin(BARK)
+    name, config = CONFIGS[BARK]
+    instance = getattr(module, name)()
+    instance.get_data_path = lambda: tmp_path
+    instance.update_config = lambda *args, **kwargs: None
+    instance.init_plugin({**config, "transport": "async", "timeout": 1, "breaker": True, "breaker_threshold": 1})
+    yield module, instance
+    instance.stop_service()
+
+
+def _half_open(plugin, host):
+    """
+    打开熔断后立即进入半开状态，下一次请求即为探测请求
+    """
+    plugin._breaker.allow(host)
+    plugin._breaker.record(host, False)
+    plugin._breaker.configure(threshold=1, reset_timeout=0)
+
+
+@pytest.mark.parametrize("outcome", ["timeout", "error"])
+def test_async_probe_without_response_reopens_circuit(bark, monkeypatch, outcome):
+    module, plugin = bark
+    host = "127.0.0.1:9"
+    _half_open(plugin, host)
+
+    def submit(*args, **kwargs):
+        future = Future()
+        if outcome == "error":
+            future.set_exception(RuntimeError("event loop closed"))
+        return future
+
+    monkeypatch.setattr(plugin._pool, "submit", submit)
+    results = plugin._broadcast(module.FormBody({"title": "t", "body": "b"}), {"admin": "key1"})
+    assert not results["admin"][0]
+    # 探测请求没有返回结果时按失败记录，熔断器重新打开而不是一直停在半开状态
+    state = plugin._breaker.states()[host]
+    assert state["state"] == "open"
+    assert state["trips"] == 2
+
+
+def test_sequential_broadcast_stops_at_deadline(tmp_path, monkeypatch):
+    module = load_plugin(BARK)
+    name, config = CONFIGS[BARK]
+    plugin = getattr(module, name)()
+    plugin.get_data_path = lambda: tmp_path
+    plugin.update_config = lambda *args, **kwargs: None
+    plugin.init_plugin({**config, "concurrency": 1, "timeout": 10})
+    assert plugin._executor is None
+    now = [0.0]
+    pushed = []
+
+    def push(user_id, device_key, body):
+        # 每个请求耗时 6 秒
+        pushed.append(user_id)
+        now[0] += 6
+        return module.PushResult(True, "success")
+
+    monkeypatch.setattr(module, "time", SimpleNamespace(monotonic=lambda: now[0]))
+    monkeypatch.setattr(plugin, "_push", push)
+    results = plugin._broadcast(module.FormBody({"title": "t", "body": "b"}), {"a": "k1", "b": "k2", "c": "k3"})
+    # 第三个用户开始前已超过截止时间，不再发送
+    assert pushed == ["a", "b"]
+    assert results["c"] == module.PushResult(False, "发送超时")
+    plugin.stop_service()
+
+
+@pytest.mark.parametrize("batch", [False, True])
+def test_bark_history_keeps_provider_code_and_id(tmp_path, monkeypatch, batch):
+    name, config = CONFIGS[BARK]
+    plugin = getattr(load_plugin(BARK), name)()
+    plugin.get_data_path = lambda: tmp_path
+    plugin.update_config = lambda *args, **kwargs: None
+    plugin.init_plugin({**config, "apikey": "admin:key1\nbob:key2", "params": "id=notice-1", "async_send": False,
+                        "batch": batch, "outbox": False})
+    replies = {"key1": {"code": 200, "message": "success"},
+               "key2": {"code": 400, "message": "failed to get device token"}}
+
+    def post(url, content_type=None, data=None):
+        if content_type == "application/json":
+            # 批量推送只有 key1 成功，bob 改为逐个发送
+            return _Response({"code": 200, "message": "success",
+                              "data": [{"device_key": "key1", **replies["key1"]}]})
+        key = "key1" if b"key1" in data else "key2"
+        return _Response(replies[key])
+
+    monkeypatch.setattr(plugin._pool, "post", post)
+    plugin._send("title", "text", ["admin", "bob"])
+    records = {record["user"]: record for record in plugin._history.query()}
+    assert (records["admin"]["ok"], records["admin"]["code"]) == (True, 200)
+    # 服务端未返回消息ID时每次投递各自生成，不使用附加参数中的 id
+    assert records["admin"]["message_id"] and records["bob"]["message_id"]
+    assert "notice-1" not in (records["admin"]["message_id"], records["bob"]["message_id"])
+    assert records["admin"]["message_id"] != records["bob"]["message_id"]
+    assert (records["bob"]["ok"], records["bob"]["code"]) == (False, 400)
+    assert records["bob"]["error"] == "failed to get device token"
+    plugin.stop_service()
+
+
+@pytest.mark.parametrize("status, backoff", [(400, False), (503, True)])
+def test_bark_invalid_device_does_not_slow_down_server(tmp_path, monkeypatch, status, backoff):
+    name, config = CONFIGS[BARK]
+    plugin = getattr(load_plugin(BARK), name)()
+    plugin.get_data_path = lambda: tmp_path
+    plugin.update_config = lambda *args, **kwargs: None
+    users = {f"user{index}": f"key{index}" for index in range(10)}
+    plugin.init_plugin({**config, "apikey": "\n".join(f"{user}:{key}" for user, key in users.items()),
+                        "async_send": False, "outbox": False, "rate_limit": True, "rate": 6000, "burst": 100})
+
+    def post(url, content_type=None, data=None):
+        if b"key3" not in data:
+            return _Response({"code": 200, "message": "success"})
+        # 只有一个设备密钥无效，或服务端出错
+        if status == 400:
+            return _Response({"code": 400, "message": "failed to get device token"}, status_code=400)
+        return _Response({}, status_code=status)
+
+    feedback = []
+    monkeypatch.setattr(plugin._pool, "post", post)
+    monkeypatch.setattr(plugin._limiter, "feedback", lambda provider, ok: feedback.append(ok))
+    plugin._send("title", "text", list(users))
+    # 其余设备成功时恢复速率，无效设备不降速，服务端出错时降速
+    assert feedback.count(True) == 9
+    assert feedback.count(False) == (1 if backoff else 0)
+    plugin.stop_service()
+
+
+@pytest.mark.parametrize("username", ["team", "empty", "carol", ["carol"], ["carol", "dave"]])
+def test_bark_unknown_recipients_are_not_broadcast(tmp_path, monkeypatch, username):
+    module = load_plugin(BARK)
+    name, config = CONFIGS[BARK]
+    plugin = getattr(module, name)()
+    plugin.get_data_path = lambda: tmp_path
+    plugin.update_config = lambda *args, **kwargs: None
+    plugin.init_plugin({**config, "apikey": "admin:key1\nbob:key2", "groups": "team:carol\nempty:",
+                        "async_send": False, "outbox": False})
+    posts = []
+
+    def post(url, content_type=None, data=None):
+        posts.append(data)
+        return _Response({"code": 200, "message": "success"})
+
+    monkeypatch.setattr(plugin._pool, "post", post)
+    plugin.send(module.Event(module.EventType.NoticeMessage, {"title": "标题", "text": "内容", "username": username}))
+    # 指定的用户都未配置密钥时不发送，只有未指定用户时才发送给所有人
+    assert posts == []
+    plugin.send(module.Event(module.EventType.NoticeMessage, {"title": "标题", "text": "内容"}))
+    assert len(posts) == 1
+    plugin.stop_service()
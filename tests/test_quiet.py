@@ -0,0 +1,152 @@
+import time
+from datetime import datetime
+
+import pytest
+
+from plugin_modules import load
+
+quiet = load("quiet")
+
+
+def _at(hour, minute=0):
+    return datetime(2026, 3, 10, hour, minute).timestamp()
+
+
+def test_window_wraps_midnight():
+    hours = quiet.parse_quiet_hours("22:00-07:00")
+    assert hours.active(_at(23, 30))
+    assert hours.active(_at(3))
+    assert not hours.active(_at(7))
+    assert not hours.active(_at(12))
+    # 跨午夜的时段在次日结束
+    assert hours.until("anyone", _at(23, 30)) == datetime(2026, 3, 11, 7).timestamp()
+    assert hours.until("anyone", _at(3)) == _at(7)
+
+
+def test_user_window_overrides_default():
+    hours = quiet.parse_quiet_hours("22:00-07:00\nadmin:12:00-13:00")
+    assert hours.until("admin", _at(23)) is None
+    assert hours.until("admin", _at(12, 30)) == _at(13)
+    assert hours.until("other", _at(23)) is not None
+    assert hours.until(None, _at(12, 30)) is None
+
+
+def test_group_expands_to_members():
+    hours = quiet.parse_quiet_hours("family:20:00-21:00\nbob:08:00-09:00",
+                                    groups={"family": ("alice", "bob")})
+    assert hours.until("alice", _at(20, 30)) == _at(21)
+    # 后面的行覆盖前面的
+    assert hours.until("bob", _at(20, 30)) is None
+    assert hours.until("bob", _at(8, 30)) == _at(9)
+    assert hours.until("family", _at(20, 30)) is None
+
+
+@pytest.mark.parametrize("line", ["22:00", "25:00-07:00", "22:60-07:00", "08:00-08:00", "24:30-07:00"])
+def test_invalid_windows_are_ignored(line):
+    assert not quiet.parse_quiet_hours(line)
+
+
+def test_window_may_end_at_midnight():
+    hours = quiet.parse_quiet_hours("22:00-24:00")
+    assert hours.active(_at(23, 59))
+    assert not hours.active(_at(0, 30))
+    assert hours.until("anyone", _at(22, 30)) == datetime(2026, 3, 11).timestamp()
+
+
+class _Releases:
+    def __init__(self):
+        self.calls = []
+        self.times = []
+
+    def __call__(self, recipient, items):
+        self.calls.append((recipient, [item["title"] for item in items]))
+        self.times.append(time.monotonic())
+
+    def wait(self, count, timeout=2.0):
+        deadline = time.monotonic() + timeout
+        while len(self.calls) < count and time.monotonic() < deadline:
+            time.sleep(0.005)
+        return self.calls
+
+
+def test_due_messages_are_grouped_by_recipient(tmp_path):
+    releases = _Releases()
+    scheduler = quiet.DeferredScheduler(tmp_path / "deferred.db", releases, batch_size=10, batch_interval=0)
+    now = time.time()
+    for recipient, title in (("a", "1"), ("b", "2"), ("a", "3")):
+        assert scheduler.add(now - 1, recipient, {"title": title})
+    scheduler.start()
+    assert sorted(releases.wait(2)) == [("a", ["1", "3"]), ("b", ["2"])]
+    scheduler.stop()
+    assert scheduler.stats()["released"] == 3
+
+
+def test_release_is_batched_by_recipient(tmp_path):
+    releases = _Releases()
+    scheduler = quiet.DeferredScheduler(tmp_path / "deferred.db", releases, batch_size=2, batch_interval=0.1)
+    now = time.time()
+    for recipient in "abcde":
+        scheduler.add(now - 1, recipient, {"title": recipient})
+    scheduler.start()
+    releases.wait(5)
+    scheduler.stop()
+    assert len(releases.calls) == 5
+    # 每批两个接收方，批次之间间隔 batch_interval
+    assert releases.times[2] - releases.times[1] >= 0.09
+    assert releases.times[1] - releases.times[0] < 0.09
+
+
+def test_future_messages_wait_until_release_now(tmp_path):
+    releases = _Releases()
+    scheduler = quiet.DeferredScheduler(tmp_path / "deferred.db", releases, batch_interval=0)
+    scheduler.start()
+    scheduler.add(time.time() + 3600, "a", {"title": "later"})
+    time.sleep(0.05)
+    assert releases.calls == []
+    assert scheduler.stats()["pending"] == 1
+    scheduler.release_now()
+    assert releases.wait(1) == [("a", ["later"])]
+    scheduler.stop()
+
+
+def test_pending_messages_survive_restart(tmp_path):
+    path = tmp_path / "deferred.db"
+    scheduler = quiet.DeferredScheduler(path, _Releases())
+    scheduler.start()
+    scheduler.add(time.time() + 0.2, "a", {"title": "soon"})
+    scheduler.add(time.time() + 3600, "b", {"title": "later"})
+    scheduler.stop()
+
+    releases = _Releases()
+    restarted = quiet.DeferredScheduler(path, releases, batch_interval=0)
+    assert restarted.stats()["pending"] == 2
+    restarted.start()
+    assert releases.wait(1) == [("a", ["soon"])]
+    restarted.stop()
+    # 已释放的消息从数据库删除，未到期的继续保留
+    reopened = quiet.DeferredScheduler(path, _Releases())
+    assert [item["recipient"] for item in reopened.items()] == ["b"]
+    reopened.stop()
+
+
+def test_max_items_and_stop_reject_new_messages(tmp_path):
+    scheduler = quiet.DeferredScheduler(tmp_path / "deferred.db", _Releases(), max_items=1)
+    assert scheduler.add(time.time() + 60, "a", {"title": "1"})
+    assert not scheduler.add(time.time() + 60, "a", {"title": "2"})
+    scheduler.stop()
+    assert not scheduler.add(time.time() + 60, "a", {"title": "3"})
+
+
+def test_drain_releases_everything_before_stopping(tmp_path):
+    releases = _Releases()
+    path = tmp_path / "deferred.db"
+    scheduler = quiet.DeferredScheduler(path, releases, batch_size=1, batch_interval=60)
+    scheduler.start()
+    for recipient in "abc":
+        scheduler.add(time.time() + 3600, recipient, {"title": recipient})
+    scheduler.stop(drain=True)
+    # 不等待批次间隔，全部释放后才停止，数据库中不再保留
+    assert sorted(releases.calls) == [("a", ["a"]), ("b", ["b"]), ("c", ["c"])]
+    reopened = quiet.DeferredScheduler(path, _Releases())
+    assert reopened.items() == []
+    reopened.stop()
@@ -0,0 +1,100 @@
+import pytest
+
+from plugin_modules import load
+
+ratelimit = load("ratelimit")
+
+
+class _Clock:
+    def __init__(self):
+        self.now = 1000.0
+        self.slept = []
+
+    def monotonic(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.slept.append(seconds)
+        self.now += seconds
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = _Clock()
+    monkeypatch.setattr(ratelimit.time, "monotonic", clock.monotonic)
+    monkeypatch.setattr(ratelimit.time, "sleep", clock.sleep)
+    return clock
+
+
+def test_bucket_refills_and_overdraws(clock):
+    bucket = ratelimit.TokenBucket(rate=2, capacity=2)
+    assert bucket.reserve(clock.now) == 0
+    assert bucket.reserve(clock.now) == 0
+    assert bucket.reserve(clock.now) == pytest.approx(0.5)
+    # 透支的令牌需要先补回
+    assert bucket.reserve(clock.now) == pytest.approx(1)
+    assert bucket.reserve(clock.now + 10) == 0
+    assert bucket.tokens == 1
+
+
+def test_burst_passes_then_waits(clock):
+    limiter = ratelimit.RateLimiter(rate=10, burst=3, recipient_rate=100, recipient_burst=100)
+    assert [limiter.acquire("bark") for _ in range(3)] == [0, 0, 0]
+    assert limiter.acquire("bark") == pytest.approx(0.1)
+    assert clock.slept == [pytest.approx(0.1)]
+    assert limiter.stats()["delayed"] == 1
+
+
+def test_providers_are_limited_separately(clock):
+    limiter = ratelimit.RateLimiter(rate=1, burst=1, recipient_rate=100, recipient_burst=100)
+    assert limiter.acquire("a") == 0
+    assert limiter.acquire("b") == 0
+
+
+def test_recipient_bucket_limits_single_user(clock):
+    limiter = ratelimit.RateLimiter(rate=100, burst=100, recipient_rate=1, recipient_burst=1)
+    assert limiter.acquire("bark", ["alice"]) == 0
+    assert limiter.acquire("bark", ["bob"]) == 0
+    assert limiter.acquire("bark", ["alice", "bob"]) == pytest.approx(1)
+
+
+def test_recipient_buckets_are_bounded(clock, monkeypatch):
+    monkeypatch.setattr(ratelimit, "MAX_RECIPIENT_BUCKETS", 2)
+    limiter = ratelimit.RateLimiter(rate=100, burst=100, recipient_rate=1, recipient_burst=1)
+    for user in ("a", "b", "c"):
+        limiter.acquire("bark", [user])
+    assert limiter.stats()["recipients"] == 2
+    # a 已被淘汰，重新创建的令牌桶是满的
+    assert limiter.acquire("bark", ["a"]) == 0
+
+
+def test_feedback_backs_off_and_recovers(clock):
+    limiter = ratelimit.RateLimiter(rate=10, burst=1, recipient_rate=100, recipient_burst=100)
+    limiter.acquire("bark")
+    for _ in range(10):
+        limiter.feedback("bark", False)
+    assert limiter.stats()["providers"]["bark"]["rate"] == 1
+    limiter.feedback("bark", True)
+    assert limiter.stats()["providers"]["bark"]["rate"] == 2
+    for _ in range(20):
+        limiter.feedback("bark", True)
+    assert limiter.stats()["providers"]["bark"]["rate"] == 10
+    limiter.feedback("unknown", False)
+    assert "unknown" not in limiter.stats()["providers"]
+
+
+def test_configure_keeps_backoff_ratio(clock):
+    limiter = ratelimit.RateLimiter(rate=10, burst=5, recipient_rate=1, recipient_burst=1)
+    limiter.acquire("bark", ["alice"])
+    limiter.feedback("bark", False)
+    limiter.configure(rate=20, burst=2, recipient_rate=2, recipient_burst=1)
+    provider = limiter.stats()["providers"]["bark"]
+    assert provider["base_rate"] == 20
+    assert provider["rate"] == 10
+    assert provider["tokens"] == 2
+
+
+@pytest.mark.parametrize("code, expected", [(429, True), (500, True), (503, True), (200, False), (400, False),
+                                            (404, False), (None, False)])
+def test_only_throttling_and_server_errors_overload(code, expected):
+    assert ratelimit.overloaded(code) is expected
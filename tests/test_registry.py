@@ -0,0 +1,48 @@
+import sys
+
+from plugin_modules import load
+
+registry = load("registry")
+
+
+def test_last_entry_wins_and_targets_are_unique():
+    users = registry.RecipientRegistry([("admin", "k1"), ("alice", "k2"), ("admin", "k3"),
+                                        ("bob", "k2"), (None, "k4"), ("", "k4"), ("carol", " ")])
+    assert dict(users) == {"admin": "k3", "alice": "k2", "bob": "k2"}
+    assert users.anonymous == ("k4",)
+    assert users.targets == ("k3", "k2", "k4")
+    assert users.duplicates == 2
+    assert "carol" not in users and len(users) == 3
+
+
+def test_targets_are_interned():
+    first = "".join(["dev", "ice"])
+    second = "".join(["dev", "ice"])
+    users = registry.RecipientRegistry([("a", first), ("b", second)])
+    assert users["a"] is users["b"] is sys.intern("device")
+
+
+def test_diff():
+    old = registry.RecipientRegistry([("admin", "k1"), ("alice", "k2"), (None, "u1")])
+    new = registry.RecipientRegistry([("admin", "k1"), ("alice", "k9"), ("bob", "k3"), (None, "u2")])
+    assert old.diff(new) == {"added": ("bob", "u2"), "removed": ("u1",), "changed": ("alice",)}
+    assert old.diff(old) == {"added": (), "removed": (), "changed": ()}
+
+
+def test_registry_is_read_only():
+    users = registry.RecipientRegistry([("admin", "k1")])
+    assert not hasattr(users, "__setitem__")
+    assert not hasattr(users, "__dict__")
+
+
+def test_parse_groups():
+    groups = registry.parse_groups("family: alice, bob, alice\n\nbroken\nempty:\n : carol\nadmins:admin")
+    assert dict(groups) == {"family": ("alice", "bob"), "admins": ("admin",)}
+
+
+def test_resolve_names_expands_groups_in_order():
+    groups = registry.parse_groups("family:alice,bob\nadmins:admin,alice")
+    assert registry.resolve_names(groups, None) == ()
+    assert registry.resolve_names(groups, "carol") == ("carol",)
+    assert registry.resolve_names(groups, "family") == ("alice", "bob")
+    assert registry.resolve_names(groups, ["admins", "family", "carol"]) == ("admin", "alice", "bob", "carol")
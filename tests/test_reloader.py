@@ -0,0 +1,47 @@
+import threading
+
+from plugin_modules import load
+
+reloader = load("reloader")
+
+
+def test_first_load_counts_as_changed():
+    loader = reloader.Reloader()
+    loader.begin()
+    assert loader.changed("pool", 10, True)
+    assert loader.summary() == ["pool"]
+
+
+def test_same_settings_are_unchanged():
+    loader = reloader.Reloader()
+    loader.changed("pool", 10, True)
+    loader.begin()
+    assert not loader.changed("pool", 10, True)
+    assert loader.changed("queue", 1)
+    assert loader.changed("pool", 20, True)
+    # 每次重新加载只记录本次变化的组件
+    assert loader.summary() == ["queue", "pool"]
+
+
+def test_summary_is_a_copy():
+    loader = reloader.Reloader()
+    loader.changed("pool", 10)
+    loader.summary().clear()
+    assert loader.summary() == ["pool"]
+
+
+def test_reset_rebuilds_everything():
+    loader = reloader.Reloader()
+    loader.changed("pool", 10)
+    loader.reset()
+    assert loader.summary() == []
+    assert loader.changed("pool", 10)
+
+
+def test_lock_is_reentrant():
+    loader = reloader.Reloader()
+    with loader.lock:
+        # 重新加载过程中停止服务会再次取锁
+        assert loader.lock.acquire(timeout=0)
+        loader.lock.release()
+    assert isinstance(loader.lock, type(threading.RLock()))
@@ -0,0 +1,79 @@
+import pytest
+
+from plugin_modules import WXPUSHER, load
+
+bark = load("routing")
+wxpusher = load("routing", plugin=WXPUSHER)
+dispatch = load("dispatch")
+NotificationType = bark.NotificationType
+
+
+def test_bark_table_parses_keys_and_params():
+    table = bark.RoutingTable.build("group=mp&sound=bell", "admin:key1\nalice:key2\nbob:key1\nbroken",
+                                    groups="family: alice, bob")
+    assert dict(table.params) == {"group": "mp", "sound": "bell"}
+    assert table.device_keys == ("key1", "key2")
+    assert table.select(table.resolve("family")) == {"alice": "key2", "bob": "key1"}
+    assert table.select(["nobody"]) == {}
+
+
+def test_bark_empty_msgtypes_accepts_everything():
+    table = bark.RoutingTable.build(None, None)
+    assert table.accepts(NotificationType.Download)
+    table = bark.RoutingTable.build(None, None, msgtypes=["Manual"])
+    assert table.accepts(None)
+    assert table.accepts(NotificationType.Manual)
+    assert not table.accepts(NotificationType.Download)
+
+
+def test_priority_lanes():
+    table = bark.RoutingTable.build(None, None, high_msgtypes=["Manual"], bulk_msgtypes=["SiteMessage"])
+    assert table.priority(NotificationType.Manual) == dispatch.PRIORITY_HIGH
+    assert table.priority(NotificationType.SiteMessage) == dispatch.PRIORITY_BULK
+    assert table.priority(NotificationType.Download) == dispatch.PRIORITY_NORMAL
+    assert table.priority(None) == dispatch.PRIORITY_NORMAL
+
+
+def test_bark_rebuild_reuses_unchanged_parts():
+    first = bark.RoutingTable.build("a=1", "admin:key1", groups="g:admin")
+    second = bark.RoutingTable.build("a=1", "admin:key2", groups="g:admin", previous=first)
+    assert second.params is first.params
+    assert second.groups is first.groups
+    assert second.user_keys is not first.user_keys
+    assert second.device_keys == ("key2",)
+
+
+def test_table_is_read_only():
+    table = bark.RoutingTable.build(None, "admin:key1")
+    with pytest.raises(AttributeError):
+        table.msgtypes = frozenset()
+    with pytest.raises(TypeError):
+        table.params["x"] = "y"
+
+
+def test_wxpusher_parses_named_and_pure_uids():
+    assert wxpusher.split_ids(" 1, ,2 ,") == ("1", "2")
+    table = wxpusher.RoutingTable.build("AT_x", 1, "admin:UID_1, UID_2, alice:UID_1", "10,20")
+    assert dict(table.user_uids) == {"admin": "UID_1", "alice": "UID_1"}
+    assert table.pure_uids == ("UID_2",)
+    assert table.all_uids == ("UID_1", "UID_2")
+    assert table.topic_ids == ("10", "20")
+    assert dict(table.base_payload) == {"appToken": "AT_x", "contentType": 1}
+    assert table.uid_users["UID_1"] == "alice"
+
+
+def test_wxpusher_empty_msgtypes_accepts_nothing():
+    table = wxpusher.RoutingTable.build("AT_x", 1, None, None)
+    assert not table.accepts(NotificationType.Download)
+    assert table.accepts(None)
+    table = wxpusher.RoutingTable.build("AT_x", 1, None, None, msgtypes=["Download"])
+    assert table.accepts(NotificationType.Download)
+
+
+def test_wxpusher_rebuild_reuses_unchanged_parts():
+    first = wxpusher.RoutingTable.build("AT_x", 1, "admin:UID_1", "10")
+    second = wxpusher.RoutingTable.build("AT_y", 2, "admin:UID_1", "20", previous=first)
+    assert second.user_uids is first.user_uids
+    assert second.uid_users is first.uid_users
+    assert second.topic_ids == ("20",)
+    assert second.base_payload["appToken"] == "AT_y"
@@ -0,0 +1,74 @@
+from plugin_modules import load
+
+servers = load("servers")
+
+SERVERS = ("https://a.example", "https://b.example", "https://c.example")
+
+
+def test_parse_servers():
+    assert servers.parse_servers("https://a.example/, https://b.example\nhttps://a.example") == \
+        ("https://a.example", "https://b.example")
+    assert servers.parse_servers(None) == ()
+
+
+def test_parse_assignments():
+    assignments = servers.parse_assignments("alice: https://b.example/\nbroken\nbob:")
+    assert dict(assignments) == {"alice": "https://b.example"}
+
+
+def test_assign_is_default_and_uses_primary():
+    pool = servers.ServerPool(SERVERS, assignments={"alice": "https://c.example", "dave": "https://d.example"})
+    # 独立部署的服务器只认识注册在自己上面的设备，默认不按哈希分散
+    assert pool.route("key1", "bob")[0] == "https://a.example"
+    assert pool.route("key1", "alice")[0] == "https://c.example"
+    assert "https://d.example" in pool.servers
+    assert pool.states()["https://c.example"]["assigned"] == 1
+
+
+def test_shard_is_stable_rendezvous_hashing():
+    pool = servers.ServerPool(SERVERS, mode=servers.SERVER_SHARD, assignments={"alice": "https://c.example"})
+    keys = [f"key{i}" for i in range(300)]
+    first = {key: pool.preference(key)[0] for key in keys}
+    assert first == {key: pool.preference(key, "alice")[0] for key in keys}
+    assert len(set(first.values())) == 3
+    # 去掉一个服务器时只有原来在它上面的设备迁移
+    smaller = servers.ServerPool(SERVERS[:2], mode=servers.SERVER_SHARD)
+    moved = [key for key in keys if smaller.preference(key)[0] != first[key]]
+    assert moved and all(first[key] == SERVERS[2] for key in moved)
+
+
+def test_single_server():
+    pool = servers.ServerPool(SERVERS[:1], mode=servers.SERVER_SHARD)
+    assert pool.route("key1") == [SERVERS[0]]
+
+
+def test_assigned_server_has_no_failover():
+    pool = servers.ServerPool(SERVERS, assignments={"alice": SERVERS[2]})
+    # 设备只注册在指定的服务器上，不可用时也不转移到其余服务器
+    assert pool.preference("key1", "alice") == (SERVERS[2],)
+    assert pool.route("key1", "alice", unavailable=lambda server: server == SERVERS[2]) == [SERVERS[2]]
+    assert pool.route("key1", "bob", unavailable=lambda server: server == SERVERS[0]) == [SERVERS[0]]
+
+
+def test_route_skips_unavailable_servers():
+    pool = servers.ServerPool(SERVERS, shared=True)
+    assert pool.route("key1", "bob") == [SERVERS[0], pool.preference("key1")[1]]
+    route = pool.route("key1", "bob", unavailable=lambda server: server == SERVERS[0])
+    assert SERVERS[0] not in route and len(route) == 2
+    # 全部不可用时仍尝试首选服务器
+    assert pool.route("key1", "bob", unavailable=lambda server: True) == [SERVERS[0]]
+
+
+def test_failed_health_check_moves_devices():
+    pool = servers.ServerPool(SERVERS, mode=servers.SERVER_SHARD, timeout=0.1)
+    key = next(f"key{i}" for i in range(100) if pool.preference(f"key{i}")[0] == SERVERS[1])
+    assert not pool.check(SERVERS[1])
+    assert not pool.healthy(SERVERS[1])
+    assert pool.states()[SERVERS[1]]["error"]
+    assert pool.route(key)[0] != SERVERS[1]
+
+
+def test_partition_groups_by_server():
+    pool = servers.ServerPool(SERVERS, assignments={"alice": SERVERS[1]})
+    groups = pool.partition({"alice": "k1", "bob": "k2", "carol": "k3"})
+    assert groups == {SERVERS[1]: {"alice": "k1"}, SERVERS[0]: {"bob": "k2", "carol": "k3"}}
@@ -0,0 +1,46 @@
+import pytest
+
+from plugin_modules import load
+
+pytest.importorskip("requests")
+pytest.importorskip("urllib3")
+
+session = load("session")
+tracing = load("tracing")
+
+
+def test_session_is_reused_per_host():
+    pool = session.SessionPool(pool_size=3)
+    first = pool.session("https://api.day.app/push")
+    assert pool.session("https://api.day.app/other") is first
+    assert pool.session("https://example.com/push") is not first
+    pool.close()
+
+
+def test_adapter_uses_pool_size():
+    pool = session.SessionPool(pool_size=7)
+    adapter = pool.session("https://api.day.app").get_adapter("https://api.day.app")
+    assert adapter._pool_maxsize == 7
+    assert not isinstance(adapter, tracing.TracingAdapter)
+    pool.close()
+
+
+def test_trace_uses_tracing_adapter():
+    pool = session.SessionPool(trace=True)
+    adapter = pool.session("https://api.day.app").get_adapter("https://api.day.app")
+    assert isinstance(adapter, tracing.TracingAdapter)
+    pool.close()
+
+
+def test_keepalive_off_closes_connections():
+    pool = session.SessionPool(keepalive=False)
+    assert pool.session("https://api.day.app").headers["Connection"] == "close"
+    pool.close()
+
+
+def test_stats_before_any_request():
+    pool = session.SessionPool()
+    pool.session("https://api.day.app")
+    assert pool.stats() == {"api.day.app": {"open": 0, "connections": 0, "requests": 0, "reuse_ratio": 0}}
+    pool.close()
+    assert pool.stats() == {}
@@ -0,0 +1,35 @@
+"""
+两个插件各自发布和安装，MoviePilot 只下载插件自己的目录，公共辅助模块因此在两个目录中各保存一份。
+这里检查两份保持一致，修改时需要同时修改。
+"""
+import pytest
+
+from plugin_modules import BARK, PLUGINS, WXPUSHER
+
+# 各插件特有的模块
+OWN_MODULES = {"__init__.py", "routing.py", "servers.py", "chunking.py"}
+
+
+def _shared():
+    bark = {path.name for path in (PLUGINS / BARK).glob("*.py")}
+    wxpusher = {path.name for path in (PLUGINS / WXPUSHER).glob("*.py")}
+    return sorted((bark & wxpusher) - OWN_MODULES)
+
+
+def test_shared_modules_exist():
+    assert "session.py" in _shared()
+
+
+@pytest.mark.parametrize("name", _shared())
+def test_shared_module_copies_are_identical(name):
+    bark = (PLUGINS / BARK / name).read_bytes()
+    wxpusher = (PLUGINS / WXPUSHER / name).read_bytes()
+    assert bark == wxpusher, f"{name} 在两个插件中不一致"
+
+
+@pytest.mark.parametrize("name", sorted(OWN_MODULES - {"__init__.py"}))
+def test_own_modules_are_not_shared_by_accident(name):
+    # 特有模块只存在于一个插件中，或者像 routing.py 一样两边内容不同
+    paths = [PLUGINS / plugin / name for plugin in (BARK, WXPUSHER)]
+    existing = [path.read_bytes() for path in paths if path.exists()]
+    assert len(existing) < 2 or existing[0] != existing[1]
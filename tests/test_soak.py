@@ -0,0 +1,57 @@
+import importlib
+import sys
+
+import pytest
+
+from plugin_modules import BARK, ROOT, load_plugin
+
+# 浸泡测试脚本直接导入插件，插件可以导入时才能测试
+load_plugin(BARK)
+sys.path.insert(0, str(ROOT / "benchmarks"))
+soak = importlib.import_module("soak")
+
+MIB = soak.MIB
+
+
+def _sampler(*points):
+    sampler = soak.Sampler(top=5)
+    sampler.samples = [{"elapsed": elapsed, "events": 0, "rss": rss * MIB, "traced": traced * MIB}
+                       for elapsed, rss, traced in points]
+    return sampler
+
+
+def test_growth_is_relative_to_baseline():
+    sampler = _sampler((0, 100, 10), (60, 130, 12))
+    assert sampler.growth(sampler.samples[1]) == {"rss": 0.0, "traced": 0.0}
+    sampler.baseline = sampler.samples[0]
+    assert sampler.growth(sampler.samples[1]) == {"rss": 30.0, "traced": 2.0}
+
+
+def test_slope_ignores_warmup_samples():
+    # 预热期间增长很快，基线之后每分钟增长 1 MiB
+    sampler = _sampler((0, 10, 0), (60, 100, 0), (120, 101, 0), (180, 102, 0), (240, 103, 0))
+    assert sampler.slope() == 0.0
+    sampler.baseline = sampler.samples[1]
+    assert sampler.slope() == pytest.approx(60.0)
+
+
+@pytest.mark.parametrize("points", [[(60, 100, 0)], [(60, 100, 0), (60, 120, 0)]])
+def test_slope_needs_two_distinct_times(points):
+    sampler = _sampler(*points)
+    sampler.baseline = sampler.samples[0]
+    assert sampler.slope() == 0.0
+
+
+@pytest.mark.parametrize("growth, expected", [({"rss": 50, "traced": 20}, False),
+                                              ({"rss": 50.1, "traced": 0}, True),
+                                              ({"rss": 0, "traced": 20.1}, True)])
+def test_threshold(growth, expected):
+    assert soak.exceeded(growth, max_rss_growth=50, max_traced_growth=20) is expected
+
+
+def test_synthetic_events_address_users_by_username():
+    stream = soak.synthetic_events(10)
+    events = [next(stream) for _ in range(10)]
+    targeted = [event for event in events if event["username"]]
+    assert targeted and all(event["username"].startswith("user") for event in targeted)
+    assert all("userid" not in event for event in events)
@@ -0,0 +1,92 @@
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from plugin_modules import load
+
+requests = pytest.importorskip("requests")
+pytest.importorskip("urllib3")
+
+tracing = load("tracing")
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        body = b'{"code": 200}'
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def server():
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), _Handler)
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://localhost:{httpd.server_address[1]}/push"
+    httpd.shutdown()
+    httpd.server_close()
+
+
+def test_phase_without_trace_does_nothing():
+    assert tracing.current() is None
+    with tracing.phase("throttle"):
+        pass
+
+
+def test_tracer_keeps_slowest(monkeypatch):
+    tracer = tracing.Tracer(size=2)
+    clock = iter(range(100))
+    monkeypatch.setattr(tracing.time, "perf_counter", lambda: next(clock))
+    for label, duration in (("a", 3), ("b", 1), ("c", 5)):
+        with tracer.trace(label):
+            for _ in range(duration - 1):
+                next(clock)
+    slowest = tracer.slowest()
+    assert [item["label"] for item in slowest] == ["c", "a"]
+    assert slowest[0]["rank"] == 1 and slowest[0]["traced"] == 3
+    tracer.clear()
+    assert tracer.slowest() == []
+
+
+def test_nested_trace_reuses_outer_and_records_error():
+    tracer = tracing.Tracer()
+    with pytest.raises(ValueError):
+        with tracer.trace("outer") as outer:
+            with tracer.trace("inner") as inner:
+                assert inner is outer
+                raise ValueError("boom")
+    assert [(item["label"], item["error"]) for item in tracer.slowest()] == [("outer", "boom")]
+    assert tracing.current() is None
+
+
+def test_adapter_records_connection_phases(server):
+    session = requests.Session()
+    session.mount("http://", tracing.TracingAdapter())
+    tracer = tracing.Tracer()
+    for label in ("first", "second"):
+        with tracer.trace(label):
+            assert tracing.decode_json(session.get(server, timeout=5)) == {"code": 200}
+    traces = {item["label"]: item for item in tracer.slowest()}
+    assert not traces["first"]["reused"]
+    assert traces["first"]["phases_ms"]["dns"] >= 0
+    assert "wait" in tracer._heap[0][2].phases
+    # 第二次请求复用连接，不再解析和连接
+    assert traces["second"]["reused"]
+    assert traces["second"]["phases_ms"]["connect"] == 0
+    session.close()
+
+
+def test_adapter_without_trace_behaves_normally(server):
+    session = requests.Session()
+    session.mount("http://", tracing.TracingAdapter())
+    assert session.get(server, timeout=5).json() == {"code": 200}
+    session.close()
@@ -0,0 +1,77 @@
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from plugin_modules import load
+
+pytest.importorskip("httpx")
+
+transport = load("transport")
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_POST(self):
+        data = self.rfile.read(int(self.headers.get("Content-Length") or 0))
+        body = b'{"code": 200, "echo": "' + data + b'", "type": "' + self.headers.get("Content-Type", "").encode() + b'"}'
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+class _Server(ThreadingHTTPServer):
+    # 并发建立连接时不因监听队列溢出而等待重传
+    request_queue_size = 64
+
+
+@pytest.fixture
+def server():
+    httpd = _Server(("127.0.0.1", 0), _Handler)
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{httpd.server_address[1]}/push"
+    httpd.shutdown()
+    httpd.server_close()
+
+
+@pytest.fixture
+def client():
+    client = transport.AsyncTransport(connect_timeout=1, read_timeout=2)
+    yield client
+    client.close()
+
+
+def test_async_available():
+    assert transport.async_available()
+
+
+def test_post_returns_requests_like_response(server, client):
+    res = client.post(server, content_type="text/plain", data=b"hello")
+    assert res.status_code == 200
+    assert res.json() == {"code": 200, "echo": "hello", "type": "text/plain"}
+    assert res.elapsed >= 0
+    host = server.split("/")[2]
+    assert client.stats()[host] == {"requests": 1, "in_flight": 0, "http2": 0, "errors": 0}
+
+
+def test_submit_runs_requests_concurrently(server, client):
+    futures = [client.submit(server, data=str(i).encode()) for i in range(10)]
+    assert sorted(future.result(timeout=5).json()["echo"] for future in futures) == sorted(map(str, range(10)))
+
+
+def test_failed_request_returns_none(client):
+    assert client.post("http://127.0.0.1:9/push") is None
+    assert client.stats()["127.0.0.1:9"]["errors"] == 1
+
+
+def test_close_is_idempotent():
+    client = transport.AsyncTransport()
+    client.close()
+    client.close()